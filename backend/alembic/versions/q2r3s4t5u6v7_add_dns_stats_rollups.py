@@ -0,0 +1,65 @@
+"""add_dns_stats_rollups
+
+Revision ID: q2r3s4t5u6v7
+Revises: p1q2r3s4t5u6
+Create Date: 2026-10-19 09:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "q2r3s4t5u6v7"
+down_revision: Union[str, Sequence[str], None] = "p1q2r3s4t5u6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_ROLLUPS = (("dns_stats_minute", "minute"), ("dns_stats_hour", "hour"))
+
+
+def upgrade() -> None:
+    for table, _unit in _ROLLUPS:
+        op.create_table(
+            table,
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("dimension", sa.String(length=16), nullable=False),
+            sa.Column("key", sa.String(length=255), nullable=False),
+            sa.Column("query_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("blocked_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("bucket_start", "dimension", "key", name=f"uq_{table}_bucket_dim_key"),
+        )
+        op.create_index(op.f(f"ix_{table}_id"), table, ["id"], unique=False)
+        op.create_index(op.f(f"ix_{table}_bucket_start"), table, ["bucket_start"], unique=False)
+
+    # Backfill from persisted rows so date-range stats keep their history. Root-domain
+    # rows need extract_root_domain (Python) and start accumulating from ingest.
+    for table, unit in _ROLLUPS:
+        op.execute(
+            f"""
+            INSERT INTO {table} (bucket_start, dimension, key, query_count, blocked_count)
+            SELECT date_trunc('{unit}', timestamp), 'client', client_ip,
+                   count(*), count(*) FILTER (WHERE blocked)
+            FROM dns_queries
+            GROUP BY 1, 3
+            """
+        )
+        op.execute(
+            f"""
+            INSERT INTO {table} (bucket_start, dimension, key, query_count, blocked_count)
+            SELECT date_trunc('{unit}', timestamp), 'blocked_domain', lower(domain),
+                   count(*), count(*)
+            FROM dns_queries
+            WHERE blocked
+            GROUP BY 1, 3
+            """
+        )
+
+
+def downgrade() -> None:
+    for table, _unit in reversed(_ROLLUPS):
+        op.drop_index(op.f(f"ix_{table}_bucket_start"), table_name=table)
+        op.drop_index(op.f(f"ix_{table}_id"), table_name=table)
+        op.drop_table(table)
@@ -0,0 +1,38 @@
+"""add_dns_queries_stats_index
+
+Revision ID: r3s4t5u6v7w8
+Revises: q2r3s4t5u6v7
+Create Date: 2026-10-19 11:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "r3s4t5u6v7w8"
+down_revision: Union[str, Sequence[str], None] = "q2r3s4t5u6v7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # dns_queries is the largest table: build without blocking ingest writes.
+    # CONCURRENTLY cannot run inside a transaction, hence the autocommit block.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_dns_queries_ts_stats",
+            "dns_queries",
+            ["timestamp"],
+            unique=False,
+            postgresql_include=["blocked", "client_ip", "domain"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_dns_queries_ts_stats",
+            table_name="dns_queries",
+            postgresql_concurrently=True,
+        )
@@ -11,8 +11,7 @@ from app.features.client_behavior.repositories.behavior_rollup_country import (
     merge_country_counts,
     parse_country_counts,
 )
-from app.shared.domain_country import country_code_for_domain
-from app.shared.domain_utils import extract_root_domain
+from app.shared.domain_country import country_code_for_root
 
 
 def _hour_bucket(ts: datetime) -> datetime:
@@ -31,7 +30,7 @@ class BehaviorRollupRepository:
         queries: List[Tuple[datetime, str]],
         known_roots: Set[Tuple[int, str]],
     ) -> None:
-        """queries: list of (timestamp, domain). known_roots: (device_id, root) already seen."""
+        """queries: list of (timestamp, root_domain). known_roots: (device_id, root) already seen."""
         if not queries:
             return
 
@@ -40,12 +39,11 @@ class BehaviorRollupRepository:
         )
         device_known = {r for did, r in known_roots if did == device_id}
 
-        for ts, domain in queries:
+        for ts, root in queries:
             window = _hour_bucket(ts)
-            root = extract_root_domain(domain)
             buckets[window]["count"] += 1
             buckets[window]["roots"].add(root)
-            cc = country_code_for_domain(domain)
+            cc = country_code_for_root(root)
             buckets[window]["countries"][cc] += 1
             if root and (device_id, root) not in known_roots:
                 buckets[window]["new"] += 1
@@ -1,5 +1,5 @@
 from datetime import datetime, timedelta, timezone
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session, joinedload
@@ -88,6 +88,22 @@ class ClientBlockedDomainRepository:
             .all()
         )
 
+    def list_active_domains_by_device(self) -> Dict[int, List[str]]:
+        """Active block domains grouped by device_id, in one query (policy DNS sync)."""
+        now = datetime.now(timezone.utc)
+        rows = (
+            self.db.query(ClientBlockedDomain.device_id, ClientBlockedDomain.domain)
+            .filter(
+                ClientBlockedDomain.revoked_at.is_(None),
+                or_(ClientBlockedDomain.expires_at.is_(None), ClientBlockedDomain.expires_at > now),
+            )
+            .all()
+        )
+        by_device: Dict[int, List[str]] = {}
+        for device_id, domain in rows:
+            by_device.setdefault(device_id, []).append(domain)
+        return by_device
+
     def list_active_behavior_auto_blocks(self) -> List[ClientBlockedDomain]:
         """Active auto-blocks with device loaded (for admin blocked-clients list)."""
         return self.list_active_blocks_for_admin()
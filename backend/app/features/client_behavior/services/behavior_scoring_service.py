@@ -13,7 +13,7 @@ from app.features.client_behavior.services.behavior_baseline_service import Beha
 from app.features.devices.repositories.device_repository import DeviceRepository
 from app.features.policy.repositories.policy_repository import PolicyRepository
 from app.features.policy.sensitivity import alert_threshold_for_sensitivity
-from app.features.dns_queries.dns_anomaly import get_suspicious_domain_reasons
+from app.features.dns_queries.dns_anomaly import suspicious_domains
 from app.features.dns_queries.models.dns_alert import DnsAlert
 from app.features.dns_queries.repositories.dns_alert_repository import DnsAlertRepository
 from app.features.dns_queries.schemas.dns_query import DnsQueryCreate
@@ -220,9 +220,14 @@ class BehaviorScoringService:
             points += 15
 
         top_domain: Optional[str] = None
-        for _ip, domain, root in entries:
-            if get_suspicious_domain_reasons(domain):
+        findings = suspicious_domains.findings(
+            [domain for _ip, domain, _root in entries], [root for _ip, _domain, root in entries]
+        )
+        for (_ip, domain, root), finding in zip(entries, findings):
+            if finding.reasons:
                 reasons.append(f"suspicious domain {domain}")
+                if (finding.dga_confidence or 0.0) >= settings.DNS_DGA_MIN_CONFIDENCE:
+                    reasons.append(f"dga-like domain {domain} (confidence {finding.dga_confidence:.2f})")
                 points += 25
                 top_domain = domain
                 break
@@ -241,14 +246,17 @@ class BehaviorScoringService:
         seen_roots: set[str] = set()
         max_domains = max(1, settings.BEHAVIOR_AUTO_BLOCK_DOMAINS_PER_EVENT)
 
-        for _ip, domain, root in entries:
+        findings = suspicious_domains.findings(
+            [domain for _ip, domain, _root in entries], [root for _ip, _domain, root in entries]
+        )
+        for (_ip, domain, root), finding in zip(entries, findings):
             root_key = root.lower()
             if root_key in seen_roots:
                 continue
             seen_roots.add(root_key)
             if is_whitelisted_root(root):
                 continue
-            if get_suspicious_domain_reasons(domain):
+            if finding.reasons:
                 suspicious.append(domain.lower())
             else:
                 others.append(domain.lower())
@@ -7,7 +7,7 @@ from sqlalchemy.orm import Session
 from app.features.client_behavior.repositories.behavior_rollup_repository import BehaviorRollupRepository
 from app.features.devices.repositories.device_repository import DeviceRepository
 from app.features.devices.services.device_country_alert_service import DeviceCountryAlertService
-from app.shared.domain_country import country_code_for_domain
+from app.shared.domain_country import country_code_for_root
 from app.features.dns_queries.models.domain_first_seen import DomainFirstSeen
 from app.features.dns_queries.schemas.dns_query import DnsQueryCreate
 from app.shared.domain_utils import extract_root_domain, is_noise_domain
@@ -47,8 +47,9 @@ class ClientBehaviorAggregator:
                 ts = q.timestamp
                 if ts.tzinfo is None:
                     ts = ts.replace(tzinfo=timezone.utc)
-                tuples.append((ts, q.domain))
-                country_counts[country_code_for_domain(q.domain)] += 1
+                root = extract_root_domain(q.domain)
+                tuples.append((ts, root))
+                country_counts[country_code_for_root(root)] += 1
             self.rollup_repo.upsert_batch(device.id, tuples, known_roots)
             self.country_alert_service.record_countries_and_alert(
                 device.id, client_ip, dict(country_counts)
@@ -4,12 +4,12 @@ from sqlalchemy.orm import Session
 from app.features.dashboard.schemas.network_overview import NetworkOverviewRead
 from app.features.dashboard.services.network_overview_service import NetworkOverviewService
 from app.shared.admin_auth import verify_admin_api_token
-from app.shared.dependencies import get_db
+from app.shared.dependencies import get_read_db
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
 
-def get_network_overview_service(db: Session = Depends(get_db)) -> NetworkOverviewService:
+def get_network_overview_service(db: Session = Depends(get_read_db)) -> NetworkOverviewService:
     return NetworkOverviewService(db)
 
 
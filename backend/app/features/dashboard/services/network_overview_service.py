@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta, timezone
 from typing import Any, Literal, Optional
 
-from sqlalchemy import desc, func
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.features.client_behavior.models.client_behavior_profile import ClientBehaviorProfile
@@ -9,8 +9,8 @@ from app.features.dashboard.schemas.network_overview import NetworkOverviewRead,
 from app.features.dashboard.services import network_overview_cache
 from app.features.dashboard.services.overview_templates import build_network_overview_bullets
 from app.features.dns_queries.models.dns_alert import DnsAlert
-from app.features.dns_queries.models.dns_query import DnsQuery
 from app.features.dns_queries.repositories.dns_query_repository import DnsQueryRepository
+from app.features.dns_queries.repositories.dns_stats_rollup_repository import DnsStatsRollupRepository
 from app.features.policy.repositories.policy_repository import PolicyRepository
 from app.features.vpn.services.usage_service import UsageService
 from app.shared.config import settings
@@ -27,6 +27,7 @@ class NetworkOverviewService:
         self.db = db
         self.usage_service = UsageService(db)
         self.dns_repo = DnsQueryRepository(db)
+        self.dns_stats_repo = DnsStatsRollupRepository(db)
         self.policy_repo = PolicyRepository(db)
 
     def build_overview(self, *, period_minutes: int = 60, refresh: bool = False) -> NetworkOverviewRead:
@@ -89,20 +90,12 @@ class NetworkOverviewService:
         alerts_by_type = {alert_type: int(count) for alert_type, count in alert_rows}
         alerts_total = sum(alerts_by_type.values())
 
-        blocked_count = (
-            self.db.query(DnsQuery)
-            .filter(DnsQuery.timestamp >= since, DnsQuery.blocked.is_(True))
-            .count()
-        )
-        top_blocked_rows = (
-            self.db.query(DnsQuery.domain, func.count(DnsQuery.id).label("count"))
-            .filter(DnsQuery.timestamp >= since, DnsQuery.blocked.is_(True))
-            .group_by(DnsQuery.domain)
-            .order_by(desc("count"))
-            .limit(5)
-            .all()
-        )
-        top_blocked = [{"domain": domain, "count": int(count)} for domain, count in top_blocked_rows]
+        if settings.DNS_STATS_ROLLUPS_ENABLED:
+            dns_stats = self.dns_stats_repo.get_stats(start_date=since, end_date=now, top_n=5)
+        else:
+            dns_stats = self.dns_repo.get_stats(start_date=since, end_date=now, top_n=5)
+        blocked_count = int(dns_stats["blocked_queries"])
+        top_blocked = dns_stats["top_blocked_domains"]
 
         enabled_packs = [p for p in self.policy_repo.list_packs() if p.enabled_globally]
         pack_names = [p.name for p in enabled_packs]
@@ -6,6 +6,7 @@ _ALERT_TYPE_LABELS: dict[str, str] = {
     "blocked_attempt": "blocked attempts",
     "new_domain": "new domains",
     "suspicious_domain": "suspicious domains",
+    "dns_tunnel_suspected": "suspected DNS tunnels",
     "bandwidth_spike": "bandwidth spikes",
     "behavior_anomaly": "behavior anomalies",
     "new_country_region": "new country regions",
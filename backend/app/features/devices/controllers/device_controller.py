@@ -1,4 +1,5 @@
 from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.features.devices.schemas.device import DeviceCreate, DeviceUpdate, DhcpSyncRequest
@@ -23,9 +24,9 @@ def create_device_controller(data: DeviceCreate, db: Session, service: IDeviceSe
         raise HTTPException(status_code=400, detail=str(e))
 
 
-def get_devices_controller(db: Session, service: IDeviceService):
+async def get_devices_controller(db: AsyncSession, service: IDeviceService):
     try:
-        return service.get_devices(db)
+        return await service.get_devices_async(db)
     except Exception:
         logger.exception(
             "Device list failed",
@@ -0,0 +1,40 @@
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from app.features.devices.models.device import Device
+from app.features.vpn.models.ip_lease import IpLease
+
+
+class AsyncDeviceRepository:
+    """Async read-only counterpart of DeviceRepository for list endpoints."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_all(self) -> List[Device]:
+        result = await self.db.scalars(
+            select(Device)
+            .options(joinedload(Device.ip_lease))
+            .join(IpLease, Device.ip_lease_id == IpLease.id)
+            .order_by(IpLease.ip.asc())
+        )
+        return list(result.unique())
+
+    async def get_identity_map_by_client_ips(
+        self, client_ips: List[str]
+    ) -> Dict[str, Dict[str, Optional[str]]]:
+        if not client_ips:
+            return {}
+
+        result = await self.db.execute(
+            select(IpLease.ip, Device.hostname)
+            .join(Device, Device.ip_lease_id == IpLease.id)
+            .where(IpLease.ip.in_(client_ips), IpLease.released_at.is_(None))
+        )
+        return {
+            ip: {"device_name": hostname, "device_vendor": None, "user_name": None}
+            for ip, hostname in result.all()
+        }
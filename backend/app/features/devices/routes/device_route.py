@@ -3,6 +3,7 @@ from typing import Optional
 import hmac
 
 from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.features.devices.schemas.device import DeviceCreate, DeviceUpdate, DhcpSyncRequest
@@ -42,10 +43,10 @@ from app.features.devices.services.device_country_service import DeviceCountrySe
 from app.features.devices.services.device_login_geo_service import DeviceLoginGeoService
 from app.features.devices.services.device_service_interface import IDeviceService
 from app.shared.database import SessionLocal
-from app.shared.dependencies import get_db
+from app.shared.dependencies import get_async_read_db, get_db, get_read_db
 from app.features.vpn.schemas.usage_history import UsageHistoryResponse, UsageWsSnapshot
 from app.features.vpn.schemas.usage_live import DeviceUsageLiveResponse
-from app.features.vpn.services.usage_service import UsageService
+from app.features.vpn.services.usage_service import UsageService, list_live_bandwidth_async
 from app.shared.admin_auth import verify_admin_api_token
 from app.shared.config import settings
 from app.shared.usage_ws_manager import usage_ws_manager
@@ -65,7 +66,7 @@ def get_policy_service(db: Session = Depends(get_db)) -> PolicyService:
     return PolicyService(db)
 
 
-def get_device_country_service(db: Session = Depends(get_db)) -> DeviceCountryService:
+def get_device_country_service(db: Session = Depends(get_read_db)) -> DeviceCountryService:
     return DeviceCountryService(db)
 
 
@@ -84,22 +85,22 @@ def create_device_endpoint(
 
 
 @router.get("")
-def get_devices_endpoint(
-    db: Session = Depends(get_db),
+async def get_devices_endpoint(
+    db: AsyncSession = Depends(get_async_read_db),
     _: None = Depends(verify_admin_api_token),
     service: IDeviceService = Depends(get_device_service),
 ):
-    return get_devices_controller(db, service)
+    return await get_devices_controller(db, service)
 
 
 @router.get("/usage/live", response_model=DeviceUsageLiveResponse)
-def list_live_device_usage(
+async def list_live_device_usage(
     max_age_sec: Optional[int] = Query(default=None, ge=5, le=300),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     _: None = Depends(verify_admin_api_token),
 ):
     """Latest per-device VPN throughput from trustedge-wg /v1/usage reports."""
-    return UsageService(db).list_live_bandwidth(max_age_sec=max_age_sec)
+    return await list_live_bandwidth_async(db, max_age_sec=max_age_sec)
 
 
 @router.get("/usage/history", response_model=UsageHistoryResponse)
@@ -201,12 +202,22 @@ def client_blocks_sync_endpoint(
     from app.features.policy.services.policy_dns_service import PolicyDnsService
 
     sync = PolicyDnsService(db).build_dns_sync()
+    pack_domains = {pack.slug: pack.domains for pack in sync.packs}
+
+    def _legacy_domains(entry) -> list[str]:
+        if entry.allowlist_only:
+            return entry.allowlist_domains
+        domains = set(entry.block_domains).union(sync.global_domains)
+        for slug in entry.pack_slugs:
+            domains.update(pack_domains.get(slug, ()))
+        return sorted(domains)
+
     entries = [
         ClientBlockSyncEntry(
             device_id=e.device_id,
             mac_address=e.mac_address,
             tag=e.tag,
-            domains=e.block_domains if not e.allowlist_only else e.allowlist_domains,
+            domains=_legacy_domains(e),
         )
         for e in sync.entries
     ]
@@ -1,7 +1,9 @@
 from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
+from app.features.devices.repositories.device_async_repository import AsyncDeviceRepository
 from app.features.devices.repositories.device_repository import DeviceRepository
 from app.features.devices.schemas.device import (
     DeviceCreate,
@@ -51,6 +53,10 @@ class DeviceService:
         devices = repository.get_all()
         return [self._to_read(device) for device in devices]
 
+    async def get_devices_async(self, db: AsyncSession) -> List[DeviceRead]:
+        devices = await AsyncDeviceRepository(db).get_all()
+        return [self._to_read(device) for device in devices]
+
     def update_device(self, device_id: int, data: DeviceUpdate, db: Session) -> DeviceRead:
         repository = DeviceRepository(db)
         try:
@@ -6,6 +6,7 @@ from app.features.devices.schemas.device import (
     DhcpSyncRequest,
     DhcpSyncResult,
 )
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 
@@ -16,6 +17,9 @@ class IDeviceService(Protocol):
     def get_devices(self, db: Session) -> List[DeviceRead]:
         ...
 
+    async def get_devices_async(self, db: AsyncSession) -> List[DeviceRead]:
+        ...
+
     def update_device(self, device_id: int, data: DeviceUpdate, db: Session) -> DeviceRead:
         ...
 
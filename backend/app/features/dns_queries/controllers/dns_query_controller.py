@@ -1,9 +1,12 @@
 import asyncio
 
 from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Optional, List
-from datetime import datetime
+from typing import Iterator, Optional, List
+from datetime import datetime, timezone
+from app.features.dns_queries.dns_export import MEDIA_TYPES, gzip_chunks
 from app.features.dns_queries.services.dns_query_service_interface import IDnsQueryService
 from app.features.dns_queries.schemas.dns_query import DnsQueryCreate, DnsQueryBulkCreate
 from app.features.dns_queries.services.whois_service import WhoisLookupError, lookup_domain_whois
@@ -60,8 +63,8 @@ def _broadcast_queries(queries: List[DnsQueryCreate]):
         )
 
 
-def get_dns_queries_controller(
-    db: Session,
+async def get_dns_queries_controller(
+    db: AsyncSession,
     service: IDnsQueryService,
     page: int = 1,
     page_size: int = 50,
@@ -71,7 +74,7 @@ def get_dns_queries_controller(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None
 ):
-    return service.get_queries(
+    return await service.get_queries_async(
         db=db,
         page=page,
         page_size=page_size,
@@ -83,13 +86,51 @@ def get_dns_queries_controller(
     )
 
 
-def get_dns_stats_controller(
+def export_dns_queries_controller(
     db: Session,
     service: IDnsQueryService,
+    export_format: str = "ndjson",
+    compress: bool = False,
+    domain_search: Optional[str] = None,
+    client_ip: Optional[str] = None,
+    blocked_only: bool = False,
     start_date: Optional[datetime] = None,
-    end_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None,
+    include_archived: bool = False
+) -> StreamingResponse:
+    chunks: Iterator[bytes] = service.export_queries(
+        db=db,
+        export_format=export_format,
+        domain_search=domain_search,
+        client_ip=client_ip,
+        blocked_only=blocked_only,
+        start_date=start_date,
+        end_date=end_date,
+        include_archived=include_archived
+    )
+    filename = f"dns-queries-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.{export_format}"
+    media_type = MEDIA_TYPES[export_format]
+    if compress:
+        chunks = gzip_chunks(chunks)
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+async def get_dns_stats_controller(
+    db: AsyncSession,
+    service: IDnsQueryService,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    window_minutes: Optional[int] = None
 ):
-    return service.get_stats(db=db, start_date=start_date, end_date=end_date)
+    return await service.get_stats_async(
+        db=db, start_date=start_date, end_date=end_date, window_minutes=window_minutes
+    )
 
 
 def get_unique_clients_controller(db: Session, service: IDnsQueryService):
@@ -108,7 +149,8 @@ def get_grouped_sites_controller(
     client_ip: Optional[str] = None,
     blocked_only: bool = False,
     filter_noise: bool = True,
-    limit: int = 50
+    limit: int = 50,
+    window_minutes: Optional[int] = None
 ):
     return service.get_grouped_by_site(
         db=db,
@@ -117,19 +159,20 @@ def get_grouped_sites_controller(
         client_ip=client_ip,
         blocked_only=blocked_only,
         filter_noise=filter_noise,
-        limit=limit
+        limit=limit,
+        window_minutes=window_minutes
     )
 
 
-def get_dns_alerts_controller(
-    db: Session,
+async def get_dns_alerts_controller(
+    db: AsyncSession,
     service: IDnsQueryService,
     page: int = 1,
     page_size: int = 50,
     alert_type: Optional[str] = None,
     client_ip: Optional[str] = None,
 ):
-    return service.get_alerts(
+    return await service.get_alerts_async(
         db=db,
         page=page,
         page_size=page_size,
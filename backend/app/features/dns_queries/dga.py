@@ -0,0 +1,175 @@
+"""Character-bigram scoring for machine-generated (DGA) domain labels.
+
+The model is a table of ``log P(next | prev)`` over ``a-z0-9-`` plus start/end
+markers, trained offline with ``train_bigram_table`` and shipped as
+``data/dga_bigrams.bin`` (int16 fixed-point, ~3 KB). A label's score is its mean
+bigram log-likelihood: pronounceable names score high, random strings low. The
+calibrated threshold and temperature in the file turn a score into a 0..1
+confidence.
+
+Only the registrable label is scored (``xk2jq9vd`` in ``www.xk2jq9vd.net``);
+labels shorter than ``MIN_LABEL_LENGTH`` and punycode are skipped. A batch is
+scored in a few passes over the joined labels, so no NumPy is needed.
+"""
+
+from __future__ import annotations
+
+import math
+import struct
+import sys
+from array import array
+from functools import lru_cache
+from itertools import accumulate
+from operator import add
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from app.shared.domain_utils import extract_root_domain
+
+ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789-"
+START = "^"
+END = "$"
+SYMBOLS = ALPHABET + START + END
+MIN_LABEL_LENGTH = 6
+
+MODEL_PATH = Path(__file__).resolve().parent / "data" / "dga_bigrams.bin"
+_MAGIC = b"DGB1"
+# symbol count, fixed-point scale, threshold, temperature
+_HEADER = struct.Struct("<4sHHff")
+_NOT_ALPHABET = str.maketrans("", "", ALPHABET)
+
+
+class DgaVerdict(NamedTuple):
+    label: str
+    score: float  # mean bigram log-likelihood
+    confidence: float  # 0..1, probability-like that the label is machine-generated
+
+
+def registrable_label(domain: str) -> str:
+    return extract_root_domain(domain).split(".", 1)[0]
+
+
+class DgaModel:
+    def __init__(self, table: Dict[str, float], threshold: float, temperature: float) -> None:
+        self.threshold = threshold
+        self.temperature = temperature
+        # Indexed by a 16-bit pair of ASCII codes as array("H") reads them from bytes;
+        # pairs outside the alphabet get the table's lowest log-likelihood.
+        pairs = [min(table.values())] * 65536
+        for bigram, logp in table.items():
+            first, second = ord(bigram[0]), ord(bigram[1])
+            if sys.byteorder == "little":
+                pairs[first | second << 8] = logp
+            else:
+                pairs[first << 8 | second] = logp
+        self._pairs = pairs
+
+    @classmethod
+    def load(cls, path: Path = MODEL_PATH) -> "DgaModel":
+        raw = path.read_bytes()
+        magic, count, scale, threshold, temperature = _HEADER.unpack_from(raw)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a DGA bigram table")
+        offset = _HEADER.size
+        symbols = raw[offset:offset + count].decode("ascii")
+        values = array("h")
+        values.frombytes(raw[offset + count:offset + count + 2 * count * count])
+        if sys.byteorder == "big":
+            values.byteswap()
+        table = {
+            prev + nxt: values[i * count + j] / scale
+            for i, prev in enumerate(symbols)
+            for j, nxt in enumerate(symbols)
+        }
+        return cls(table, threshold, temperature)
+
+    def score_labels(self, labels: Sequence[str]) -> List[Optional[float]]:
+        """Mean bigram log-likelihood per label; None when not scoreable.
+
+        The batch is joined into one marked byte string and its overlapping byte
+        pairs are interleaved into a single uint16 array, looked up with C-level
+        ``map`` and prefix-summed in the same pass; every label's total is then
+        one subtraction.
+        """
+        marked = START + (END + START).join(labels) + END
+        if min(map(len, labels), default=0) >= MIN_LABEL_LENGTH and marked.isascii() and "xn--" not in marked:
+            scoreable = [True] * len(labels)
+            valid = labels
+        else:
+            scoreable = [
+                len(label) >= MIN_LABEL_LENGTH and label.isascii() and not label.startswith("xn--")
+                for label in labels
+            ]
+            valid = [label for label, ok in zip(labels, scoreable) if ok]
+            if not valid:
+                return [None] * len(labels)
+            marked = START + (END + START).join(valid) + END
+
+        joined = marked.encode("ascii")
+        pairs = bytearray(2 * len(joined))
+        pairs[0::2] = joined
+        pairs[1::2] = joined[1:] + END.encode("ascii")
+        prefix = list(accumulate(map(self._pairs.__getitem__, array("H", pairs)), initial=0.0))
+
+        # Label k spans len+1 pairs; one END+START pair separates consecutive labels.
+        spans = [len(label) + 1 for label in valid]
+        ends = accumulate(span + 1 for span in spans)
+        totals = iter([(prefix[end - 1] - prefix[end - 1 - span]) / span for end, span in zip(ends, spans)])
+        return [next(totals) if ok else None for ok in scoreable]
+
+    def confidence(self, score: float) -> float:
+        z = (self.threshold - score) / self.temperature
+        if z > 30:
+            return 1.0
+        return 1.0 / (1.0 + math.exp(-z))
+
+    def verdicts(
+        self, domains: Sequence[str], roots: Optional[Sequence[str]] = None
+    ) -> List[Optional[DgaVerdict]]:
+        """Verdict per domain; pass ``roots`` when the registrable domains are already known."""
+        if roots is None:
+            labels = [registrable_label(domain) for domain in domains]
+        else:
+            labels = [root.split(".", 1)[0] for root in roots]
+        return [
+            None if score is None else DgaVerdict(label, score, self.confidence(score))
+            for label, score in zip(labels, self.score_labels(labels))
+        ]
+
+    def verdict(self, domain: str) -> Optional[DgaVerdict]:
+        return self.verdicts([domain])[0]
+
+
+@lru_cache(maxsize=1)
+def get_dga_model() -> DgaModel:
+    return DgaModel.load()
+
+
+def train_bigram_table(
+    labels: Iterable[str],
+    *,
+    smoothing: float = 0.5,
+    scale: int = 1000,
+    threshold: float,
+    temperature: float,
+) -> bytes:
+    """Fit add-``smoothing`` bigram log-probabilities and encode the model file."""
+    count = len(SYMBOLS)
+    index = {ch: i for i, ch in enumerate(SYMBOLS)}
+    counts = [[smoothing] * count for _ in range(count)]
+    for label in labels:
+        label = label.lower()
+        if label.translate(_NOT_ALPHABET):
+            continue
+        marked = START + label + END
+        for prev, nxt in zip(marked, marked[1:]):
+            counts[index[prev]][index[nxt]] += 1
+
+    values = array("h")
+    for row in counts:
+        total = sum(row)
+        values.extend(max(-32768, round(math.log(c / total) * scale)) for c in row)
+    if sys.byteorder == "big":
+        values.byteswap()
+    header = _HEADER.pack(_MAGIC, count, scale, threshold, temperature)
+    return header + SYMBOLS.encode("ascii") + values.tobytes()
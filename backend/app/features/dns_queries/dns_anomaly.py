@@ -1,10 +1,23 @@
-"""Heuristics for suspicious DNS activity."""
+"""Heuristics for suspicious DNS activity.
+
+The checks are compiled once into a ``SuspiciousDomainDetector``: a suffix table for
+suspicious TLDs, a single-pass scan of the first label for digit ratio and
+alphanumeric runs, the character-bigram DGA model (``dga.py``) and optional extra
+rules. Results are memoized per domain in a bounded LRU
+(``DNS_SUSPICIOUS_DOMAIN_CACHE_SIZE``), so ingest and behavior scoring evaluate each
+domain once however often they ask. ``findings`` evaluates the cache misses of a
+whole batch together, scoring their labels with the DGA model in one pass.
+"""
 
 from __future__ import annotations
 
-import re
-from typing import List, Set
+import string
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
 
+from app.features.dns_queries.dga import DgaModel, get_dga_model
+from app.shared.config import settings
 from app.shared.domain_utils import extract_root_domain
 
 SUSPICIOUS_TLDS: Set[str] = {
@@ -20,15 +33,162 @@ SUSPICIOUS_TLDS: Set[str] = {
     ".cn",
 }
 
-_ENTROPY_LABEL = re.compile(r"^[a-z0-9]{16,}$", re.IGNORECASE)
+_MIN_RANDOM_LABEL = 16
+_ALNUM = frozenset(string.ascii_lowercase + string.digits)
+_DIGITS = frozenset(string.digits)
+
+# Extra rule: (domain, root_domain) -> reasons; both lowercased, no trailing dot.
+DomainRule = Callable[[str, str], Iterable[str]]
+
+
+def _first_label_reasons(first: str) -> List[str]:
+    """Digit-heavy hyphen segment and long alphanumeric label, in one pass."""
+    reasons: List[str] = []
+    digit_reason: Optional[str] = None
+    all_alnum = True
+    seg_start = seg_digits = 0
+    for i, ch in enumerate(first + "-"):
+        if ch == "-":
+            seg_len = i - seg_start
+            if digit_reason is None and seg_len >= _MIN_RANDOM_LABEL and seg_digits / seg_len >= 0.75:
+                pct = int(seg_digits / seg_len * 100)
+                segment = first[seg_start:i]
+                digit_reason = (
+                    f"Subdomain looks random: long label with many digits ({pct}% digits in '{segment}')"
+                )
+            seg_start = i + 1
+            seg_digits = 0
+            if i < len(first):
+                all_alnum = False
+            continue
+        if ch in _DIGITS:
+            seg_digits += 1
+        elif ch not in _ALNUM:
+            all_alnum = False
+
+    if digit_reason:
+        reasons.append(digit_reason)
+    if len(first) >= _MIN_RANDOM_LABEL and all_alnum:
+        reasons.append(f"Subdomain looks random: long alphanumeric label ('{first}')")
+    return reasons
+
+
+class DomainFinding(NamedTuple):
+    reasons: Tuple[str, ...]
+    dga_confidence: Optional[float] = None  # None when the label was not scored
+
+
+class SuspiciousDomainDetector:
+    """Compiled suspicious-domain checks with a bounded per-domain memo."""
+
+    def __init__(
+        self,
+        tlds: Iterable[str] = SUSPICIOUS_TLDS,
+        rules: Iterable[DomainRule] = (),
+        cache_size: Optional[int] = None,
+        dga_model: Optional[DgaModel] = None,
+        dga_min_confidence: Optional[float] = None,
+    ) -> None:
+        self._tlds = frozenset(t.lower() for t in tlds)
+        self._max_tld_labels = max((t.count(".") for t in self._tlds), default=0)
+        self._rules: List[DomainRule] = list(rules)
+        self._dga = dga_model
+        self._dga_min_confidence = (
+            settings.DNS_DGA_MIN_CONFIDENCE if dga_min_confidence is None else dga_min_confidence
+        )
+        self._lock = threading.Lock()
+        self._cache_size = settings.DNS_SUSPICIOUS_DOMAIN_CACHE_SIZE if cache_size is None else cache_size
+        self._memo: "OrderedDict[str, DomainFinding]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._memo)
+
+    def add_rule(self, rule: DomainRule) -> None:
+        with self._lock:
+            self._rules.append(rule)
+            self._memo.clear()
+
+    def matched_tld(self, root_domain: str) -> Optional[str]:
+        """Longest suspicious suffix of ``root_domain`` via label-suffix table lookups."""
+        root = root_domain.lower()
+        end = len(root)
+        match = None
+        for _ in range(self._max_tld_labels):
+            end = root.rfind(".", 0, end)
+            if end < 0:
+                break
+            if root[end:] in self._tlds:
+                match = root[end:]
+        return match
+
+    def high_entropy_reasons(self, domain: str) -> List[str]:
+        domain = domain.lower().rstrip(".")
+        dot = domain.find(".")
+        if dot < 0:
+            return []
+        return _first_label_reasons(domain[:dot])
+
+    def reasons(self, domain: str) -> Tuple[str, ...]:
+        return self.findings([domain])[0].reasons
+
+    def findings(self, domains: Sequence[str], roots: Optional[Sequence[str]] = None) -> List[DomainFinding]:
+        """Finding per domain; ``roots`` (aligned with ``domains``) skips root extraction."""
+        keys = [domain.lower().rstrip(".") for domain in domains]
+        found: Dict[str, DomainFinding] = {}
+        with self._lock:
+            for key in keys:
+                finding = self._memo.get(key)
+                if finding is not None:
+                    self._memo.move_to_end(key)
+                    found[key] = finding
+        misses = [key for key in dict.fromkeys(keys) if key not in found]
+        if misses:
+            miss_roots = None
+            if roots is not None:
+                root_of = dict(zip(keys, roots))
+                miss_roots = [root_of[key].lower() for key in misses]
+            evaluated = self._evaluate(misses, miss_roots)
+            found.update(zip(misses, evaluated))
+            if self._cache_size > 0:
+                with self._lock:
+                    self._memo.update(zip(misses, evaluated))
+                    while len(self._memo) > self._cache_size:
+                        self._memo.popitem(last=False)
+        return [found[key] for key in keys]
+
+    def _evaluate(self, domains: List[str], roots: Optional[List[str]] = None) -> List[DomainFinding]:
+        if roots is None:
+            roots = [extract_root_domain(domain) for domain in domains]
+        labels = [root.split(".", 1)[0] for root in roots]
+        scores = self._dga.score_labels(labels) if self._dga else [None] * len(domains)
+
+        findings = []
+        for domain, root, label, score in zip(domains, roots, labels, scores):
+            reasons: List[str] = []
+            matched = self.matched_tld(root)
+            if matched:
+                reasons.append(f"Root domain uses suspicious TLD ({matched})")
+            reasons.extend(self.high_entropy_reasons(domain))
+            confidence = None
+            if score is not None:
+                confidence = self._dga.confidence(score)
+                if confidence >= self._dga_min_confidence:
+                    reasons.append(
+                        f"Domain label looks machine-generated ('{label}', DGA confidence {confidence:.2f})"
+                    )
+            for rule in self._rules:
+                reasons.extend(rule(domain, root))
+            findings.append(DomainFinding(tuple(reasons), confidence))
+        return findings
+
+
+suspicious_domains = SuspiciousDomainDetector(
+    dga_model=get_dga_model() if settings.DNS_DGA_ENABLED else None,
+)
 
 
 def matched_suspicious_tld(root_domain: str) -> str | None:
-    root = root_domain.lower()
-    for tld in sorted(SUSPICIOUS_TLDS, key=len, reverse=True):
-        if root.endswith(tld):
-            return tld
-    return None
+    return suspicious_domains.matched_tld(root_domain)
 
 
 def is_suspicious_tld(root_domain: str) -> bool:
@@ -36,30 +196,7 @@ def is_suspicious_tld(root_domain: str) -> bool:
 
 
 def high_entropy_subdomain_reasons(domain: str) -> List[str]:
-    labels = domain.lower().rstrip(".").split(".")
-    if len(labels) < 2:
-        return []
-
-    first = labels[0]
-    reasons: List[str] = []
-
-    for segment in first.split("-"):
-        if len(segment) < 16:
-            continue
-        digit_ratio = sum(ch.isdigit() for ch in segment) / len(segment)
-        if digit_ratio >= 0.75:
-            pct = int(digit_ratio * 100)
-            reasons.append(
-                f"Subdomain looks random: long label with many digits ({pct}% digits in '{segment}')"
-            )
-            break
-
-    if len(first) >= 16 and _ENTROPY_LABEL.match(first):
-        reasons.append(
-            f"Subdomain looks random: long alphanumeric label ('{first}')"
-        )
-
-    return reasons
+    return suspicious_domains.high_entropy_reasons(domain)
 
 
 def is_high_entropy_subdomain(domain: str) -> bool:
@@ -68,16 +205,8 @@ def is_high_entropy_subdomain(domain: str) -> bool:
 
 def get_suspicious_domain_reasons(domain: str) -> List[str]:
     """Return human-readable reasons why a domain matched suspicious heuristics."""
-    root = extract_root_domain(domain)
-    reasons: List[str] = []
-
-    matched_tld = matched_suspicious_tld(root)
-    if matched_tld:
-        reasons.append(f"Root domain uses suspicious TLD ({matched_tld})")
-
-    reasons.extend(high_entropy_subdomain_reasons(domain))
-    return reasons
+    return list(suspicious_domains.reasons(domain))
 
 
 def is_suspicious_domain(domain: str) -> bool:
-    return bool(get_suspicious_domain_reasons(domain))
+    return bool(suspicious_domains.reasons(domain))
@@ -0,0 +1,164 @@
+"""Cold storage for aged DNS rows: gzip-compressed NDJSON day files plus a JSON manifest.
+
+Layout under ``DNS_ARCHIVE_DIR``::
+
+    manifest.json
+    2026/05/dns-queries-20260514-<run>.ndjson.gz
+
+Each manifest entry records the file's time span, row count and sha256 so range
+scans only open files that overlap the requested window.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from app.shared.config import settings
+
+MANIFEST_NAME = "manifest.json"
+LOCK_NAME = ".archive.lock"
+
+
+def get_archive_dir() -> Optional[Path]:
+    """Archive root (local disk or a mounted S3-compatible bucket); None when disabled."""
+    configured = settings.DNS_ARCHIVE_DIR.strip()
+    if not configured:
+        return None
+    return Path(configured)
+
+
+def _parse_ts(value: str) -> datetime:
+    ts = datetime.fromisoformat(value)
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts
+
+
+def _as_utc(ts: datetime) -> datetime:
+    if ts.tzinfo is None:
+        return ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc)
+
+
+@contextmanager
+def archive_lock(archive_dir: Path) -> Iterator[None]:
+    """Exclusive lock for an archive pass (day files, manifest update and row deletes)."""
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    with open(archive_dir / LOCK_NAME, "a") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def load_manifest(archive_dir: Path) -> List[Dict[str, object]]:
+    path = archive_dir / MANIFEST_NAME
+    if not path.is_file():
+        return []
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return list(data.get("files", []))
+
+
+def save_manifest(archive_dir: Path, entries: List[Dict[str, object]]) -> None:
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    path = archive_dir / MANIFEST_NAME
+    tmp = path.with_suffix(".json.tmp")
+    body = json.dumps({"files": sorted(entries, key=lambda e: str(e["start"]))}, indent=2)
+    tmp.write_text(body, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def write_day_file(
+    archive_dir: Path,
+    day: date,
+    run_id: str,
+    records: Iterable[Dict[str, object]],
+) -> Optional[Dict[str, object]]:
+    """Stream records for one UTC day into a new gzip file; returns its manifest entry.
+
+    Raises FileExistsError rather than replace a file the manifest may already list.
+    """
+    rel = Path(f"{day:%Y}") / f"{day:%m}" / f"dns-queries-{day:%Y%m%d}-{run_id}.ndjson.gz"
+    path = archive_dir / rel
+    if path.exists():
+        raise FileExistsError(f"archive file already exists: {rel.as_posix()}")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+
+    rows = 0
+    start: Optional[str] = None
+    end: Optional[str] = None
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=settings.DNS_ARCHIVE_COMPRESS_LEVEL) as fh:
+        for record in records:
+            fh.write(json.dumps(record, separators=(",", ":")) + "\n")
+            rows += 1
+            ts = str(record["timestamp"])
+            if start is None or ts < start:
+                start = ts
+            if end is None or ts > end:
+                end = ts
+
+    if rows == 0:
+        tmp.unlink(missing_ok=True)
+        return None
+
+    digest = hashlib.sha256()
+    with tmp.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    os.replace(tmp, path)
+
+    return {
+        "path": rel.as_posix(),
+        "start": start,
+        "end": end,
+        "rows": rows,
+        "bytes": path.stat().st_size,
+        "sha256": digest.hexdigest(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def iter_archived_records(
+    archive_dir: Path,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    *,
+    client_ip: Optional[str] = None,
+    domain_search: Optional[str] = None,
+    blocked_only: bool = False,
+) -> Iterator[Dict[str, object]]:
+    """Yield archived records in the range, opening only files the manifest says overlap."""
+    start = _as_utc(start_date) if start_date else None
+    end = _as_utc(end_date) if end_date else None
+    needle = domain_search.lower() if domain_search else None
+
+    for entry in sorted(load_manifest(archive_dir), key=lambda e: str(e["start"])):
+        if start and _parse_ts(str(entry["end"])) < start:
+            continue
+        if end and _parse_ts(str(entry["start"])) > end:
+            continue
+        with gzip.open(archive_dir / str(entry["path"]), "rt", encoding="utf-8") as fh:
+            for line in fh:
+                record = json.loads(line)
+                ts = _parse_ts(record["timestamp"])
+                if start and ts < start:
+                    continue
+                if end and ts > end:
+                    continue
+                if client_ip and record["client_ip"] != client_ip:
+                    continue
+                if blocked_only and not record["blocked"]:
+                    continue
+                if needle and needle not in str(record["domain"]).lower():
+                    continue
+                yield record
@@ -0,0 +1,75 @@
+"""Streaming encoders for bulk DNS history export (NDJSON / CSV, optional gzip)."""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from app.features.dns_queries.models.dns_query import DnsQuery
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FIELDS = [
+    "id",
+    "timestamp",
+    "client_ip",
+    "device_name",
+    "domain",
+    "query_type",
+    "action",
+    "blocked",
+]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _utc_iso(ts: Optional[datetime]) -> Optional[str]:
+    if ts is None:
+        return None
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc).isoformat()
+
+
+def export_record(row: DnsQuery, device_name: Optional[str]) -> Dict[str, object]:
+    return {
+        "id": row.id,
+        "timestamp": _utc_iso(row.timestamp),
+        "client_ip": row.client_ip,
+        "device_name": device_name,
+        "domain": row.domain,
+        "query_type": row.query_type,
+        "action": row.action,
+        "blocked": bool(row.blocked),
+    }
+
+
+def encode_ndjson(records: List[Dict[str, object]]) -> bytes:
+    return "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records).encode("utf-8")
+
+
+def encode_csv(records: List[Dict[str, object]], *, header: bool = False) -> bytes:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_FIELDS, lineterminator="\n")
+    if header:
+        writer.writeheader()
+    writer.writerows(records)
+    return buf.getvalue().encode("utf-8")
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress a chunk stream into a single gzip member without buffering it."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
@@ -1,16 +1,38 @@
-"""In-memory DNS ingest counters (since process start)."""
+"""In-memory DNS ingest counters (since process start), bounded and lock-striped.
+
+State is split into ``DNS_LIVE_STATS_SHARDS`` shards keyed by root domain, each with
+its own lock, so concurrent ingest batches only contend when they touch the same
+shard. Reads merge the shards. Memory is capped: top blocked domains and clients are
+Space-Saving summaries, each site keeps at most ``DNS_LIVE_STATS_MAX_SUBDOMAINS``
+subdomains, and each shard keeps at most its share of ``DNS_LIVE_STATS_MAX_SITES``
+sites, evicting the least recently seen one first.
+
+Each shard keeps its sites (and, separately, its blocked sites) in recency order,
+stamped so that late batches cannot push an old site ahead of newer ones; the grouped
+sites view reads the newest ``limit`` sites by ``last_seen`` from each shard and
+merges them. The same bounded index is kept per client IP (at most
+``DNS_LIVE_STATS_MAX_SITES_PER_CLIENT`` sites for ``DNS_LIVE_STATS_MAX_CLIENTS``
+clients) for per-device site views when the windowed store is disabled. Subdomain
+lists are copied only for the sites returned and sorted outside the lock.
+"""
 
 from __future__ import annotations
 
+import heapq
 import threading
-from collections import Counter, defaultdict
+from collections import Counter, OrderedDict, defaultdict
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
 
 from app.features.dns_queries.schemas.dns_query import DnsQueryCreate
+from app.features.dns_queries.top_k import SpaceSaving
+from app.shared.config import settings
 from app.shared.domain_utils import extract_root_domain, is_noise_domain
 
+# Per-client site indexes keep fewer subdomains; they multiply by the client count.
+_CLIENT_MAX_SUBDOMAINS = 10
+
 
 @dataclass
 class _SiteAggregate:
@@ -20,80 +42,278 @@ class _SiteAggregate:
     last_seen: Optional[datetime] = None
     first_seen: Optional[datetime] = None
     blocked: bool = False
+    stamp: Optional[datetime] = None  # newest timestamp in the index when last placed
 
 
-class DnsIngestStats:
-    """Thread-safe counters updated on every DNS ingest batch."""
+class PreparedQuery(NamedTuple):
+    """A query with its domain parsed once for every live aggregator."""
 
-    def __init__(self) -> None:
-        self._lock = threading.Lock()
-        self._started_at = datetime.now(timezone.utc)
-        self._total = 0
-        self._blocked = 0
-        self._blocked_domains: Counter[str] = Counter()
-        self._clients: Counter[str] = Counter()
-        self._sites: Dict[str, _SiteAggregate] = {}
-        self._noise_filtered = 0
+    query: DnsQueryCreate
+    domain: str
+    root: Optional[str]  # None for noise domains
 
-    def record(self, queries: List[DnsQueryCreate]) -> None:
-        with self._lock:
-            for query in queries:
-                self._total += 1
-                self._clients[query.client_ip] += 1
+
+def prepare_queries(queries: List[DnsQueryCreate]) -> List[PreparedQuery]:
+    prepared = []
+    for query in queries:
+        domain = query.domain.lower()
+        root = None if is_noise_domain(domain) else extract_root_domain(domain)
+        prepared.append(PreparedQuery(query, domain, root))
+    return prepared
+
+
+class _SiteIndex:
+    """Sites in the order they were last advanced (oldest first), capped; callers hold
+    the shard lock.
+
+    A site moves to the newest end when its last_seen advances. Late batches can
+    place a site there with a last_seen older than its neighbours, so each entry
+    carries a stamp: the newest timestamp the index had seen when it was placed.
+    Stamps never decrease along the order and bound each entry's last_seen, which
+    lets ``recent`` merge by last_seen and stop early. Eviction pops the oldest
+    stamp.
+    """
+
+    __slots__ = ("sites", "blocked_sites", "max_sites", "max_subdomains", "evicted", "newest")
+
+    def __init__(self, max_sites: int, max_subdomains: int) -> None:
+        self.sites: "OrderedDict[str, _SiteAggregate]" = OrderedDict()
+        self.blocked_sites: "OrderedDict[str, datetime]" = OrderedDict()  # root -> stamp
+        self.max_sites = max(1, max_sites)
+        self.max_subdomains = max(1, max_subdomains)
+        self.evicted = 0
+        self.newest: Optional[datetime] = None
+
+    def record(self, root: str, domain: str, query: DnsQueryCreate) -> None:
+        ts = query.timestamp
+        if self.newest is None or ts > self.newest:
+            self.newest = ts
+        site = self.sites.get(root)
+        if site is None:
+            site = _SiteAggregate(root_domain=root, last_seen=ts, first_seen=ts, stamp=self.newest)
+            self.sites[root] = site
+            if len(self.sites) > self.max_sites:
+                evicted, _ = self.sites.popitem(last=False)
+                self.blocked_sites.pop(evicted, None)
+                self.evicted += 1
+            advanced = True
+        else:
+            advanced = ts > site.last_seen
+            if advanced:
+                site.last_seen = ts
+                site.stamp = self.newest
+                self.sites.move_to_end(root)
+            if ts < site.first_seen:
+                site.first_seen = ts
+
+        site.total_queries += 1
+        if len(site.subdomains) < self.max_subdomains:
+            site.subdomains.add(domain)
+        if query.blocked and not site.blocked:
+            site.blocked = True
+            self.blocked_sites[root] = self.newest
+        elif site.blocked and advanced:
+            self.blocked_sites[root] = self.newest
+            self.blocked_sites.move_to_end(root)
+
+    def recent(self, limit: int, blocked_only: bool) -> Tuple[List[_SiteAggregate], int]:
+        """Newest ``limit`` sites by last_seen (copies without subdomains) and how many are held."""
+        order = self.blocked_sites if blocked_only else self.sites
+        if limit <= 0:
+            return [], len(order)
+        newest: List[Tuple[datetime, str]] = []  # min-heap of the best ``limit`` so far
+        for root in reversed(order):
+            site = self.sites[root]
+            stamp = order[root] if blocked_only else site.stamp
+            if len(newest) >= limit and stamp <= newest[0][0]:
+                break  # every older entry's last_seen is at most its stamp
+            if len(newest) < limit:
+                heapq.heappush(newest, (site.last_seen, root))
+            elif site.last_seen > newest[0][0]:
+                heapq.heapreplace(newest, (site.last_seen, root))
+        rows = []
+        for _last_seen, root in sorted(newest, reverse=True):
+            site = self.sites[root]
+            rows.append(
+                _SiteAggregate(
+                    root_domain=root,
+                    total_queries=site.total_queries,
+                    last_seen=site.last_seen,
+                    first_seen=site.first_seen,
+                    blocked=site.blocked,
+                )
+            )
+        return rows, len(order)
+
+
+class _Shard:
+    """One lock stripe: counters for the root domains that hash to it.
+
+    Besides the shard-wide site index, each client gets its own smaller index of the
+    sites it queried in this shard; clients are evicted least recently seen first.
+    """
+
+    def __init__(
+        self,
+        top_k_capacity: int,
+        max_sites: int,
+        max_subdomains: int,
+        max_clients: int,
+        max_client_sites: int,
+    ) -> None:
+        self.lock = threading.Lock()
+        self.total = 0
+        self.blocked = 0
+        self.noise_filtered = 0
+        self.clients_evicted = 0
+        self.blocked_domains = SpaceSaving(top_k_capacity)
+        self.clients = SpaceSaving(top_k_capacity)
+        self.index = _SiteIndex(max_sites, max_subdomains)
+        self.client_sites: "OrderedDict[str, _SiteIndex]" = OrderedDict()
+        self.max_subdomains = max_subdomains
+        self.max_clients = max(1, max_clients)
+        self.max_client_sites = max(1, max_client_sites)
+
+    def record(self, batch: List[PreparedQuery]) -> None:
+        with self.lock:
+            for query, domain, root in batch:
+                self.total += 1
+                self.clients.add(query.client_ip)
 
                 if query.blocked:
-                    self._blocked += 1
-                    self._blocked_domains[query.domain.lower()] += 1
+                    self.blocked += 1
+                    self.blocked_domains.add(domain)
 
-                if is_noise_domain(query.domain):
-                    self._noise_filtered += 1
+                if root is None:
+                    self.noise_filtered += 1
                     continue
 
-                root = extract_root_domain(query.domain)
-                site = self._sites.get(root)
-                if site is None:
-                    site = _SiteAggregate(root_domain=root)
-                    self._sites[root] = site
-
-                site.total_queries += 1
-                site.subdomains.add(query.domain.lower())
-                site.blocked = site.blocked or query.blocked
-                ts = query.timestamp
-                if site.last_seen is None or ts > site.last_seen:
-                    site.last_seen = ts
-                if site.first_seen is None or ts < site.first_seen:
-                    site.first_seen = ts
+                self.index.record(root, domain, query)
+                self._client_index(query.client_ip).record(root, domain, query)
+
+    def _client_index(self, client_ip: str) -> _SiteIndex:
+        index = self.client_sites.get(client_ip)
+        if index is None:
+            index = _SiteIndex(self.max_client_sites, min(self.max_subdomains, _CLIENT_MAX_SUBDOMAINS))
+            self.client_sites[client_ip] = index
+            if len(self.client_sites) > self.max_clients:
+                self.client_sites.popitem(last=False)
+                self.clients_evicted += 1
+        else:
+            self.client_sites.move_to_end(client_ip)
+        return index
+
+    def recent(
+        self, limit: int, blocked_only: bool, client_ip: Optional[str] = None
+    ) -> Tuple[List[_SiteAggregate], int]:
+        """Newest ``limit`` sites of this shard and how many it holds; O(limit) under the lock."""
+        with self.lock:
+            index = self.index if client_ip is None else self.client_sites.get(client_ip)
+            if index is None:
+                return [], 0
+            return index.recent(limit, blocked_only)
+
+    def subdomains(self, root: str, client_ip: Optional[str] = None) -> Optional[List[str]]:
+        with self.lock:
+            index = self.index if client_ip is None else self.client_sites.get(client_ip)
+            site = index.sites.get(root) if index is not None else None
+            return None if site is None else list(site.subdomains)
+
+
+class DnsIngestStats:
+    """Thread-safe counters updated on every DNS ingest batch."""
+
+    def __init__(
+        self,
+        *,
+        shards: Optional[int] = None,
+        max_sites: Optional[int] = None,
+        max_subdomains: Optional[int] = None,
+        top_k_capacity: Optional[int] = None,
+        max_clients: Optional[int] = None,
+        max_client_sites: Optional[int] = None,
+    ) -> None:
+        shard_count = max(1, shards or settings.DNS_LIVE_STATS_SHARDS)
+        site_cap = max_sites or settings.DNS_LIVE_STATS_MAX_SITES
+        client_site_cap = max_client_sites or settings.DNS_LIVE_STATS_MAX_SITES_PER_CLIENT
+        self._started_at = datetime.now(timezone.utc)
+        self._shards = [
+            _Shard(
+                top_k_capacity=top_k_capacity or settings.DNS_LIVE_STATS_TOP_K_CAPACITY,
+                max_sites=-(-site_cap // shard_count),
+                max_subdomains=max_subdomains or settings.DNS_LIVE_STATS_MAX_SUBDOMAINS,
+                max_clients=max_clients or settings.DNS_LIVE_STATS_MAX_CLIENTS,
+                max_client_sites=-(-client_site_cap // shard_count),
+            )
+            for _ in range(shard_count)
+        ]
+
+    def _shard_for(self, key: str) -> int:
+        return hash(key) % len(self._shards)
+
+    def record(self, queries: List[DnsQueryCreate]) -> None:
+        self.record_prepared(prepare_queries(queries))
+
+    def record_prepared(self, prepared: List[PreparedQuery]) -> None:
+        # Domain parsing happened in prepare_queries, before any lock is taken.
+        batches: Dict[int, List[PreparedQuery]] = defaultdict(list)
+        for item in prepared:
+            batches[self._shard_for(item.root or item.domain)].append(item)
+        for index, batch in batches.items():
+            self._shards[index].record(batch)
 
     def get_stats(self) -> dict:
-        with self._lock:
-            total = self._total
-            blocked = self._blocked
-            now = datetime.now(timezone.utc)
-            top_blocked = [
+        total = blocked = 0
+        blocked_domains: Counter[str] = Counter()
+        clients: Counter[str] = Counter()
+        for shard in self._shards:
+            with shard.lock:
+                total += shard.total
+                blocked += shard.blocked
+                blocked_domains.update(dict(shard.blocked_domains.items()))
+                clients.update(dict(shard.clients.items()))
+
+        now = datetime.now(timezone.utc)
+        return {
+            "total_queries": total,
+            "blocked_queries": blocked,
+            "allowed_queries": total - blocked,
+            "block_rate": round((blocked / total * 100), 2) if total > 0 else 0,
+            "top_blocked_domains": [
                 {"domain": domain, "count": count}
-                for domain, count in self._blocked_domains.most_common(10)
-            ]
-            top_clients = [
+                for domain, count in blocked_domains.most_common(10)
+            ],
+            "top_clients": [
                 {"client_ip": ip, "count": count}
-                for ip, count in self._clients.most_common(10)
-            ]
-            return {
-                "total_queries": total,
-                "blocked_queries": blocked,
-                "allowed_queries": total - blocked,
-                "block_rate": round((blocked / total * 100), 2) if total > 0 else 0,
-                "top_blocked_domains": top_blocked,
-                "top_clients": top_clients,
-                "period": {
-                    "start": self._started_at.isoformat(),
-                    "end": now.isoformat(),
-                },
-                "source": "live",
-            }
+                for ip, count in clients.most_common(10)
+            ],
+            "period": {
+                "start": self._started_at.isoformat(),
+                "end": now.isoformat(),
+            },
+            "source": "live",
+        }
 
     def get_unique_clients(self) -> List[str]:
-        with self._lock:
-            return sorted(self._clients.keys())
+        clients: Set[str] = set()
+        for shard in self._shards:
+            with shard.lock:
+                clients.update(shard.clients.keys())
+        return sorted(clients)
+
+    def site_details(self, roots: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Subdomains and first_seen this process holds for the given root domains."""
+        details: Dict[str, Dict[str, Any]] = {}
+        for root in roots:
+            shard = self._shards[self._shard_for(root)]
+            with shard.lock:
+                site = shard.index.sites.get(root)
+                if site is None:
+                    continue
+                subdomains = list(site.subdomains)
+                first_seen = site.first_seen
+            details[root] = {"subdomains": sorted(subdomains), "first_seen": first_seen}
+        return details
 
     def get_grouped_sites(
         self,
@@ -103,37 +323,43 @@ class DnsIngestStats:
         filter_noise: bool = True,
         limit: int = 50,
     ) -> Dict[str, Any]:
-        with self._lock:
-            sites: List[dict] = []
-            for site in self._sites.values():
-                if blocked_only and not site.blocked:
-                    continue
-                sites.append(
-                    {
-                        "root_domain": site.root_domain,
-                        "total_queries": site.total_queries,
-                        "subdomains": sorted(site.subdomains),
-                        "last_seen": site.last_seen.isoformat() if site.last_seen else None,
-                        "first_seen": site.first_seen.isoformat() if site.first_seen else None,
-                        "blocked": site.blocked,
-                    }
-                )
+        candidates: List[_SiteAggregate] = []
+        total_sites = noise_filtered = sites_evicted = clients_evicted = 0
+        for shard in self._shards:
+            rows, count = shard.recent(limit, blocked_only, client_ip)
+            candidates.extend(rows)
+            total_sites += count
+            noise_filtered += shard.noise_filtered
+            sites_evicted += shard.index.evicted
+            clients_evicted += shard.clients_evicted
 
-            sites.sort(
-                key=lambda x: x["last_seen"] or "",
-                reverse=True,
+        sites: List[dict] = []
+        for site in heapq.nlargest(limit, candidates, key=lambda x: x.last_seen):
+            shard = self._shards[self._shard_for(site.root_domain)]
+            subdomains = shard.subdomains(site.root_domain, client_ip)
+            sites.append(
+                {
+                    "root_domain": site.root_domain,
+                    "total_queries": site.total_queries,
+                    "subdomains": sorted(subdomains or []),
+                    "last_seen": site.last_seen.isoformat(),
+                    "first_seen": site.first_seen.isoformat(),
+                    "blocked": site.blocked,
+                }
             )
-            now = datetime.now(timezone.utc)
-            return {
-                "sites": sites[:limit],
-                "total_sites": len(sites),
-                "noise_filtered": self._noise_filtered,
-                "period": {
-                    "start": self._started_at.isoformat(),
-                    "end": now.isoformat(),
-                },
-                "source": "live",
-            }
+        now = datetime.now(timezone.utc)
+        return {
+            "sites": sites,
+            "total_sites": total_sites,
+            "noise_filtered": noise_filtered,
+            "sites_evicted": sites_evicted,
+            "clients_evicted": clients_evicted,
+            "period": {
+                "start": self._started_at.isoformat(),
+                "end": now.isoformat(),
+            },
+            "source": "live",
+        }
 
 
 ingest_stats = DnsIngestStats()
@@ -0,0 +1,679 @@
+"""Time-windowed live DNS stats over per-minute and per-hour buckets.
+
+Every ingest batch is folded into its minute and hour buckets. A recent window
+(5m, 1h, 24h, ...) is answered from whole hour buckets plus minute buckets at the
+ragged edges, so a read touches at most ~85 buckets whatever the traffic. Each bucket
+keeps exact totals, the top blocked domains and clients, and the most recently seen
+sites with their counts, first-seen times and a sample of subdomains, both overall
+and per client IP (a smaller ``DNS_LIVE_WINDOW_CLIENT_TOP_K`` budget each; clients
+are VPN pool addresses, so their number is bounded by the pool).
+
+Per-bucket sets are bounded with slack: they may grow to ``_TRIM_FACTOR`` times
+``DNS_LIVE_WINDOW_TOP_K`` before being cut back to ``_KEEP_FACTOR`` times, so a key
+that just appeared has room to accumulate before it competes for a place. Site
+counts, first-seen times and subdomains are kept only for sites still in the
+bucket's recency set, so every field of a returned site comes from the same bucket.
+
+With Redis available (``DNS_LIVE_WINDOWS_REDIS_ENABLED`` and a reachable
+``REDIS_URL``) the buckets live there (``ng:dns:live:*`` keys with TTLs) and windows
+are merged server-side, so every uvicorn worker reads and writes the same counters
+and nothing resets on deploy. Without Redis a per-process ring of buckets answers the
+same questions for that worker. A failed Redis call marks Redis down for
+``_REDIS_RECHECK_SEC``, so reads during an outage see the batches that fell back to
+memory; those batches are not replayed into Redis once it recovers.
+"""
+
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from uuid import uuid4
+
+import redis
+
+from app.features.dns_queries.dns_ingest_stats import PreparedQuery
+from app.features.dns_queries.top_k import SpaceSaving
+from app.shared.config import settings
+from app.shared.logging_context import structured_extra
+from app.shared.redis_client import get_redis, redis_reachable
+from app.shared.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+MINUTE_SEC = 60
+HOUR_SEC = 3600
+MAX_WINDOW_MINUTES = 24 * 60
+# Minute buckets only serve the edges of a window, so two hours is enough.
+_RETENTION_SEC = {"m": 2 * HOUR_SEC, "h": 25 * HOUR_SEC}
+_BUCKET_SEC = {"m": MINUTE_SEC, "h": HOUR_SEC}
+KEY_PREFIX = "ng:dns:live:"
+# Bucket sets grow to top_k * _TRIM_FACTOR members, then are cut back to top_k * _KEEP_FACTOR.
+_TRIM_FACTOR = 4
+_KEEP_FACTOR = 2
+# Subdomains kept per site per bucket (each bucket also caps its total at top_k times this).
+_SUBDOMAIN_SAMPLE = 10
+# How long a Redis PING result (or a failed Redis call) decides the store before re-checking.
+_REDIS_RECHECK_SEC = 5.0
+
+BucketKey = Tuple[str, int]  # (level "m" | "h", bucket start in epoch seconds)
+
+
+def _epoch(ts: datetime) -> float:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat()
+
+
+def window_bucket_keys(window_minutes: int, now: float) -> List[BucketKey]:
+    """Hour buckets fully inside the window plus minute buckets at both edges.
+
+    A leading edge older than minute retention widens to its whole hour bucket.
+    """
+    start_min = int(now - window_minutes * MINUTE_SEC) // MINUTE_SEC * MINUTE_SEC
+    now_min = int(now) // MINUTE_SEC * MINUTE_SEC
+    oldest_minute = now_min - _RETENTION_SEC["m"] + MINUTE_SEC
+    if start_min < oldest_minute:
+        hour_from = start_min // HOUR_SEC * HOUR_SEC
+    else:
+        hour_from = -(-start_min // HOUR_SEC) * HOUR_SEC
+    hour_to = now_min // HOUR_SEC * HOUR_SEC
+
+    if hour_from >= hour_to:
+        return [("m", t) for t in range(start_min, now_min + 1, MINUTE_SEC)]
+    keys: List[BucketKey] = [("h", t) for t in range(hour_from, hour_to, HOUR_SEC)]
+    keys += [("m", t) for t in range(start_min, hour_from, MINUTE_SEC)]
+    keys += [("m", t) for t in range(hour_to, now_min + 1, MINUTE_SEC)]
+    return keys
+
+
+@dataclass
+class SiteDelta:
+    """Site activity in one bucket, for all clients or for a single one."""
+
+    counts: Counter = field(default_factory=Counter)
+    seen: Dict[str, float] = field(default_factory=dict)
+    first: Dict[str, float] = field(default_factory=dict)
+    subdomains: Dict[str, Set[str]] = field(default_factory=dict)
+    blocked_seen: Dict[str, float] = field(default_factory=dict)
+
+    def add(self, root: str, domain: str, ts: float, blocked: bool) -> None:
+        self.counts[root] += 1
+        if ts > self.seen.get(root, 0.0):
+            self.seen[root] = ts
+        if ts < self.first.get(root, ts + 1):
+            self.first[root] = ts
+        subdomains = self.subdomains.setdefault(root, set())
+        if len(subdomains) < _SUBDOMAIN_SAMPLE:
+            subdomains.add(domain)
+        if blocked and ts > self.blocked_seen.get(root, 0.0):
+            self.blocked_seen[root] = ts
+
+
+@dataclass
+class BucketDelta:
+    total: int = 0
+    blocked: int = 0
+    noise: int = 0
+    blocked_domains: Counter = field(default_factory=Counter)
+    clients: Counter = field(default_factory=Counter)
+    sites: SiteDelta = field(default_factory=SiteDelta)
+    client_sites: Dict[str, SiteDelta] = field(default_factory=lambda: defaultdict(SiteDelta))
+
+
+def bucket_deltas(prepared: Iterable[PreparedQuery]) -> Dict[BucketKey, BucketDelta]:
+    """Collapse a batch into one delta per minute and hour bucket it touches."""
+    deltas: Dict[BucketKey, BucketDelta] = defaultdict(BucketDelta)
+    for query, domain, root in prepared:
+        ts = _epoch(query.timestamp)
+        for level, size in _BUCKET_SEC.items():
+            delta = deltas[(level, int(ts) // size * size)]
+            delta.total += 1
+            delta.clients[query.client_ip] += 1
+            if query.blocked:
+                delta.blocked += 1
+                delta.blocked_domains[domain] += 1
+            if root is None:
+                delta.noise += 1
+                continue
+            delta.sites.add(root, domain, ts, query.blocked)
+            delta.client_sites[query.client_ip].add(root, domain, ts, query.blocked)
+    return deltas
+
+
+class WindowTotals(NamedTuple):
+    total: int
+    blocked: int
+    noise: int
+
+
+class SiteDetail(NamedTuple):
+    total_queries: int
+    blocked: bool
+    first_seen: Optional[float]
+    subdomains: List[str]
+
+
+@dataclass
+class WindowSummary:
+    total: int
+    blocked: int
+    noise: int
+    top_blocked: List[Tuple[str, int]]
+    top_clients: List[Tuple[str, int]]
+
+
+class _Caps(NamedTuple):
+    trim_at: int
+    keep: int
+    subdomains: int
+
+    @classmethod
+    def for_top_k(cls, top_k: int) -> "_Caps":
+        top_k = max(1, top_k)
+        return cls(top_k * _TRIM_FACTOR, top_k * _KEEP_FACTOR, top_k * _SUBDOMAIN_SAMPLE)
+
+
+def _touch(seen: "OrderedDict[str, float]", root: str, ts: float, cap: int) -> Optional[str]:
+    """Mark ``root`` seen; returns the least recently touched root if one was evicted."""
+    previous = seen.pop(root, 0.0)
+    seen[root] = max(ts, previous)
+    if len(seen) > cap:
+        return seen.popitem(last=False)[0]
+    return None
+
+
+class _MemorySites:
+    """A bucket's most recently seen sites (LRU at the cap); details are dropped with them."""
+
+    __slots__ = ("counts", "seen", "first", "subdomains", "blocked_seen")
+
+    def __init__(self) -> None:
+        self.counts: Dict[str, int] = {}
+        self.seen: "OrderedDict[str, float]" = OrderedDict()
+        self.first: Dict[str, float] = {}
+        self.subdomains: Dict[str, Set[str]] = {}
+        self.blocked_seen: "OrderedDict[str, float]" = OrderedDict()
+
+    def apply(self, delta: SiteDelta, cap: int) -> None:
+        for root, n in delta.counts.items():
+            evicted = _touch(self.seen, root, delta.seen[root], cap)
+            if evicted is not None:
+                self.counts.pop(evicted, None)
+                self.first.pop(evicted, None)
+                self.subdomains.pop(evicted, None)
+            self.counts[root] = self.counts.get(root, 0) + n
+            first = delta.first[root]
+            self.first[root] = min(first, self.first.get(root, first))
+            subdomains = self.subdomains.setdefault(root, set())
+            for domain in delta.subdomains[root]:
+                if len(subdomains) >= _SUBDOMAIN_SAMPLE:
+                    break
+                subdomains.add(domain)
+        for root, ts in delta.blocked_seen.items():
+            _touch(self.blocked_seen, root, ts, cap)
+
+
+class _MemoryBucket:
+    __slots__ = ("total", "blocked", "noise", "blocked_domains", "clients", "sites", "client_sites")
+
+    def __init__(self, top_k: int) -> None:
+        self.total = 0
+        self.blocked = 0
+        self.noise = 0
+        self.blocked_domains = SpaceSaving(top_k)
+        self.clients = SpaceSaving(top_k)
+        self.sites = _MemorySites()
+        self.client_sites: Dict[str, _MemorySites] = {}
+
+    def apply(self, delta: BucketDelta, site_cap: int, client_site_cap: int) -> None:
+        self.total += delta.total
+        self.blocked += delta.blocked
+        self.noise += delta.noise
+        for key, n in delta.blocked_domains.items():
+            self.blocked_domains.add(key, n)
+        for key, n in delta.clients.items():
+            self.clients.add(key, n)
+        self.sites.apply(delta.sites, site_cap)
+        for client_ip, sites in delta.client_sites.items():
+            self.client_sites.setdefault(client_ip, _MemorySites()).apply(sites, client_site_cap)
+
+
+class _MemoryWindowStore:
+    """Per-process ring of buckets, pruned past each level's retention."""
+
+    def __init__(self, top_k: int, client_top_k: int) -> None:
+        self._top_k = top_k
+        self._site_cap = _Caps.for_top_k(top_k).trim_at
+        self._client_site_cap = _Caps.for_top_k(client_top_k).trim_at
+        self._lock = threading.Lock()
+        self._buckets: Dict[BucketKey, _MemoryBucket] = {}
+
+    def apply(self, deltas: Dict[BucketKey, BucketDelta], now: float) -> None:
+        with self._lock:
+            for key, delta in deltas.items():
+                if key[1] + _BUCKET_SEC[key[0]] + _RETENTION_SEC[key[0]] < now:
+                    continue
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    bucket = self._buckets[key] = _MemoryBucket(self._top_k)
+                bucket.apply(delta, self._site_cap, self._client_site_cap)
+            expired = [
+                key for key in self._buckets
+                if key[1] + _BUCKET_SEC[key[0]] + _RETENTION_SEC[key[0]] < now
+            ]
+            for key in expired:
+                del self._buckets[key]
+
+    def _present(self, keys: List[BucketKey]) -> List[_MemoryBucket]:
+        return [self._buckets[key] for key in keys if key in self._buckets]
+
+    def _sites(self, keys: List[BucketKey], client_ip: Optional[str]) -> List[_MemorySites]:
+        buckets = self._present(keys)
+        if client_ip is None:
+            return [bucket.sites for bucket in buckets]
+        return [bucket.client_sites[client_ip] for bucket in buckets if client_ip in bucket.client_sites]
+
+    def totals(self, keys: List[BucketKey]) -> WindowTotals:
+        total = blocked = noise = 0
+        with self._lock:
+            for bucket in self._present(keys):
+                total += bucket.total
+                blocked += bucket.blocked
+                noise += bucket.noise
+        return WindowTotals(total, blocked, noise)
+
+    def summary(self, keys: List[BucketKey], top_n: int) -> WindowSummary:
+        blocked_domains: Counter = Counter()
+        clients: Counter = Counter()
+        total = blocked = noise = 0
+        with self._lock:
+            for bucket in self._present(keys):
+                total += bucket.total
+                blocked += bucket.blocked
+                noise += bucket.noise
+                blocked_domains.update(dict(bucket.blocked_domains.items()))
+                clients.update(dict(bucket.clients.items()))
+        return WindowSummary(
+            total, blocked, noise, blocked_domains.most_common(top_n), clients.most_common(top_n)
+        )
+
+    def recent_sites(
+        self, keys: List[BucketKey], limit: int, blocked_only: bool, client_ip: Optional[str] = None
+    ) -> Tuple[List[Tuple[str, float]], int]:
+        last_seen: Dict[str, float] = {}
+        with self._lock:
+            for sites in self._sites(keys, client_ip):
+                seen = sites.blocked_seen if blocked_only else sites.seen
+                for root, ts in seen.items():
+                    if ts > last_seen.get(root, 0.0):
+                        last_seen[root] = ts
+        return heapq.nlargest(limit, last_seen.items(), key=lambda kv: kv[1]), len(last_seen)
+
+    def site_details(
+        self, keys: List[BucketKey], roots: List[str], client_ip: Optional[str] = None
+    ) -> Dict[str, SiteDetail]:
+        details: Dict[str, SiteDetail] = {}
+        with self._lock:
+            views = self._sites(keys, client_ip)
+            for root in roots:
+                firsts = [v.first[root] for v in views if root in v.first]
+                subdomains: Set[str] = set()
+                for view in views:
+                    subdomains.update(view.subdomains.get(root, ()))
+                details[root] = SiteDetail(
+                    total_queries=sum(v.counts.get(root, 0) for v in views),
+                    blocked=any(root in v.blocked_seen for v in views),
+                    first_seen=min(firsts) if firsts else None,
+                    subdomains=sorted(subdomains),
+                )
+        return details
+
+
+def _redis_key(key: BucketKey, kind: str, client_ip: Optional[str] = None) -> str:
+    level, start = key
+    if client_ip is not None:
+        kind = f"c:{client_ip}:{kind}"
+    return f"{KEY_PREFIX}{level}:{start}:{kind}"
+
+
+def _subdomain_member(root: str, domain: str) -> str:
+    # Subdomain sets hold "root domain" members at score 0, so one site is a lex range.
+    return f"{root} {domain}"
+
+
+class _RedisWindowStore:
+    """Buckets shared by every worker; zsets trimmed with slack, merged with ZUNIONSTORE.
+
+    Trimming needs the set sizes, which come back with the write pipeline; a second
+    pipeline then trims only the sets over their high mark.
+    """
+
+    def __init__(self, client, top_k: int, client_top_k: int) -> None:
+        self._r = client
+        self._caps = _Caps.for_top_k(top_k)
+        self._client_caps = _Caps.for_top_k(client_top_k)
+
+    def apply(self, deltas: Dict[BucketKey, BucketDelta]) -> None:
+        pipe = self._r.pipeline(transaction=False)
+        sizes: List[Tuple[int, BucketKey, Optional[str], str]] = []  # (reply index, bucket, client, kind)
+
+        def size_of(key: BucketKey, client_ip: Optional[str], kind: str) -> None:
+            sizes.append((len(pipe), key, client_ip, kind))
+            pipe.zcard(_redis_key(key, kind, client_ip))
+
+        for key, delta in deltas.items():
+            ttl = _BUCKET_SEC[key[0]] + _RETENTION_SEC[key[0]]
+            totals = _redis_key(key, "totals")
+            pipe.hincrby(totals, "total", delta.total)
+            pipe.hincrby(totals, "blocked", delta.blocked)
+            pipe.hincrby(totals, "noise", delta.noise)
+            pipe.expire(totals, ttl)
+            for kind, counts in (("blocked", delta.blocked_domains), ("clients", delta.clients)):
+                if not counts:
+                    continue
+                zkey = _redis_key(key, kind)
+                for member, n in counts.items():
+                    pipe.zincrby(zkey, n, member)
+                pipe.expire(zkey, ttl)
+                size_of(key, None, kind)
+            for client_ip, sites in [(None, delta.sites), *delta.client_sites.items()]:
+                if not sites.counts:
+                    continue
+                counts_key = _redis_key(key, "sites", client_ip)
+                for root, n in sites.counts.items():
+                    pipe.zincrby(counts_key, n, root)
+                pipe.zadd(_redis_key(key, "seen", client_ip), sites.seen, gt=True)
+                pipe.zadd(_redis_key(key, "first", client_ip), sites.first, lt=True)
+                pipe.zadd(
+                    _redis_key(key, "subs", client_ip),
+                    {
+                        _subdomain_member(root, domain): 0
+                        for root, domains in sites.subdomains.items()
+                        for domain in domains
+                    },
+                    nx=True,
+                )
+                kinds = ["sites", "seen", "first", "subs"]
+                if sites.blocked_seen:
+                    pipe.zadd(_redis_key(key, "bseen", client_ip), sites.blocked_seen, gt=True)
+                    kinds.append("bseen")
+                for kind in kinds:
+                    pipe.expire(_redis_key(key, kind, client_ip), ttl)
+                # Counts and first-seen are trimmed along with "seen".
+                size_of(key, client_ip, "seen")
+                size_of(key, client_ip, "subs")
+                if sites.blocked_seen:
+                    size_of(key, client_ip, "bseen")
+        replies = pipe.execute()
+
+        oversized = []
+        for index, key, client_ip, kind in sizes:
+            caps = self._caps if client_ip is None else self._client_caps
+            if replies[index] > (caps.subdomains if kind == "subs" else caps.trim_at):
+                oversized.append((key, client_ip, kind, replies[index]))
+        if oversized:
+            self._trim(oversized)
+
+    def _trim(self, oversized: List[Tuple[BucketKey, Optional[str], str, int]]) -> None:
+        pipe = self._r.pipeline(transaction=False)
+        subdomain_sets = []
+        for key, client_ip, kind, size in oversized:
+            caps = self._caps if client_ip is None else self._client_caps
+            zkey = _redis_key(key, kind, client_ip)
+            if kind == "subs":
+                # No order worth keeping among subdomains: evict a random half.
+                subdomain_sets.append(zkey)
+                pipe.zrandmember(zkey, size - caps.subdomains // 2)
+                continue
+            pipe.zremrangebyrank(zkey, 0, -(caps.keep + 1))
+            if kind == "seen":
+                # Counts and first-seen follow the sites that stay (weight 0 keeps their own score).
+                ttl = _BUCKET_SEC[key[0]] + _RETENTION_SEC[key[0]]
+                for follower in ("sites", "first"):
+                    fkey = _redis_key(key, follower, client_ip)
+                    pipe.zinterstore(fkey, {fkey: 1, zkey: 0})
+                    pipe.expire(fkey, ttl)
+        replies = pipe.execute()
+        if subdomain_sets:
+            victims = [reply for reply in replies if isinstance(reply, list)]
+            pipe = self._r.pipeline(transaction=False)
+            for zkey, members in zip(subdomain_sets, victims):
+                if members:
+                    pipe.zrem(zkey, *members)
+            pipe.execute()
+
+    def totals(self, keys: List[BucketKey]) -> WindowTotals:
+        pipe = self._r.pipeline(transaction=False)
+        for key in keys:
+            pipe.hgetall(_redis_key(key, "totals"))
+        total = blocked = noise = 0
+        for totals in pipe.execute():
+            total += int(totals.get("total", 0))
+            blocked += int(totals.get("blocked", 0))
+            noise += int(totals.get("noise", 0))
+        return WindowTotals(total, blocked, noise)
+
+    def summary(self, keys: List[BucketKey], top_n: int) -> WindowSummary:
+        tmp_blocked = f"{KEY_PREFIX}tmp:{uuid4().hex}"
+        tmp_clients = f"{KEY_PREFIX}tmp:{uuid4().hex}"
+        pipe = self._r.pipeline()
+        for key in keys:
+            pipe.hgetall(_redis_key(key, "totals"))
+        pipe.zunionstore(tmp_blocked, [_redis_key(k, "blocked") for k in keys])
+        pipe.zrevrange(tmp_blocked, 0, top_n - 1, withscores=True)
+        pipe.zunionstore(tmp_clients, [_redis_key(k, "clients") for k in keys])
+        pipe.zrevrange(tmp_clients, 0, top_n - 1, withscores=True)
+        pipe.delete(tmp_blocked, tmp_clients)
+        results = pipe.execute()
+
+        total = blocked = noise = 0
+        for totals in results[: len(keys)]:
+            total += int(totals.get("total", 0))
+            blocked += int(totals.get("blocked", 0))
+            noise += int(totals.get("noise", 0))
+        top_blocked = [(m, int(score)) for m, score in results[len(keys) + 1]]
+        top_clients = [(m, int(score)) for m, score in results[len(keys) + 3]]
+        return WindowSummary(total, blocked, noise, top_blocked, top_clients)
+
+    def recent_sites(
+        self, keys: List[BucketKey], limit: int, blocked_only: bool, client_ip: Optional[str] = None
+    ) -> Tuple[List[Tuple[str, float]], int]:
+        tmp = f"{KEY_PREFIX}tmp:{uuid4().hex}"
+        kind = "bseen" if blocked_only else "seen"
+        pipe = self._r.pipeline()
+        pipe.zunionstore(tmp, [_redis_key(k, kind, client_ip) for k in keys], aggregate="MAX")
+        pipe.zrevrange(tmp, 0, limit - 1, withscores=True)
+        pipe.zcard(tmp)
+        pipe.delete(tmp)
+        _stored, recent, distinct, _deleted = pipe.execute()
+        return [(root, float(ts)) for root, ts in recent], int(distinct)
+
+    def site_details(
+        self, keys: List[BucketKey], roots: List[str], client_ip: Optional[str] = None
+    ) -> Dict[str, SiteDetail]:
+        if not roots:
+            return {}
+        pipe = self._r.pipeline(transaction=False)
+        for key in keys:
+            pipe.zmscore(_redis_key(key, "sites", client_ip), roots)
+            pipe.zmscore(_redis_key(key, "bseen", client_ip), roots)
+            pipe.zmscore(_redis_key(key, "first", client_ip), roots)
+        results = pipe.execute()
+        totals = [0] * len(roots)
+        blocked = [False] * len(roots)
+        first: List[Optional[float]] = [None] * len(roots)
+        held: List[Tuple[BucketKey, int]] = []  # buckets that hold each site
+        for i, key in enumerate(keys):
+            counts, blocked_seen, firsts = results[3 * i : 3 * i + 3]
+            for j in range(len(roots)):
+                totals[j] += int(counts[j] or 0)
+                blocked[j] = blocked[j] or blocked_seen[j] is not None
+                if firsts[j] is not None:
+                    first[j] = firsts[j] if first[j] is None else min(first[j], firsts[j])
+                    held.append((key, j))
+
+        subdomains: List[Set[str]] = [set() for _ in roots]
+        if held:
+            pipe = self._r.pipeline(transaction=False)
+            for key, j in held:
+                pipe.zrangebylex(
+                    _redis_key(key, "subs", client_ip),
+                    f"[{_subdomain_member(roots[j], '')}",
+                    f"({roots[j]}!",
+                    start=0,
+                    num=_SUBDOMAIN_SAMPLE,
+                )
+            for (_key, j), members in zip(held, pipe.execute()):
+                subdomains[j].update(member.split(" ", 1)[1] for member in members)
+        return {
+            root: SiteDetail(totals[j], blocked[j], first[j], sorted(subdomains[j]))
+            for j, root in enumerate(roots)
+        }
+
+
+class DnsLiveWindows:
+    """Live stats for recent windows, in Redis when available else in process."""
+
+    def __init__(self, top_k: Optional[int] = None, client_top_k: Optional[int] = None) -> None:
+        self._top_k = top_k or settings.DNS_LIVE_WINDOW_TOP_K
+        self._client_top_k = client_top_k or settings.DNS_LIVE_WINDOW_CLIENT_TOP_K
+        self._memory = _MemoryWindowStore(self._top_k, self._client_top_k)
+        self._redis_up = False
+        self._redis_checked_at: Optional[float] = None
+
+    def _redis_enabled(self) -> bool:
+        if not settings.DNS_LIVE_WINDOWS_REDIS_ENABLED:
+            return False
+        checked_at = self._redis_checked_at
+        if checked_at is None or time.monotonic() - checked_at >= _REDIS_RECHECK_SEC:
+            self._redis_up = redis_reachable()
+            self._redis_checked_at = time.monotonic()
+        return self._redis_up
+
+    def _mark_redis_down(self) -> None:
+        self._redis_up = False
+        self._redis_checked_at = time.monotonic()
+
+    def _store(self):
+        if self._redis_enabled():
+            return _RedisWindowStore(get_redis(), self._top_k, self._client_top_k)
+        return self._memory
+
+    def record(self, prepared: List[PreparedQuery], now: Optional[float] = None) -> None:
+        deltas = bucket_deltas(prepared)
+        if not deltas:
+            return
+        store = self._store()
+        if isinstance(store, _RedisWindowStore):
+            try:
+                store.apply(deltas)
+                return
+            except Exception as exc:
+                self._mark_redis_down()
+                logger.warning(
+                    "Redis live DNS stats write failed",
+                    extra=structured_extra("dns_live_windows_redis_write_failed", error=str(exc)),
+                )
+        self._memory.apply(deltas, now if now is not None else time.time())
+
+    def _read(self, read: Callable[[Any], Any]) -> Any:
+        """Run ``read`` against the current store, falling back to memory on Redis errors."""
+        store = self._store()
+        if isinstance(store, _RedisWindowStore):
+            try:
+                return read(store)
+            except redis.RedisError as exc:
+                self._mark_redis_down()
+                logger.warning(
+                    "Redis live DNS stats read failed",
+                    extra=structured_extra("dns_live_windows_redis_read_failed", error=str(exc)),
+                )
+        return read(self._memory)
+
+    @staticmethod
+    def _window(window_minutes: Optional[int]) -> int:
+        minutes = window_minutes or settings.DNS_LIVE_WINDOW_DEFAULT_MINUTES
+        return max(1, min(int(minutes), MAX_WINDOW_MINUTES))
+
+    def get_stats(self, window_minutes: Optional[int] = None, now: Optional[float] = None) -> dict:
+        minutes = self._window(window_minutes)
+        now = now if now is not None else time.time()
+        keys = window_bucket_keys(minutes, now)
+        summary = self._read(lambda store: store.summary(keys, top_n=10))
+        total, blocked = summary.total, summary.blocked
+        return {
+            "total_queries": total,
+            "blocked_queries": blocked,
+            "allowed_queries": total - blocked,
+            "block_rate": round((blocked / total * 100), 2) if total > 0 else 0,
+            "top_blocked_domains": [{"domain": d, "count": c} for d, c in summary.top_blocked],
+            "top_clients": [{"client_ip": ip, "count": c} for ip, c in summary.top_clients],
+            "period": {
+                "start": _iso(now - minutes * MINUTE_SEC),
+                "end": _iso(now),
+            },
+            "window_minutes": minutes,
+            "source": "live",
+        }
+
+    def get_grouped_sites(
+        self,
+        *,
+        client_ip: Optional[str] = None,
+        window_minutes: Optional[int] = None,
+        blocked_only: bool = False,
+        limit: int = 50,
+        now: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Most recently seen sites in the window, for every client or just ``client_ip``.
+
+        Noise domains are never indexed as sites (noise is always filtered); they are
+        only counted in ``noise_filtered``, which is not broken down per client.
+        """
+        minutes = self._window(window_minutes)
+        now = now if now is not None else time.time()
+        keys = window_bucket_keys(minutes, now)
+
+        def read(store):
+            recent, distinct = store.recent_sites(keys, limit, blocked_only, client_ip)
+            details = store.site_details(keys, [root for root, _ts in recent], client_ip)
+            return recent, distinct, details, store.totals(keys).noise
+
+        recent, distinct, details, noise = self._read(read)
+
+        sites = []
+        for root, last_seen in recent:
+            detail = details[root]
+            sites.append(
+                {
+                    "root_domain": root,
+                    "total_queries": detail.total_queries,
+                    "subdomains": detail.subdomains,
+                    "last_seen": _iso(last_seen),
+                    "first_seen": _iso(detail.first_seen) if detail.first_seen is not None else None,
+                    "blocked": detail.blocked,
+                }
+            )
+        return {
+            "sites": sites,
+            "total_sites": distinct,
+            "noise_filtered": noise,
+            "period": {
+                "start": _iso(now - minutes * MINUTE_SEC),
+                "end": _iso(now),
+            },
+            "window_minutes": minutes,
+            "source": "live",
+        }
+
+
+live_windows = DnsLiveWindows()
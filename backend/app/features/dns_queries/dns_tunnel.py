@@ -0,0 +1,190 @@
+"""Streaming DNS tunneling heuristics over per-(client, root) sliding windows.
+
+Tunnels (iodine, dnscat2, DNS exfiltration) push data through many unique, long
+subdomains of one root, often with TXT/NULL query types. For each
+(client_ip, root) pair this keeps, over the last ``DNS_TUNNEL_WINDOW_SEC``:
+
+- the distinct subdomain prefixes seen (capped, least recently seen dropped first),
+- the count and total length of subdomain prefixes ("encoded bytes"),
+- how many queries were TXT / NULL.
+
+Everything lives in memory and is bounded (``DNS_TUNNEL_MAX_KEYS`` pairs, each with
+at most ``_MAX_EVENTS`` events and ``_MAX_SUBDOMAINS`` prefixes), so the detector
+runs at ingest rate without touching the database. A pair is reported at most once
+per ``DNS_TUNNEL_ALERT_COOLDOWN_SEC``.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Deque, List, Optional, Tuple
+
+from app.features.dns_queries.schemas.dns_query import DnsQueryCreate
+from app.shared.config import settings
+from app.shared.domain_utils import extract_root_domain, is_noise_domain
+
+_MAX_EVENTS = 2048
+_MAX_SUBDOMAINS = 1024
+_TUNNEL_QUERY_TYPES = frozenset({"TXT", "NULL"})
+_MIN_MEAN_PREFIX_LENGTH = 20.0
+_MIN_TXT_NULL_RATIO = 0.5
+
+
+@dataclass
+class TunnelSuspicion:
+    client_ip: str
+    root_domain: str
+    domain: str  # most recent query name for the pair
+    timestamp: datetime
+    unique_subdomains: int
+    queries: int
+    encoded_bytes: int
+    mean_prefix_length: float
+    txt_null_ratio: float
+
+    def message(self) -> str:
+        return (
+            f"Possible DNS tunnel via {self.root_domain}: {self.unique_subdomains} unique subdomains, "
+            f"~{self.encoded_bytes} bytes encoded in {self.queries} queries "
+            f"(mean prefix {self.mean_prefix_length:.0f} chars, {self.txt_null_ratio:.0%} TXT/NULL)"
+        )
+
+
+def _epoch(ts: datetime) -> float:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+@dataclass
+class _PairWindow:
+    # (ts, prefix length, TXT/NULL) per query, oldest first
+    events: Deque[Tuple[float, int, bool]] = field(default_factory=deque)
+    encoded_bytes: int = 0
+    txt_null: int = 0
+    # prefix -> last seen ts, least recently seen first
+    prefixes: "OrderedDict[str, float]" = field(default_factory=OrderedDict)
+    last_alert: float = float("-inf")
+
+    def add(self, ts: float, prefix: str, tunnel_type: bool) -> None:
+        self.events.append((ts, len(prefix), tunnel_type))
+        self.encoded_bytes += len(prefix)
+        self.txt_null += tunnel_type
+        if len(self.events) > _MAX_EVENTS:
+            self._drop_oldest_event()
+
+        self.prefixes.pop(prefix, None)
+        self.prefixes[prefix] = ts
+        if len(self.prefixes) > _MAX_SUBDOMAINS:
+            self.prefixes.popitem(last=False)
+
+    def expire(self, cutoff: float) -> None:
+        while self.events and self.events[0][0] < cutoff:
+            self._drop_oldest_event()
+        while self.prefixes:
+            oldest = next(iter(self.prefixes.values()))
+            if oldest >= cutoff:
+                break
+            self.prefixes.popitem(last=False)
+
+    def _drop_oldest_event(self) -> None:
+        _ts, length, tunnel_type = self.events.popleft()
+        self.encoded_bytes -= length
+        self.txt_null -= tunnel_type
+
+
+class DnsTunnelDetector:
+    """Thread-safe; ``observe`` is called once per ingest batch."""
+
+    def __init__(
+        self,
+        *,
+        window_sec: Optional[float] = None,
+        min_unique_subdomains: Optional[int] = None,
+        min_encoded_bytes: Optional[int] = None,
+        cooldown_sec: Optional[float] = None,
+        max_keys: Optional[int] = None,
+    ) -> None:
+        self._window = window_sec or settings.DNS_TUNNEL_WINDOW_SEC
+        self._min_unique = min_unique_subdomains or settings.DNS_TUNNEL_MIN_UNIQUE_SUBDOMAINS
+        self._min_bytes = min_encoded_bytes or settings.DNS_TUNNEL_MIN_ENCODED_BYTES
+        self._cooldown = settings.DNS_TUNNEL_ALERT_COOLDOWN_SEC if cooldown_sec is None else cooldown_sec
+        self._max_keys = max(1, max_keys or settings.DNS_TUNNEL_MAX_KEYS)
+        self._lock = threading.Lock()
+        self._pairs: "OrderedDict[Tuple[str, str], _PairWindow]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._pairs)
+
+    def observe(self, queries: List[DnsQueryCreate]) -> List[TunnelSuspicion]:
+        parsed = []
+        for query in queries:
+            domain = query.domain.lower().rstrip(".")
+            if is_noise_domain(domain):
+                continue
+            root = extract_root_domain(domain)
+            prefix = domain[: -len(root)].rstrip(".") if domain != root else ""
+            tunnel_type = (query.query_type or "").upper() in _TUNNEL_QUERY_TYPES
+            parsed.append((query, domain, root, prefix, tunnel_type))
+
+        suspicions: List[TunnelSuspicion] = []
+        touched = {}
+        with self._lock:
+            for query, domain, root, prefix, tunnel_type in parsed:
+                key = (query.client_ip, root)
+                window = self._pairs.get(key)
+                if window is None:
+                    window = self._pairs[key] = _PairWindow()
+                    if len(self._pairs) > self._max_keys:
+                        self._pairs.popitem(last=False)
+                else:
+                    self._pairs.move_to_end(key)
+                ts = _epoch(query.timestamp)
+                window.add(ts, prefix, tunnel_type)
+                touched[key] = (window, query, domain, ts)
+
+            for key, (window, query, domain, ts) in touched.items():
+                suspicion = self._evaluate(key, window, query, domain, ts)
+                if suspicion is not None:
+                    suspicions.append(suspicion)
+        return suspicions
+
+    def _evaluate(
+        self,
+        key: Tuple[str, str],
+        window: _PairWindow,
+        query: DnsQueryCreate,
+        domain: str,
+        ts: float,
+    ) -> Optional[TunnelSuspicion]:
+        window.expire(ts - self._window)
+        unique = len(window.prefixes)
+        if unique < self._min_unique or window.encoded_bytes < self._min_bytes:
+            return None
+        if ts - window.last_alert < self._cooldown:
+            return None
+
+        count = len(window.events)
+        mean_prefix = window.encoded_bytes / count
+        txt_null_ratio = window.txt_null / count
+        if mean_prefix < _MIN_MEAN_PREFIX_LENGTH and txt_null_ratio < _MIN_TXT_NULL_RATIO:
+            return None
+
+        window.last_alert = ts
+        return TunnelSuspicion(
+            client_ip=key[0],
+            root_domain=key[1],
+            domain=domain,
+            timestamp=query.timestamp,
+            unique_subdomains=unique,
+            queries=count,
+            encoded_bytes=window.encoded_bytes,
+            mean_prefix_length=mean_prefix,
+            txt_null_ratio=txt_null_ratio,
+        )
+
+
+tunnel_detector = DnsTunnelDetector()
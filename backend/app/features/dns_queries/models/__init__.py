@@ -1,3 +1,4 @@
 from .dns_query import DnsQuery
+from .dns_stats_rollup import DnsStatsHour, DnsStatsMinute
 
-__all__ = ["DnsQuery"]
+__all__ = ["DnsQuery", "DnsStatsHour", "DnsStatsMinute"]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index
 from datetime import datetime, timezone
 from app.shared.database import Base
 
@@ -14,3 +14,12 @@ class DnsQuery(Base):
     action = Column(String(20), nullable=True)  # forwarded, blocked, cached
     blocked = Column(Boolean, default=False, nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        # Covering index for range stats: PostgreSQL can answer get_stats with an index-only scan.
+        Index(
+            "ix_dns_queries_ts_stats",
+            "timestamp",
+            postgresql_include=["blocked", "client_ip", "domain"],
+        ),
+    )
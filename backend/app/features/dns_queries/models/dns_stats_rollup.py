@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from app.shared.database import Base
+
+# Rollup dimensions: every query counts once under "client"; blocked queries also
+# count under "blocked_domain".
+DIMENSION_CLIENT = "client"
+DIMENSION_BLOCKED_DOMAIN = "blocked_domain"
+
+
+class DnsStatsMinute(Base):
+    __tablename__ = "dns_stats_minute"
+
+    id = Column(Integer, primary_key=True, index=True)
+    bucket_start = Column(DateTime(timezone=True), nullable=False, index=True)
+    dimension = Column(String(16), nullable=False)
+    key = Column(String(255), nullable=False)
+    query_count = Column(Integer, nullable=False, default=0)
+    blocked_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("bucket_start", "dimension", "key", name="uq_dns_stats_minute_bucket_dim_key"),
+    )
+
+
+class DnsStatsHour(Base):
+    __tablename__ = "dns_stats_hour"
+
+    id = Column(Integer, primary_key=True, index=True)
+    bucket_start = Column(DateTime(timezone=True), nullable=False, index=True)
+    dimension = Column(String(16), nullable=False)
+    key = Column(String(255), nullable=False)
+    query_count = Column(Integer, nullable=False, default=0)
+    blocked_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("bucket_start", "dimension", "key", name="uq_dns_stats_hour_bucket_dim_key"),
+    )
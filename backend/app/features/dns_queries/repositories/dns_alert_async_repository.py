@@ -0,0 +1,32 @@
+from typing import List, Optional
+
+from sqlalchemy import desc, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.features.dns_queries.models.dns_alert import DnsAlert
+from app.features.dns_queries.repositories.dns_alert_repository import alert_filters
+
+
+class AsyncDnsAlertRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_recent(
+        self,
+        *,
+        page: int = 1,
+        page_size: int = 50,
+        alert_type: Optional[str] = None,
+        client_ip: Optional[str] = None,
+        days: int = 90,
+    ) -> tuple[List[DnsAlert], int]:
+        clauses = alert_filters(alert_type=alert_type, client_ip=client_ip, days=days)
+        total = await self.db.scalar(select(func.count()).select_from(DnsAlert).where(*clauses))
+        result = await self.db.scalars(
+            select(DnsAlert)
+            .where(*clauses)
+            .order_by(desc(DnsAlert.timestamp))
+            .offset((page - 1) * page_size)
+            .limit(page_size)
+        )
+        return list(result), int(total or 0)
@@ -5,6 +5,22 @@ from datetime import datetime, timedelta, timezone
 from app.features.dns_queries.models.dns_alert import DnsAlert
 
 
+def alert_filters(
+    *,
+    alert_type: Optional[str] = None,
+    client_ip: Optional[str] = None,
+    days: int = 90,
+) -> list:
+    """WHERE clauses shared by the sync and async alert listings."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    clauses = [DnsAlert.timestamp >= cutoff]
+    if alert_type:
+        clauses.append(DnsAlert.alert_type == alert_type)
+    if client_ip:
+        clauses.append(DnsAlert.client_ip == client_ip)
+    return clauses
+
+
 class DnsAlertRepository:
     def __init__(self, db: Session):
         self.db = db
@@ -44,12 +60,9 @@ class DnsAlertRepository:
         client_ip: Optional[str] = None,
         days: int = 90,
     ) -> tuple[List[DnsAlert], int]:
-        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-        query = self.db.query(DnsAlert).filter(DnsAlert.timestamp >= cutoff)
-        if alert_type:
-            query = query.filter(DnsAlert.alert_type == alert_type)
-        if client_ip:
-            query = query.filter(DnsAlert.client_ip == client_ip)
+        query = self.db.query(DnsAlert).filter(
+            *alert_filters(alert_type=alert_type, client_ip=client_ip, days=days)
+        )
         total = query.count()
         offset = (page - 1) * page_size
         items = (
@@ -0,0 +1,62 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import desc, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.features.dns_queries.models.dns_query import DnsQuery
+from app.features.dns_queries.repositories.dns_query_repository import DnsQueryRepository, dns_query_filters
+from app.features.dns_queries.repositories.dns_stats_rollup_repository import DnsStatsRollupRepository
+
+
+class AsyncDnsQueryRepository:
+    """Async variants of the hot DNS read paths (list and stats).
+
+    List pages are native async selects. Stats reuse the sync repositories
+    through ``AsyncSession.run_sync``: the SQL is awaited on the async connection,
+    so the event loop is not blocked while PostgreSQL aggregates.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_all(
+        self,
+        page: int = 1,
+        page_size: int = 50,
+        domain_search: Optional[str] = None,
+        client_ip: Optional[str] = None,
+        blocked_only: bool = False,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> tuple[List[DnsQuery], int]:
+        clauses = dns_query_filters(domain_search, client_ip, blocked_only, start_date, end_date)
+        total = await self.db.scalar(select(func.count()).select_from(DnsQuery).where(*clauses))
+        result = await self.db.scalars(
+            select(DnsQuery)
+            .where(*clauses)
+            .order_by(desc(DnsQuery.timestamp))
+            .offset((page - 1) * page_size)
+            .limit(page_size)
+        )
+        return list(result), int(total or 0)
+
+    async def get_stats(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> Dict:
+        return await self.db.run_sync(
+            lambda session: DnsQueryRepository(session).get_stats(start_date=start_date, end_date=end_date)
+        )
+
+    async def get_rollup_stats(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> Dict:
+        return await self.db.run_sync(
+            lambda session: DnsStatsRollupRepository(session).get_stats(
+                start_date=start_date, end_date=end_date
+            )
+        )
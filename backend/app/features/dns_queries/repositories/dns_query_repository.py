@@ -1,13 +1,37 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import List, Optional, Dict, Any
+from sqlalchemy import and_, case, desc, func, or_, select, tuple_
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Dict, Any
 from datetime import datetime, timedelta, timezone
 from collections import defaultdict
 from app.features.dns_queries.models.dns_query import DnsQuery
 from app.features.dns_queries.schemas.dns_query import DnsQueryCreate
+from app.shared.database import lift_statement_timeout
 from app.shared.domain_utils import extract_root_domain, is_noise_domain
 
 
+def dns_query_filters(
+    domain_search: Optional[str] = None,
+    client_ip: Optional[str] = None,
+    blocked_only: bool = False,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> list:
+    """WHERE clauses shared by the sync and async DNS query listings."""
+    clauses = []
+    if domain_search:
+        clauses.append(DnsQuery.domain.ilike(f"%{domain_search}%"))
+    if client_ip:
+        clauses.append(DnsQuery.client_ip == client_ip)
+    if blocked_only:
+        clauses.append(DnsQuery.blocked == True)
+    if start_date:
+        clauses.append(DnsQuery.timestamp >= start_date)
+    if end_date:
+        clauses.append(DnsQuery.timestamp <= end_date)
+    return clauses
+
+
 class DnsQueryRepository:
     def __init__(self, db: Session):
         self.db = db
@@ -43,6 +67,18 @@ class DnsQueryRepository:
         self.db.commit()
         return len(dns_queries)
 
+    def _filtered_query(
+        self,
+        domain_search: Optional[str] = None,
+        client_ip: Optional[str] = None,
+        blocked_only: bool = False,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ):
+        return self.db.query(DnsQuery).filter(
+            *dns_query_filters(domain_search, client_ip, blocked_only, start_date, end_date)
+        )
+
     def get_all(
         self,
         page: int = 1,
@@ -54,19 +90,13 @@ class DnsQueryRepository:
         end_date: Optional[datetime] = None
     ) -> tuple[List[DnsQuery], int]:
         """Get paginated DNS queries with optional filters."""
-        query = self.db.query(DnsQuery)
-
-        # Apply filters
-        if domain_search:
-            query = query.filter(DnsQuery.domain.ilike(f"%{domain_search}%"))
-        if client_ip:
-            query = query.filter(DnsQuery.client_ip == client_ip)
-        if blocked_only:
-            query = query.filter(DnsQuery.blocked == True)
-        if start_date:
-            query = query.filter(DnsQuery.timestamp >= start_date)
-        if end_date:
-            query = query.filter(DnsQuery.timestamp <= end_date)
+        query = self._filtered_query(
+            domain_search=domain_search,
+            client_ip=client_ip,
+            blocked_only=blocked_only,
+            start_date=start_date,
+            end_date=end_date,
+        )
 
         # Get total count
         total = query.count()
@@ -77,43 +107,82 @@ class DnsQueryRepository:
 
         return items, total
 
+    def iter_filtered(
+        self,
+        domain_search: Optional[str] = None,
+        client_ip: Optional[str] = None,
+        blocked_only: bool = False,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[DnsQuery]:
+        """Stream DNS queries matching the get_all filters, oldest first.
+
+        ``yield_per`` opens a server-side cursor on PostgreSQL, so only ``batch_size``
+        rows are buffered at a time regardless of how many match.
+        """
+        query = self._filtered_query(
+            domain_search=domain_search,
+            client_ip=client_ip,
+            blocked_only=blocked_only,
+            start_date=start_date,
+            end_date=end_date,
+        )
+        return iter(query.order_by(DnsQuery.timestamp, DnsQuery.id).yield_per(batch_size))
+
     def get_stats(
         self,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        end_date: Optional[datetime] = None,
+        top_n: int = 10,
     ) -> dict:
-        """Get statistics about DNS queries."""
+        """Get statistics about DNS queries in a single scan of the date range.
+
+        On PostgreSQL one ``GROUPING SETS ((), (client_ip), (domain))`` query yields the
+        grand total, per-client and per-domain counts (blocked via ``COUNT(*) FILTER``),
+        and a ``ROW_NUMBER()`` window keeps only the top ``top_n`` rows of each set.
+        Other dialects (SQLite in tests) fall back to a per-client and a per-blocked-domain
+        GROUP BY; totals are summed from the per-client rows.
+        """
         if not start_date:
             start_date = datetime.now(timezone.utc) - timedelta(days=1)
         if not end_date:
             end_date = datetime.now(timezone.utc)
 
-        query = self.db.query(DnsQuery).filter(
-            DnsQuery.timestamp >= start_date,
-            DnsQuery.timestamp <= end_date
-        )
+        in_range = and_(DnsQuery.timestamp >= start_date, DnsQuery.timestamp <= end_date)
+        blocked_count = func.count().filter(DnsQuery.blocked.is_(True))
 
-        total_queries = query.count()
-        blocked_queries = query.filter(DnsQuery.blocked == True).count()
-        
-        # Top blocked domains
-        top_blocked = self.db.query(
-            DnsQuery.domain,
-            func.count(DnsQuery.id).label('count')
-        ).filter(
-            DnsQuery.timestamp >= start_date,
-            DnsQuery.timestamp <= end_date,
-            DnsQuery.blocked == True
-        ).group_by(DnsQuery.domain).order_by(desc('count')).limit(10).all()
-
-        # Top clients
-        top_clients = self.db.query(
-            DnsQuery.client_ip,
-            func.count(DnsQuery.id).label('count')
-        ).filter(
-            DnsQuery.timestamp >= start_date,
-            DnsQuery.timestamp <= end_date
-        ).group_by(DnsQuery.client_ip).order_by(desc('count')).limit(10).all()
+        bind = self.db.get_bind()
+        if bind is not None and bind.dialect.name == "postgresql":
+            total_queries, blocked_queries, top_blocked, top_clients = self._stats_grouping_sets(
+                in_range, blocked_count, top_n
+            )
+        else:
+            client_rows = (
+                self.db.query(
+                    DnsQuery.client_ip,
+                    func.count().label("total"),
+                    blocked_count.label("blocked"),
+                )
+                .filter(in_range)
+                .group_by(DnsQuery.client_ip)
+                .all()
+            )
+            total_queries = sum(int(r.total) for r in client_rows)
+            blocked_queries = sum(int(r.blocked) for r in client_rows)
+            top_clients = [
+                (r.client_ip, int(r.total))
+                for r in sorted(client_rows, key=lambda r: (-r.total, r.client_ip))[:top_n]
+            ]
+            top_blocked = [
+                (domain, int(count))
+                for domain, count in self.db.query(DnsQuery.domain, func.count().label("count"))
+                .filter(in_range, DnsQuery.blocked.is_(True))
+                .group_by(DnsQuery.domain)
+                .order_by(desc("count"), DnsQuery.domain)
+                .limit(top_n)
+                .all()
+            ]
 
         return {
             "total_queries": total_queries,
@@ -128,6 +197,49 @@ class DnsQueryRepository:
             }
         }
 
+    def _stats_grouping_sets(self, in_range, blocked_count, top_n: int):
+        # GROUPING(client_ip, domain): 3 = grand total, 1 = per client, 2 = per domain.
+        grouping = func.grouping(DnsQuery.client_ip, DnsQuery.domain)
+        grouped = (
+            select(
+                DnsQuery.client_ip,
+                DnsQuery.domain,
+                grouping.label("grp"),
+                func.count().label("total"),
+                blocked_count.label("blocked"),
+            )
+            .where(in_range)
+            .group_by(
+                func.grouping_sets(tuple_(), tuple_(DnsQuery.client_ip), tuple_(DnsQuery.domain))
+            )
+            .subquery()
+        )
+        rank_by = case((grouped.c.grp == 2, grouped.c.blocked), else_=grouped.c.total)
+        ranked = select(
+            grouped,
+            func.row_number()
+            .over(partition_by=grouped.c.grp, order_by=(rank_by.desc(), grouped.c.client_ip, grouped.c.domain))
+            .label("rank"),
+        ).subquery()
+        rows = self.db.execute(
+            select(ranked).where(
+                ranked.c.rank <= top_n,
+                or_(ranked.c.grp != 2, ranked.c.blocked > 0),
+            )
+        ).all()
+
+        total_queries = blocked_queries = 0
+        top_blocked: List[tuple] = []
+        top_clients: List[tuple] = []
+        for row in sorted(rows, key=lambda r: r.rank):
+            if row.grp == 3:
+                total_queries, blocked_queries = int(row.total), int(row.blocked)
+            elif row.grp == 1:
+                top_clients.append((row.client_ip, int(row.total)))
+            elif row.grp == 2:
+                top_blocked.append((row.domain, int(row.blocked)))
+        return total_queries, blocked_queries, top_blocked, top_clients
+
     def get_unique_clients(self) -> List[str]:
         """Get list of unique client IPs."""
         result = self.db.query(DnsQuery.client_ip).distinct().all()
@@ -136,10 +248,38 @@ class DnsQueryRepository:
     def delete_old_records(self, days: int = 30) -> int:
         """Delete records older than specified days. Returns count of deleted records."""
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
+        lift_statement_timeout(self.db)
         count = self.db.query(DnsQuery).filter(DnsQuery.timestamp < cutoff_date).delete()
         self.db.commit()
         return count
 
+    def iter_older_than(self, cutoff: datetime, batch_size: int = 1000) -> Iterator[DnsQuery]:
+        """Stream rows older than cutoff in timestamp order (for archival)."""
+        lift_statement_timeout(self.db)
+        query = (
+            self.db.query(DnsQuery)
+            .filter(DnsQuery.timestamp < cutoff)
+            .order_by(DnsQuery.timestamp, DnsQuery.id)
+        )
+        return iter(query.yield_per(batch_size))
+
+    def delete_by_ids(self, ids: Iterable[int], batch_size: int = 1000) -> int:
+        """Delete exactly the given rows (the ones an archive pass wrote), ``batch_size`` ids per statement."""
+        ids = iter(ids)
+        count = 0
+        lift_statement_timeout(self.db)
+        while True:
+            chunk = list(islice(ids, batch_size))
+            if not chunk:
+                break
+            count += (
+                self.db.query(DnsQuery)
+                .filter(DnsQuery.id.in_(chunk))
+                .delete(synchronize_session=False)
+            )
+        self.db.commit()
+        return count
+
     def get_grouped_by_site(
         self,
         start_date: Optional[datetime] = None,
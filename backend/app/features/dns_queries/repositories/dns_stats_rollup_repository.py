@@ -0,0 +1,252 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple, Type, Union
+
+from sqlalchemy import func, select, union_all
+from sqlalchemy.orm import Session
+
+from app.features.dns_queries.models.dns_stats_rollup import (
+    DIMENSION_BLOCKED_DOMAIN,
+    DIMENSION_CLIENT,
+    DnsStatsHour,
+    DnsStatsMinute,
+)
+from app.features.dns_queries.schemas.dns_query import DnsQueryCreate
+from app.shared.config import settings
+from app.shared.database import lift_statement_timeout
+
+RollupModel = Type[Union[DnsStatsMinute, DnsStatsHour]]
+RollupKey = Tuple[datetime, str, str]
+
+
+def _as_utc(ts: datetime) -> datetime:
+    if ts.tzinfo is None:
+        return ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc)
+
+
+def _minute_bucket(ts: datetime) -> datetime:
+    return _as_utc(ts).replace(second=0, microsecond=0)
+
+
+def _hour_bucket(ts: datetime) -> datetime:
+    return _as_utc(ts).replace(minute=0, second=0, microsecond=0)
+
+
+def _ceil_hour(ts: datetime) -> datetime:
+    floor = _hour_bucket(ts)
+    return floor if floor == _as_utc(ts) else floor + timedelta(hours=1)
+
+
+class DnsStatsRollupRepository:
+    """Per-minute and per-hour DNS counters maintained at ingest time.
+
+    Range queries sum whole hours from ``dns_stats_hour`` and the ragged edges
+    from ``dns_stats_minute``, so cost depends on the range length in buckets,
+    not on how many raw rows ``dns_queries`` holds.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record_batch(self, queries: List[DnsQueryCreate]) -> None:
+        """Add a DNS ingest batch to both rollup tables (caller commits).
+
+        Upserts take row locks on shared hot rows, so callers run this last, just
+        before committing.
+        """
+        if not queries:
+            return
+
+        minute_deltas: Dict[RollupKey, List[int]] = defaultdict(lambda: [0, 0])
+        for q in queries:
+            bucket = _minute_bucket(q.timestamp)
+            blocked = 1 if q.blocked else 0
+            domain = q.domain.lower()
+
+            delta = minute_deltas[(bucket, DIMENSION_CLIENT, q.client_ip)]
+            delta[0] += 1
+            delta[1] += blocked
+
+            if q.blocked:
+                delta = minute_deltas[(bucket, DIMENSION_BLOCKED_DOMAIN, domain[:255])]
+                delta[0] += 1
+                delta[1] += 1
+
+        hour_deltas: Dict[RollupKey, List[int]] = defaultdict(lambda: [0, 0])
+        for (bucket, dimension, key), (count, blocked) in minute_deltas.items():
+            delta = hour_deltas[(_hour_bucket(bucket), dimension, key)]
+            delta[0] += count
+            delta[1] += blocked
+
+        self._upsert(DnsStatsMinute, minute_deltas)
+        self._upsert(DnsStatsHour, hour_deltas)
+
+    def _upsert(self, model: RollupModel, deltas: Dict[RollupKey, List[int]]) -> None:
+        # Key order, so concurrent ingest batches lock shared hot rows in the same order.
+        rows = sorted(deltas.items())
+        bind = self.db.get_bind()
+        if bind is not None and bind.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+
+            stmt = insert(model).values(
+                [
+                    {
+                        "bucket_start": bucket,
+                        "dimension": dimension,
+                        "key": key,
+                        "query_count": count,
+                        "blocked_count": blocked,
+                    }
+                    for (bucket, dimension, key), (count, blocked) in rows
+                ]
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[model.bucket_start, model.dimension, model.key],
+                set_={
+                    "query_count": model.query_count + stmt.excluded.query_count,
+                    "blocked_count": model.blocked_count + stmt.excluded.blocked_count,
+                },
+            )
+            self.db.execute(stmt)
+            return
+
+        buckets = {bucket for bucket, _dimension, _key in deltas}
+        existing = {
+            (_as_utc(row.bucket_start), row.dimension, row.key): row
+            for row in self.db.query(model).filter(model.bucket_start.in_(buckets)).all()
+        }
+        for rollup_key, (count, blocked) in rows:
+            row = existing.get(rollup_key)
+            if row is not None:
+                row.query_count += count
+                row.blocked_count += blocked
+                continue
+            bucket, dimension, key = rollup_key
+            self.db.add(
+                model(
+                    bucket_start=bucket,
+                    dimension=dimension,
+                    key=key,
+                    query_count=count,
+                    blocked_count=blocked,
+                )
+            )
+        self.db.flush()
+
+    def _range_selects(self, start_date: datetime, end_date: datetime) -> list:
+        """Select (dimension, key, query_count, blocked_count) rows covering the range.
+
+        Whole hours come from the hour table; partial hours at either edge come from
+        the minute table. Edges older than the minute retention window fall back to
+        whole hours so long-range queries keep working after minute rows are pruned.
+        """
+        now = datetime.now(timezone.utc)
+        minute_cutoff = _minute_bucket(
+            now - timedelta(hours=settings.DNS_STATS_MINUTE_RETENTION_HOURS)
+        )
+        start = _minute_bucket(start_date)
+        end = _as_utc(end_date)
+
+        hour_from = _hour_bucket(start) if start < minute_cutoff else _ceil_hour(start)
+        hour_to = _ceil_hour(end) if end < minute_cutoff else _hour_bucket(end)
+
+        def _select(model: RollupModel, lower: datetime, upper: datetime, *, inclusive: bool):
+            upper_clause = model.bucket_start <= upper if inclusive else model.bucket_start < upper
+            return self.db.query(
+                model.dimension.label("dimension"),
+                model.key.label("key"),
+                model.query_count.label("query_count"),
+                model.blocked_count.label("blocked_count"),
+            ).filter(model.bucket_start >= lower, upper_clause)
+
+        if hour_from >= hour_to:
+            return [_select(DnsStatsMinute, start, end, inclusive=True)]
+
+        selects = [_select(DnsStatsHour, hour_from, hour_to, inclusive=False)]
+        if start < hour_from:
+            selects.append(_select(DnsStatsMinute, start, hour_from, inclusive=False))
+        if hour_to <= end:
+            selects.append(_select(DnsStatsMinute, hour_to, end, inclusive=True))
+        return selects
+
+    def get_stats(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        top_n: int = 10,
+    ) -> dict:
+        """Same shape as ``DnsQueryRepository.get_stats``, answered from rollups."""
+        if not start_date:
+            start_date = datetime.now(timezone.utc) - timedelta(days=1)
+        if not end_date:
+            end_date = datetime.now(timezone.utc)
+
+        selects = self._range_selects(start_date, end_date)
+        parts = union_all(*[s.statement for s in selects]).subquery()
+
+        # One statement: per-key sums, per-dimension totals and top-N ranks via windows.
+        grouped = (
+            select(
+                parts.c.dimension,
+                parts.c.key,
+                func.sum(parts.c.query_count).label("total"),
+                func.sum(parts.c.blocked_count).label("blocked"),
+            )
+            .where(parts.c.dimension.in_([DIMENSION_CLIENT, DIMENSION_BLOCKED_DOMAIN]))
+            .group_by(parts.c.dimension, parts.c.key)
+            .subquery()
+        )
+        ranked = select(
+            grouped,
+            func.sum(grouped.c.total).over(partition_by=grouped.c.dimension).label("dimension_total"),
+            func.sum(grouped.c.blocked).over(partition_by=grouped.c.dimension).label("dimension_blocked"),
+            func.row_number()
+            .over(partition_by=grouped.c.dimension, order_by=(grouped.c.total.desc(), grouped.c.key))
+            .label("rank"),
+        ).subquery()
+        rows = self.db.execute(
+            select(ranked).where(ranked.c.rank <= top_n).order_by(ranked.c.rank)
+        ).all()
+
+        total_queries = blocked_queries = 0
+        top_blocked: List[Tuple[str, int]] = []
+        top_clients: List[Tuple[str, int]] = []
+        for row in rows:
+            if row.dimension == DIMENSION_CLIENT:
+                total_queries, blocked_queries = int(row.dimension_total), int(row.dimension_blocked)
+                top_clients.append((row.key, int(row.total)))
+            else:
+                top_blocked.append((row.key, int(row.total)))
+
+        return {
+            "total_queries": total_queries,
+            "blocked_queries": blocked_queries,
+            "allowed_queries": total_queries - blocked_queries,
+            "block_rate": round((blocked_queries / total_queries * 100), 2) if total_queries > 0 else 0,
+            "top_blocked_domains": [{"domain": d, "count": c} for d, c in top_blocked],
+            "top_clients": [{"client_ip": ip, "count": c} for ip, c in top_clients],
+            "period": {
+                "start": start_date.isoformat(),
+                "end": end_date.isoformat()
+            }
+        }
+
+    def delete_old_buckets(self) -> Tuple[int, int]:
+        """Prune rollup rows past their retention. Returns (minute rows, hour rows) deleted."""
+        now = datetime.now(timezone.utc)
+        minute_cutoff = now - timedelta(hours=settings.DNS_STATS_MINUTE_RETENTION_HOURS)
+        hour_cutoff = now - timedelta(days=settings.DNS_STATS_HOUR_RETENTION_DAYS)
+        lift_statement_timeout(self.db)
+        minutes = (
+            self.db.query(DnsStatsMinute)
+            .filter(DnsStatsMinute.bucket_start < minute_cutoff)
+            .delete(synchronize_session=False)
+        )
+        hours = (
+            self.db.query(DnsStatsHour)
+            .filter(DnsStatsHour.bucket_start < hour_cutoff)
+            .delete(synchronize_session=False)
+        )
+        self.db.commit()
+        return minutes, hours
@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Literal, Optional
 from datetime import datetime
 from app.features.dns_queries.schemas.dns_query import DnsQueryCreate, DnsQueryBulkCreate
 from app.features.dns_queries.controllers.dns_query_controller import (
     create_dns_query_controller,
     bulk_create_dns_queries_controller,
     get_dns_queries_controller,
+    export_dns_queries_controller,
     get_dns_stats_controller,
     get_unique_clients_controller,
     cleanup_old_records_controller,
@@ -16,7 +18,7 @@ from app.features.dns_queries.controllers.dns_query_controller import (
 )
 from app.features.dns_queries.dependencies import get_dns_query_service
 from app.features.dns_queries.services.dns_query_service_interface import IDnsQueryService
-from app.shared.dependencies import get_db
+from app.shared.dependencies import get_async_read_db, get_db, get_read_db
 from app.shared.websocket_manager import ws_manager
 from app.shared.config import settings
 from app.shared.service_auth import verify_dns_ingest_service
@@ -56,7 +58,7 @@ def bulk_create_dns_queries_endpoint(
 
 
 @router.get("")
-def get_dns_queries_endpoint(
+async def get_dns_queries_endpoint(
     page: int = Query(default=1, ge=1, description="Page number (1-based)"),
     page_size: int = Query(default=50, ge=1, le=100, description="Number of items per page"),
     domain_search: Optional[str] = Query(default=None, description="Search by domain (partial match)"),
@@ -64,12 +66,12 @@ def get_dns_queries_endpoint(
     blocked_only: bool = Query(default=False, description="Show only blocked queries"),
     start_date: Optional[datetime] = Query(default=None, description="Filter from date (ISO format)"),
     end_date: Optional[datetime] = Query(default=None, description="Filter to date (ISO format)"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     _: None = Depends(verify_admin_api_token),
     service: IDnsQueryService = Depends(get_dns_query_service)
 ):
     """Get paginated DNS query logs with optional filters."""
-    return get_dns_queries_controller(
+    return await get_dns_queries_controller(
         db=db,
         service=service,
         page=page,
@@ -82,21 +84,53 @@ def get_dns_queries_endpoint(
     )
 
 
+@router.get("/export")
+def export_dns_queries_endpoint(
+    format: Literal["ndjson", "csv"] = Query(default="ndjson", description="Export format"),
+    gzip: bool = Query(default=False, description="Gzip-compress the stream"),
+    domain_search: Optional[str] = Query(default=None, description="Search by domain (partial match)"),
+    client_ip: Optional[str] = Query(default=None, description="Filter by client IP"),
+    blocked_only: bool = Query(default=False, description="Export only blocked queries"),
+    start_date: Optional[datetime] = Query(default=None, description="Filter from date (ISO format)"),
+    end_date: Optional[datetime] = Query(default=None, description="Filter to date (ISO format)"),
+    include_archived: bool = Query(default=False, description="Also scan cold-storage archive files"),
+    db: Session = Depends(get_read_db),
+    _: None = Depends(verify_admin_api_token),
+    service: IDnsQueryService = Depends(get_dns_query_service)
+):
+    """Stream persisted DNS history as NDJSON or CSV (server-side cursor, flat memory)."""
+    return export_dns_queries_controller(
+        db=db,
+        service=service,
+        export_format=format,
+        compress=gzip,
+        domain_search=domain_search,
+        client_ip=client_ip,
+        blocked_only=blocked_only,
+        start_date=start_date,
+        end_date=end_date,
+        include_archived=include_archived
+    )
+
+
 @router.get("/stats")
-def get_dns_stats_endpoint(
+async def get_dns_stats_endpoint(
     start_date: Optional[datetime] = Query(default=None, description="Stats from date (ISO format)"),
     end_date: Optional[datetime] = Query(default=None, description="Stats to date (ISO format)"),
-    db: Session = Depends(get_db),
+    window_minutes: Optional[int] = Query(default=None, ge=1, le=1440, description="Live window in minutes (default DNS_LIVE_WINDOW_DEFAULT_MINUTES)"),
+    db: AsyncSession = Depends(get_async_read_db),
     _: None = Depends(verify_admin_api_token),
     service: IDnsQueryService = Depends(get_dns_query_service)
 ):
     """Get DNS query statistics (total, blocked, top domains, top clients)."""
-    return get_dns_stats_controller(db=db, service=service, start_date=start_date, end_date=end_date)
+    return await get_dns_stats_controller(
+        db=db, service=service, start_date=start_date, end_date=end_date, window_minutes=window_minutes
+    )
 
 
 @router.get("/clients")
 def get_unique_clients_endpoint(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: None = Depends(verify_admin_api_token),
     service: IDnsQueryService = Depends(get_dns_query_service)
 ):
@@ -111,7 +145,7 @@ def cleanup_old_records_endpoint(
     _: None = Depends(verify_admin_api_token),
     service: IDnsQueryService = Depends(get_dns_query_service)
 ):
-    """Delete DNS query records older than specified days."""
+    """Delete DNS query records older than specified days (archived first when DNS_ARCHIVE_DIR is set)."""
     return cleanup_old_records_controller(db, service, days=days)
 
 
@@ -123,7 +157,8 @@ def get_grouped_sites_endpoint(
     blocked_only: bool = Query(default=False, description="Show only blocked sites"),
     filter_noise: bool = Query(default=True, description="Filter out system noise domains"),
     limit: int = Query(default=50, ge=1, le=200, description="Max number of sites to return"),
-    db: Session = Depends(get_db),
+    window_minutes: Optional[int] = Query(default=None, ge=1, le=1440, description="Live window in minutes (default DNS_LIVE_WINDOW_DEFAULT_MINUTES)"),
+    db: Session = Depends(get_read_db),
     _: None = Depends(verify_admin_api_token),
     service: IDnsQueryService = Depends(get_dns_query_service)
 ):
@@ -136,22 +171,23 @@ def get_grouped_sites_endpoint(
         client_ip=client_ip,
         blocked_only=blocked_only,
         filter_noise=filter_noise,
-        limit=limit
+        limit=limit,
+        window_minutes=window_minutes
     )
 
 
 @router.get("/alerts")
-def get_dns_alerts_endpoint(
+async def get_dns_alerts_endpoint(
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=20, ge=1, le=100),
     alert_type: Optional[str] = Query(default=None, description="Filter by alert type"),
     client_ip: Optional[str] = Query(default=None, description="Filter by client IP"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     _: None = Depends(verify_admin_api_token),
     service: IDnsQueryService = Depends(get_dns_query_service),
 ):
     """List DNS and bandwidth anomaly alerts."""
-    return get_dns_alerts_controller(
+    return await get_dns_alerts_controller(
         db=db,
         service=service,
         page=page,
@@ -2,7 +2,8 @@ from typing import List
 
 from sqlalchemy.orm import Session
 
-from app.features.dns_queries.dns_anomaly import get_suspicious_domain_reasons
+from app.features.dns_queries.dns_anomaly import suspicious_domains
+from app.features.dns_queries.dns_tunnel import tunnel_detector
 from app.features.dns_queries.repositories.dns_alert_repository import DnsAlertRepository
 from app.features.dns_queries.repositories.domain_first_seen_repository import DomainFirstSeenRepository
 from app.features.dns_queries.schemas.dns_query import DnsQueryCreate
@@ -22,10 +23,12 @@ class DnsAnomalyService:
 
     def process_queries(self, queries: List[DnsQueryCreate]) -> int:
         created = 0
-        for query in queries:
-            if is_noise_domain(query.domain):
-                continue
-            created += self._process_one(query)
+        queries = [query for query in queries if not is_noise_domain(query.domain)]
+        findings = suspicious_domains.findings([query.domain for query in queries])
+        for query, finding in zip(queries, findings):
+            created += self._process_one(query, list(finding.reasons))
+        if settings.DNS_TUNNEL_DETECTION_ENABLED:
+            created += self._process_tunnels(queries)
         if created:
             self.db.commit()
             logger.warning(
@@ -34,7 +37,7 @@ class DnsAnomalyService:
             )
         return created
 
-    def _process_one(self, query: DnsQueryCreate) -> int:
+    def _process_one(self, query: DnsQueryCreate, suspicious_reasons: List[str]) -> int:
         alerts = 0
         root = extract_root_domain(query.domain)
 
@@ -69,7 +72,6 @@ class DnsAnomalyService:
                 )
                 alerts += 1
 
-        suspicious_reasons = get_suspicious_domain_reasons(query.domain)
         if suspicious_reasons:
             self.alert_repo.create(
                 timestamp=query.timestamp,
@@ -83,3 +85,17 @@ class DnsAnomalyService:
             alerts += 1
 
         return alerts
+
+    def _process_tunnels(self, queries: List[DnsQueryCreate]) -> int:
+        suspicions = tunnel_detector.observe(queries)
+        for suspicion in suspicions:
+            self.alert_repo.create(
+                timestamp=suspicion.timestamp,
+                client_ip=suspicion.client_ip,
+                alert_type="dns_tunnel_suspected",
+                severity="high",
+                domain=suspicion.domain,
+                root_domain=suspicion.root_domain,
+                message=suspicion.message(),
+            )
+        return len(suspicions)
@@ -1,18 +1,42 @@
-from typing import List, Optional
-from datetime import datetime
+from array import array
+from itertools import groupby, islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from datetime import date, datetime, timedelta, timezone
+from uuid import uuid4
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.features.dns_queries.repositories.dns_query_repository import DnsQueryRepository
+from app.features.dns_queries.repositories.dns_query_async_repository import AsyncDnsQueryRepository
 from app.features.dns_queries.repositories.dns_alert_repository import DnsAlertRepository
+from app.features.dns_queries.repositories.dns_alert_async_repository import AsyncDnsAlertRepository
+from app.features.dns_queries.repositories.dns_stats_rollup_repository import DnsStatsRollupRepository
 from app.features.dns_queries.schemas.dns_query import DnsQueryCreate, DnsQueryResponse
 from app.features.dns_queries.schemas.dns_alert import DnsAlertResponse
 from app.features.dns_queries.services.dns_query_service_interface import IDnsQueryService
 from app.features.dns_queries.dns_persist import filter_queries_to_persist, should_persist_query
-from app.features.dns_queries.dns_ingest_stats import ingest_stats
+from app.features.dns_queries.dns_export import (
+    EXPORT_BATCH_SIZE,
+    encode_csv,
+    encode_ndjson,
+    export_record,
+)
+from app.features.dns_queries.dns_archive import (
+    archive_lock,
+    get_archive_dir,
+    iter_archived_records,
+    load_manifest,
+    save_manifest,
+    write_day_file,
+)
+from app.features.dns_queries.dns_ingest_stats import ingest_stats, prepare_queries
+from app.features.dns_queries.dns_live_windows import live_windows
 from app.features.dns_queries.services.dns_anomaly_service import DnsAnomalyService
 from app.features.client_behavior.services.client_behavior_aggregator import ClientBehaviorAggregator
 from app.features.policy.services.forbidden_country_service import ForbiddenCountryService
 from app.features.client_behavior.services.behavior_scoring_service import BehaviorScoringService
 from app.features.devices.repositories.device_repository import DeviceRepository
+from app.features.devices.repositories.device_async_repository import AsyncDeviceRepository
 from app.shared.config import settings
 from app.shared.logging_context import structured_extra
 from app.shared.utils.logging import get_logger
@@ -30,19 +54,99 @@ def _use_live_aggregates(
     return start_date is None and end_date is None
 
 
+def _record_live_stats(queries: List[DnsQueryCreate]) -> None:
+    """Feed the process counters and the windowed buckets from one domain parse."""
+    prepared = prepare_queries(queries)
+    ingest_stats.record_prepared(prepared)
+    if settings.DNS_LIVE_WINDOWS_ENABLED:
+        live_windows.record(prepared)
+
+
+def _live_stats(window_minutes: Optional[int] = None) -> dict:
+    if settings.DNS_LIVE_WINDOWS_ENABLED:
+        return live_windows.get_stats(window_minutes)
+    return ingest_stats.get_stats()
+
+
+def _record_stats_rollups(queries: List[DnsQueryCreate], db: Session) -> None:
+    """Fold every ingested query (persisted or not) into the minute/hour rollups.
+
+    Called right before the ingest commit so the rollup row locks are held briefly.
+    """
+    if settings.DNS_STATS_ROLLUPS_ENABLED:
+        DnsStatsRollupRepository(db).record_batch(queries)
+
+
+def _utc_day(ts: datetime) -> date:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc).date()
+
+
+class _DeviceNameCache:
+    """Resolve client IP -> device name while streaming rows, one lookup per batch."""
+
+    def __init__(self, db: Session):
+        self._device_repository = DeviceRepository(db)
+        self._names: Dict[str, Optional[str]] = {}
+
+    def records(self, rows: Iterable) -> Iterator[Dict[str, object]]:
+        """Export records for ``rows``; IPs not seen before are resolved per EXPORT_BATCH_SIZE slice."""
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, EXPORT_BATCH_SIZE))
+            if not batch:
+                return
+            unknown = list({row.client_ip for row in batch} - self._names.keys())
+            if unknown:
+                identity = self._device_repository.get_identity_map_by_client_ips(unknown)
+                for ip in unknown:
+                    self._names[ip] = identity.get(ip, {}).get("device_name")
+            for row in batch:
+                yield export_record(row, self._names[row.client_ip])
+
+
+def _queries_page(items, total: int, identity_map: dict, page: int, page_size: int) -> dict:
+    return {
+        "items": [
+            DnsQueryResponse.model_validate(item).model_copy(
+                update=identity_map.get(
+                    item.client_ip,
+                    {"device_name": None, "device_vendor": None, "user_name": None}
+                )
+            )
+            for item in items
+        ],
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "pages": (total + page_size - 1) // page_size
+    }
+
+
+def _alerts_page(items, total: int, page: int, page_size: int) -> dict:
+    return {
+        "items": [DnsAlertResponse.model_validate(item) for item in items],
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "pages": (total + page_size - 1) // page_size if page_size else 0,
+    }
+
+
 class DnsQueryService:
     """Implementation of IDnsQueryService."""
 
     def create_query(self, dns_query_data: DnsQueryCreate, db: Session) -> DnsQueryResponse:
         device_repository = DeviceRepository(db)
         device_repository.ensure_devices_for_client_ips([dns_query_data.client_ip])
-        ingest_stats.record([dns_query_data])
+        _record_live_stats([dns_query_data])
         DnsAnomalyService(db).process_queries([dns_query_data])
         ClientBehaviorAggregator(db).process_queries([dns_query_data])
-        forbidden_alerts = ForbiddenCountryService(db).process_queries([dns_query_data])
-        behavior_alerts = BehaviorScoringService(db).process_queries([dns_query_data])
-        if forbidden_alerts or behavior_alerts:
-            db.commit()
+        ForbiddenCountryService(db).process_queries([dns_query_data])
+        BehaviorScoringService(db).process_queries([dns_query_data])
+        _record_stats_rollups([dns_query_data], db)
+        db.commit()
 
         if not should_persist_query(dns_query_data):
             return DnsQueryResponse(
@@ -73,11 +177,12 @@ class DnsQueryService:
     def bulk_create_queries(self, queries: List[DnsQueryCreate], db: Session) -> dict:
         device_repository = DeviceRepository(db)
         device_repository.ensure_devices_for_client_ips([q.client_ip for q in queries])
-        ingest_stats.record(queries)
+        _record_live_stats(queries)
         alerts_created = DnsAnomalyService(db).process_queries(queries)
         ClientBehaviorAggregator(db).process_queries(queries)
         alerts_created += ForbiddenCountryService(db).process_queries(queries)
         alerts_created += BehaviorScoringService(db).process_queries(queries)
+        _record_stats_rollups(queries, db)
         db.commit()
 
         to_persist = filter_queries_to_persist(queries)
@@ -127,36 +232,170 @@ class DnsQueryService:
         )
         client_ips = list({item.client_ip for item in items})
         identity_map = DeviceRepository(db).get_identity_map_by_client_ips(client_ips)
-        return {
-            "items": [
-                DnsQueryResponse.model_validate(item).model_copy(
-                    update=identity_map.get(
-                        item.client_ip,
-                        {"device_name": None, "device_vendor": None, "user_name": None}
-                    )
-                )
-                for item in items
-            ],
-            "total": total,
-            "page": page,
-            "page_size": page_size,
-            "pages": (total + page_size - 1) // page_size
-        }
+        return _queries_page(items, total, identity_map, page, page_size)
+
+    async def get_queries_async(
+        self,
+        db: AsyncSession,
+        page: int = 1,
+        page_size: int = 50,
+        domain_search: Optional[str] = None,
+        client_ip: Optional[str] = None,
+        blocked_only: bool = False,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> dict:
+        items, total = await AsyncDnsQueryRepository(db).get_all(
+            page=page,
+            page_size=page_size,
+            domain_search=domain_search,
+            client_ip=client_ip,
+            blocked_only=blocked_only,
+            start_date=start_date,
+            end_date=end_date
+        )
+        client_ips = list({item.client_ip for item in items})
+        identity_map = await AsyncDeviceRepository(db).get_identity_map_by_client_ips(client_ips)
+        return _queries_page(items, total, identity_map, page, page_size)
+
+    def export_queries(
+        self,
+        db: Session,
+        export_format: str = "ndjson",
+        domain_search: Optional[str] = None,
+        client_ip: Optional[str] = None,
+        blocked_only: bool = False,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        include_archived: bool = False
+    ) -> Iterator[bytes]:
+        encode = encode_csv if export_format == "csv" else encode_ndjson
+        records = self._export_records(
+            db,
+            domain_search=domain_search,
+            client_ip=client_ip,
+            blocked_only=blocked_only,
+            start_date=start_date,
+            end_date=end_date,
+            include_archived=include_archived,
+        )
+        exported = 0
+        try:
+            if export_format == "csv":
+                yield encode_csv([], header=True)
+            while True:
+                batch = list(islice(records, EXPORT_BATCH_SIZE))
+                if not batch:
+                    break
+                yield encode(batch)
+                exported += len(batch)
+        finally:
+            # FastAPI closes yield dependencies before a StreamingResponse is sent, so the
+            # session reconnects lazily for the stream and must be released here.
+            db.close()
+            logger.info(
+                "DNS history export finished",
+                extra=structured_extra(
+                    "dns_export_completed",
+                    format=export_format,
+                    rows=exported,
+                    include_archived=include_archived,
+                ),
+            )
+
+    def _export_records(
+        self,
+        db: Session,
+        *,
+        domain_search: Optional[str],
+        client_ip: Optional[str],
+        blocked_only: bool,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        include_archived: bool,
+    ) -> Iterator[Dict[str, object]]:
+        """Archived records first (oldest data), then hot rows with device names resolved."""
+        if include_archived:
+            yield from self.iter_archived_queries(
+                start_date=start_date,
+                end_date=end_date,
+                client_ip=client_ip,
+                domain_search=domain_search,
+                blocked_only=blocked_only,
+            )
+
+        rows = DnsQueryRepository(db).iter_filtered(
+            domain_search=domain_search,
+            client_ip=client_ip,
+            blocked_only=blocked_only,
+            start_date=start_date,
+            end_date=end_date,
+            batch_size=EXPORT_BATCH_SIZE,
+        )
+        yield from _DeviceNameCache(db).records(rows)
+
+    def iter_archived_queries(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        client_ip: Optional[str] = None,
+        domain_search: Optional[str] = None,
+        blocked_only: bool = False,
+    ) -> Iterator[Dict[str, object]]:
+        """Scan cold-storage files for a date range (empty when archiving is disabled)."""
+        archive_dir = get_archive_dir()
+        if archive_dir is None:
+            return iter(())
+        return iter_archived_records(
+            archive_dir,
+            start_date,
+            end_date,
+            client_ip=client_ip,
+            domain_search=domain_search,
+            blocked_only=blocked_only,
+        )
 
     def get_stats(
         self,
         db: Session,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        end_date: Optional[datetime] = None,
+        window_minutes: Optional[int] = None
     ) -> dict:
         if _use_live_aggregates(start_date, end_date):
-            return ingest_stats.get_stats()
+            return _live_stats(window_minutes)
+
+        if settings.DNS_STATS_ROLLUPS_ENABLED:
+            stats = DnsStatsRollupRepository(db).get_stats(start_date=start_date, end_date=end_date)
+            stats["source"] = "rollup"
+            return stats
 
         repository = DnsQueryRepository(db)
         stats = repository.get_stats(start_date=start_date, end_date=end_date)
         stats["source"] = "database"
         return stats
 
+    async def get_stats_async(
+        self,
+        db: AsyncSession,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        window_minutes: Optional[int] = None
+    ) -> dict:
+        if _use_live_aggregates(start_date, end_date):
+            # Live stats make blocking Redis calls; keep them off the event loop.
+            return await run_in_threadpool(_live_stats, window_minutes)
+
+        repository = AsyncDnsQueryRepository(db)
+        if settings.DNS_STATS_ROLLUPS_ENABLED:
+            stats = await repository.get_rollup_stats(start_date=start_date, end_date=end_date)
+            stats["source"] = "rollup"
+            return stats
+
+        stats = await repository.get_stats(start_date=start_date, end_date=end_date)
+        stats["source"] = "database"
+        return stats
+
     def get_unique_clients(self, db: Session) -> List[str]:
         if not settings.PERSIST_ALL_DNS:
             live_clients = set(ingest_stats.get_unique_clients())
@@ -181,13 +420,23 @@ class DnsQueryService:
             alert_type=alert_type,
             client_ip=client_ip,
         )
-        return {
-            "items": [DnsAlertResponse.model_validate(item) for item in items],
-            "total": total,
-            "page": page,
-            "page_size": page_size,
-            "pages": (total + page_size - 1) // page_size if page_size else 0,
-        }
+        return _alerts_page(items, total, page, page_size)
+
+    async def get_alerts_async(
+        self,
+        db: AsyncSession,
+        page: int = 1,
+        page_size: int = 50,
+        alert_type: Optional[str] = None,
+        client_ip: Optional[str] = None,
+    ) -> dict:
+        items, total = await AsyncDnsAlertRepository(db).get_recent(
+            page=page,
+            page_size=page_size,
+            alert_type=alert_type,
+            client_ip=client_ip,
+        )
+        return _alerts_page(items, total, page, page_size)
 
     def cleanup_old_records(self, db: Session, days: int = 30) -> dict:
         repository = DnsQueryRepository(db)
@@ -195,12 +444,72 @@ class DnsQueryService:
             "Cleaning up old DNS records",
             extra=structured_extra("dns_cleanup_started", days=days),
         )
-        count = repository.delete_old_records(days=days)
+        archived = 0
+        if get_archive_dir() is not None:
+            archived, count = self.archive_old_records(db, days=days)
+        else:
+            count = repository.delete_old_records(days=days)
+        minute_rows, hour_rows = DnsStatsRollupRepository(db).delete_old_buckets()
         logger.info(
             "Old DNS records deleted",
-            extra=structured_extra("dns_cleanup_completed", deleted=count),
+            extra=structured_extra(
+                "dns_cleanup_completed",
+                deleted=count,
+                archived=archived,
+                rollup_minutes_deleted=minute_rows,
+                rollup_hours_deleted=hour_rows,
+            ),
         )
-        return {"deleted": count}
+        return {"deleted": count, "archived": archived}
+
+    def archive_old_records(self, db: Session, days: int = 30) -> Tuple[int, int]:
+        """Move rows older than ``days`` into day files under DNS_ARCHIVE_DIR.
+
+        Rows are only deleted after every file and the manifest are on disk, and only
+        the ids that were written (rows committed during the pass stay for the next
+        run). An archive-wide file lock serializes concurrent runs. Returns
+        (rows archived, rows deleted).
+        """
+        archive_dir = get_archive_dir()
+        if archive_dir is None:
+            return 0, 0
+
+        repository = DnsQueryRepository(db)
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+        # Timestamp for readability, random suffix so runs in the same second never collide.
+        run_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{uuid4().hex[:8]}"
+        device_names = _DeviceNameCache(db)
+        archived_ids = array("q")
+        entries = []
+
+        def _tracked(group) -> Iterator:
+            for row in group:
+                archived_ids.append(row.id)
+                yield row
+
+        with archive_lock(archive_dir):
+            rows = repository.iter_older_than(cutoff, batch_size=EXPORT_BATCH_SIZE)
+            for day, group in groupby(rows, key=lambda r: _utc_day(r.timestamp)):
+                entry = write_day_file(archive_dir, day, run_id, device_names.records(_tracked(group)))
+                if entry is not None:
+                    entries.append(entry)
+
+            if not entries:
+                return 0, 0
+
+            save_manifest(archive_dir, load_manifest(archive_dir) + entries)
+            archived = sum(int(e["rows"]) for e in entries)
+            deleted = repository.delete_by_ids(archived_ids, batch_size=EXPORT_BATCH_SIZE)
+        logger.info(
+            "DNS records archived",
+            extra=structured_extra(
+                "dns_archive_completed",
+                files=len(entries),
+                archived=archived,
+                deleted=deleted,
+            ),
+        )
+        return archived, deleted
 
     def get_grouped_by_site(
         self,
@@ -210,14 +519,31 @@ class DnsQueryService:
         client_ip: Optional[str] = None,
         blocked_only: bool = False,
         filter_noise: bool = True,
-        limit: int = 50
+        limit: int = 50,
+        window_minutes: Optional[int] = None
     ) -> dict:
-        if _use_live_aggregates(start_date, end_date) and client_ip is None:
-            return ingest_stats.get_grouped_sites(
+        # Live aggregates never index noise domains: filter_noise only applies to the database.
+        # Per-client window sets see every ingested query, persisted or not.
+        live_client_view = client_ip is not None and start_date is None and end_date is None
+        if settings.DNS_LIVE_WINDOWS_ENABLED and (
+            live_client_view or _use_live_aggregates(start_date, end_date)
+        ):
+            return live_windows.get_grouped_sites(
+                client_ip=client_ip,
+                window_minutes=window_minutes,
+                blocked_only=blocked_only,
+                limit=limit,
+            )
+        if _use_live_aggregates(start_date, end_date):
+            result = ingest_stats.get_grouped_sites(
+                client_ip=client_ip,
                 blocked_only=blocked_only,
                 filter_noise=filter_noise,
                 limit=limit,
             )
+            if client_ip is None or result["sites"]:
+                return result
+            # This worker never saw the client (restart, or another worker): use the database.
 
         repository = DnsQueryRepository(db)
         result = repository.get_grouped_by_site(
@@ -1,5 +1,6 @@
-from typing import Protocol, Optional, List, Dict, Any
+from typing import Protocol, Optional, List, Dict, Any, Iterator
 from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.features.dns_queries.schemas.dns_query import DnsQueryCreate, DnsQueryResponse
 
@@ -29,13 +30,52 @@ class IDnsQueryService(Protocol):
         """Get paginated DNS queries with optional filters."""
         ...
 
+    async def get_queries_async(
+        self,
+        db: AsyncSession,
+        page: int = 1,
+        page_size: int = 50,
+        domain_search: Optional[str] = None,
+        client_ip: Optional[str] = None,
+        blocked_only: bool = False,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> dict:
+        """get_queries on an async session (event-loop read endpoints)."""
+        ...
+
+    def export_queries(
+        self,
+        db: Session,
+        export_format: str = "ndjson",
+        domain_search: Optional[str] = None,
+        client_ip: Optional[str] = None,
+        blocked_only: bool = False,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        include_archived: bool = False
+    ) -> Iterator[bytes]:
+        """Stream DNS queries matching the filters as NDJSON or CSV chunks."""
+        ...
+
     def get_stats(
         self,
         db: Session,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        end_date: Optional[datetime] = None,
+        window_minutes: Optional[int] = None
     ) -> dict:
-        """Get DNS query statistics."""
+        """Get DNS query statistics (live stats cover the last ``window_minutes``)."""
+        ...
+
+    async def get_stats_async(
+        self,
+        db: AsyncSession,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        window_minutes: Optional[int] = None
+    ) -> dict:
+        """get_stats on an async session."""
         ...
 
     def get_unique_clients(self, db: Session) -> List[str]:
@@ -43,7 +83,18 @@ class IDnsQueryService(Protocol):
         ...
 
     def cleanup_old_records(self, db: Session, days: int = 30) -> dict:
-        """Delete records older than specified days."""
+        """Delete (or archive, when DNS_ARCHIVE_DIR is set) records older than specified days."""
+        ...
+
+    def iter_archived_queries(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        client_ip: Optional[str] = None,
+        domain_search: Optional[str] = None,
+        blocked_only: bool = False,
+    ) -> Iterator[Dict[str, Any]]:
+        """Scan archived DNS records for a date range."""
         ...
 
     def get_grouped_by_site(
@@ -54,7 +105,19 @@ class IDnsQueryService(Protocol):
         client_ip: Optional[str] = None,
         blocked_only: bool = False,
         filter_noise: bool = True,
-        limit: int = 50
+        limit: int = 50,
+        window_minutes: Optional[int] = None
     ) -> dict:
         """Get DNS queries grouped by root domain."""
         ...
+
+    async def get_alerts_async(
+        self,
+        db: AsyncSession,
+        page: int = 1,
+        page_size: int = 50,
+        alert_type: Optional[str] = None,
+        client_ip: Optional[str] = None,
+    ) -> dict:
+        """Paginated anomaly alerts on an async session."""
+        ...
@@ -0,0 +1,66 @@
+"""Space-Saving heavy-hitters summary (Metwally et al.) for bounded top-K counters."""
+
+from __future__ import annotations
+
+import heapq
+from typing import Dict, Iterable, List, Tuple
+
+
+class SpaceSaving:
+    """Approximate counter that never tracks more than ``capacity`` keys.
+
+    When full, a new key replaces the current minimum and inherits its count (+n),
+    so counts over-estimate by at most the evicted minimum and every key whose true
+    count exceeds total/capacity is guaranteed to be present. Not thread-safe;
+    callers hold their shard lock.
+
+    The heap holds exactly one entry per tracked key. Increments do not touch it, so
+    entries are lower bounds; a stale minimum is re-pushed with its live count when
+    popped during eviction.
+    """
+
+    __slots__ = ("capacity", "_counts", "_heap")
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = max(1, capacity)
+        self._counts: Dict[str, int] = {}
+        self._heap: List[Tuple[int, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._counts
+
+    def count(self, key: str) -> int:
+        return self._counts.get(key, 0)
+
+    def add(self, key: str, n: int = 1) -> None:
+        counts = self._counts
+        if key in counts:
+            counts[key] += n
+            return
+        if len(counts) < self.capacity:
+            counts[key] = n
+            heapq.heappush(self._heap, (n, key))
+            return
+
+        heap = self._heap
+        while True:
+            floor, victim = heapq.heappop(heap)
+            live = counts[victim]
+            if live == floor:
+                break
+            heapq.heappush(heap, (live, victim))
+        del counts[victim]
+        counts[key] = floor + n
+        heapq.heappush(heap, (floor + n, key))
+
+    def items(self) -> Iterable[Tuple[str, int]]:
+        return self._counts.items()
+
+    def keys(self) -> Iterable[str]:
+        return self._counts.keys()
+
+    def most_common(self, n: int) -> List[Tuple[str, int]]:
+        return heapq.nlargest(n, self._counts.items(), key=lambda kv: kv[1])
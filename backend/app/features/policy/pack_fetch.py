@@ -2,14 +2,20 @@
 
 from __future__ import annotations
 
+import hashlib
+import json
+import os
+import tempfile
 import time
 import urllib.error
 import urllib.request
+from datetime import datetime, timezone
 from pathlib import Path
 from functools import lru_cache
-from typing import FrozenSet, List, Optional, Set, Tuple
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
 
 from app.features.policy.pack_common import DATA_DIR, normalize_domain
+from app.features.policy.pack_store import PackIndex, open_pack_index, write_pack_index
 from app.shared.config import settings
 from app.shared.logging_context import structured_extra
 from app.shared.utils.logging import get_logger
@@ -37,19 +43,32 @@ DEFAULT_REMOTE_PACK_URLS: dict[str, str] = {
 _HOSTS_BLOCK_IPS = frozenset({"0.0.0.0", "127.0.0.1", "::", "::1", "0.0.0.0"})
 
 
+def _hosts_line_domain(line: str) -> Optional[str]:
+    """Domain from a ``0.0.0.0 example.com`` line; None for anything else."""
+    parts = line.split()
+    if len(parts) < 2 or parts[0] not in _HOSTS_BLOCK_IPS:
+        return None
+    d = normalize_domain(parts[-1])
+    return d if d and "." in d else None
+
+
+def _list_line_domain(line: str) -> Optional[str]:
+    d = normalize_domain(line.split()[0])
+    return d if d and "." in d else None
+
+
+def _content_lines(lines: Iterable[str]) -> Iterator[str]:
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+
 def parse_hosts_file(text: str) -> Set[str]:
     domains: Set[str] = set()
-    for line in text.splitlines():
-        line = line.strip()
-        if not line or line.startswith("#"):
-            continue
-        parts = line.split()
-        if len(parts) < 2:
-            continue
-        if parts[0] not in _HOSTS_BLOCK_IPS:
-            continue
-        d = normalize_domain(parts[-1])
-        if d and "." in d:
+    for line in _content_lines(text.splitlines()):
+        d = _hosts_line_domain(line)
+        if d:
             domains.add(d)
     return domains
 
@@ -57,28 +76,93 @@ def parse_hosts_file(text: str) -> Set[str]:
 def parse_domain_list(text: str) -> Set[str]:
     """Plain-text lists with one domain per line (e.g. UT1 blacklists)."""
     domains: Set[str] = set()
-    for line in text.splitlines():
-        line = line.strip()
-        if not line or line.startswith("#"):
-            continue
-        d = normalize_domain(line.split()[0])
-        if d and "." in d:
+    for line in _content_lines(text.splitlines()):
+        d = _list_line_domain(line)
+        if d:
             domains.add(d)
     return domains
 
 
+def parse_pack_lines(lines: Iterable[str]) -> Set[str]:
+    """Single pass over ``lines``: hosts entries if there are any, else plain domains.
+
+    Plain-list domains are only collected until the first hosts entry shows up,
+    so a hosts file never holds two sets at once.
+    """
+    from_hosts: Set[str] = set()
+    from_list: Optional[Set[str]] = set()
+    for line in _content_lines(lines):
+        d = _hosts_line_domain(line)
+        if d:
+            from_hosts.add(d)
+            from_list = None
+        elif from_list is not None:
+            d = _list_line_domain(line)
+            if d:
+                from_list.add(d)
+    return from_hosts or from_list or set()
+
+
 def parse_pack_text(text: str) -> Set[str]:
     """Hosts file format first; fall back to plain domain-per-line."""
-    from_hosts = parse_hosts_file(text)
-    if from_hosts:
-        return from_hosts
-    return parse_domain_list(text)
+    return parse_pack_lines(text.splitlines())
 
 
 def snapshot_path(slug: str) -> Path:
     return get_snapshot_dir() / f"{slug}.txt"
 
 
+def pack_index_path(slug: str) -> Path:
+    return get_snapshot_dir() / f"{slug}.pack"
+
+
+def snapshot_meta_path(slug: str) -> Path:
+    return get_snapshot_dir() / f"{slug}.meta.json"
+
+
+class PackSnapshotMeta(NamedTuple):
+    """Sidecar for a snapshot, so counts never require reparsing the list."""
+
+    count: int
+    sha256: str
+    source_url: str
+    fetched_at: str  # ISO-8601 UTC
+    etag: str = ""
+    last_modified: str = ""
+
+
+def _write_snapshot_meta(slug: str, meta: PackSnapshotMeta) -> None:
+    # Unique temp name: several workers may refresh the same pack at startup.
+    path = snapshot_meta_path(slug)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(json.dumps(meta._asdict()))
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def read_snapshot_meta(slug: str) -> Optional[PackSnapshotMeta]:
+    """Sidecar metadata, or None when missing, unreadable or older than the snapshot."""
+    path = snapshot_meta_path(slug)
+    try:
+        if path.stat().st_mtime < snapshot_path(slug).stat().st_mtime:
+            return None
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return PackSnapshotMeta(
+            count=int(data["count"]),
+            sha256=str(data["sha256"]),
+            source_url=str(data.get("source_url") or ""),
+            fetched_at=str(data.get("fetched_at") or ""),
+            etag=str(data.get("etag") or ""),
+            last_modified=str(data.get("last_modified") or ""),
+        )
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
 def _read_domains_file(path: Path) -> Set[str]:
     domains: Set[str] = set()
     for line in path.read_text(encoding="utf-8").splitlines():
@@ -91,15 +175,70 @@ def _read_domains_file(path: Path) -> Set[str]:
     return domains
 
 
-def write_snapshot(slug: str, domains: Set[str]) -> Path:
+def write_snapshot(
+    slug: str,
+    domains: Set[str],
+    *,
+    source_url: str = "",
+    etag: str = "",
+    last_modified: str = "",
+) -> Path:
     snap_dir = get_snapshot_dir()
     snap_dir.mkdir(parents=True, exist_ok=True)
     path = snapshot_path(slug)
-    body = "\n".join(sorted(domains)) + ("\n" if domains else "")
-    path.write_text(body, encoding="utf-8")
+    body = ("\n".join(sorted(domains)) + ("\n" if domains else "")).encode("utf-8")
+    path.write_bytes(body)
+    count = write_pack_index(pack_index_path(slug), domains)
+    # Written last: a sidecar older than the snapshot is treated as stale.
+    _write_snapshot_meta(
+        slug,
+        PackSnapshotMeta(
+            count=count,
+            sha256=hashlib.sha256(body).hexdigest(),
+            source_url=source_url,
+            fetched_at=datetime.now(timezone.utc).isoformat(),
+            etag=etag,
+            last_modified=last_modified,
+        ),
+    )
     return path
 
 
+def touch_snapshot(slug: str, meta: PackSnapshotMeta) -> None:
+    """Upstream unchanged: mark the snapshot fresh and keep the newest validators."""
+    for path in (snapshot_path(slug), pack_index_path(slug)):
+        if path.is_file():
+            os.utime(path)
+    _write_snapshot_meta(slug, meta._replace(fetched_at=datetime.now(timezone.utc).isoformat()))
+
+
+def _snapshot_pack(slug: str) -> Optional[PackIndex]:
+    """Compiled snapshot, (re)compiling it when the text snapshot is newer; None if empty."""
+    snap = snapshot_path(slug)
+    if not snap.is_file():
+        return None
+    index = pack_index_path(slug)
+    try:
+        if not index.is_file() or index.stat().st_mtime < snap.stat().st_mtime:
+            write_pack_index(index, _read_domains_file(snap))
+        pack = open_pack_index(index)
+    except (OSError, ValueError):
+        logger.warning(
+            "Policy pack index unavailable; loading snapshot in memory",
+            extra=structured_extra("policy_pack_index_unavailable", slug=slug),
+            exc_info=True,
+        )
+        pack = PackIndex.from_domains(_read_domains_file(snap))
+    return pack if len(pack) else None
+
+
+def _static_pack(slug: str) -> PackIndex:
+    static = DATA_DIR / f"{slug}.txt"
+    if static.is_file():
+        return PackIndex.from_domains(_read_domains_file(static))
+    return PackIndex.from_domains(())
+
+
 def snapshot_age_seconds(slug: str) -> Optional[float]:
     path = snapshot_path(slug)
     if not path.is_file():
@@ -107,14 +246,42 @@ def snapshot_age_seconds(slug: str) -> Optional[float]:
     return time.time() - path.stat().st_mtime
 
 
-def fetch_remote_hosts(url: str, timeout: float) -> Set[str]:
-    req = urllib.request.Request(url, headers={"User-Agent": "TrustEdge-PolicyPack/1.0"})
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        text = resp.read().decode("utf-8", errors="replace")
-    domains = parse_pack_text(text)
+class RemotePackList(NamedTuple):
+    domains: Optional[Set[str]]  # None: 304 Not Modified
+    etag: str
+    last_modified: str
+
+
+def fetch_remote_hosts(
+    url: str,
+    timeout: float,
+    *,
+    etag: str = "",
+    last_modified: str = "",
+) -> RemotePackList:
+    """Conditional GET; a 200 body is parsed line by line as it streams in."""
+    headers = {"User-Agent": "TrustEdge-PolicyPack/1.0"}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    req = urllib.request.Request(url, headers=headers)
+    try:
+        resp = urllib.request.urlopen(req, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return RemotePackList(
+                None,
+                e.headers.get("ETag") or etag,
+                e.headers.get("Last-Modified") or last_modified,
+            )
+        raise
+    with resp:
+        domains = parse_pack_lines(raw.decode("utf-8", errors="replace") for raw in resp)
+        validators = (resp.headers.get("ETag") or "", resp.headers.get("Last-Modified") or "")
     if not domains:
         raise ValueError(f"no domains parsed from {url}")
-    return domains
+    return RemotePackList(domains, *validators)
 
 
 def remote_pack_url(slug: str) -> Optional[str]:
@@ -126,7 +293,7 @@ def remote_pack_url(slug: str) -> Optional[str]:
     return DEFAULT_REMOTE_PACK_URLS.get(slug)
 
 
-def refresh_remote_pack(slug: str, *, force: bool = False) -> FrozenSet[str]:
+def refresh_remote_pack(slug: str, *, force: bool = False) -> PackIndex:
     """Download upstream list, write snapshot, return domains."""
     url = remote_pack_url(slug)
     if not url:
@@ -135,14 +302,46 @@ def refresh_remote_pack(slug: str, *, force: bool = False) -> FrozenSet[str]:
     if not force:
         age = snapshot_age_seconds(slug)
         if age is not None and age < settings.POLICY_PACK_SNAPSHOT_MAX_AGE_SECONDS:
-            domains = _read_domains_file(snapshot_path(slug))
-            if domains:
-                return frozenset(domains)
+            pack = _snapshot_pack(slug)
+            if pack is not None:
+                return pack
 
     static_fallback = DATA_DIR / f"{slug}.txt"
+    # Validators only count for a usable snapshot of the same upstream list.
+    meta = read_snapshot_meta(slug) if snapshot_path(slug).is_file() else None
+    if meta is not None and (meta.source_url != url or meta.count == 0):
+        meta = None
     try:
-        domains = fetch_remote_hosts(url, settings.POLICY_PACK_FETCH_TIMEOUT_SECONDS)
-        write_snapshot(slug, domains)
+        fetched = fetch_remote_hosts(
+            url,
+            settings.POLICY_PACK_FETCH_TIMEOUT_SECONDS,
+            etag=meta.etag if meta else "",
+            last_modified=meta.last_modified if meta else "",
+        )
+        if fetched.domains is None and meta is not None:
+            touch_snapshot(slug, meta._replace(etag=fetched.etag, last_modified=fetched.last_modified))
+            logger.info(
+                "Policy pack unchanged upstream",
+                extra=structured_extra(
+                    "policy_pack_not_modified",
+                    slug=slug,
+                    url=url,
+                    domain_count=meta.count,
+                ),
+            )
+            pack = _snapshot_pack(slug)
+            if pack is not None:
+                return pack
+        if fetched.domains is None:
+            raise ValueError(f"{url} answered 304 without a usable snapshot")
+        domains = fetched.domains
+        write_snapshot(
+            slug,
+            domains,
+            source_url=url,
+            etag=fetched.etag,
+            last_modified=fetched.last_modified,
+        )
         logger.info(
             "Policy pack refreshed from upstream",
             extra=structured_extra(
@@ -153,7 +352,7 @@ def refresh_remote_pack(slug: str, *, force: bool = False) -> FrozenSet[str]:
             ),
         )
         clear_sorted_pack_domains_cache()
-        return frozenset(domains)
+        return open_pack_index(pack_index_path(slug))
     except (urllib.error.URLError, TimeoutError, ValueError) as e:
         logger.warning(
             "Policy pack fetch failed",
@@ -164,44 +363,37 @@ def refresh_remote_pack(slug: str, *, force: bool = False) -> FrozenSet[str]:
                 error=str(e),
             ),
         )
-        snap = snapshot_path(slug)
-        if snap.is_file():
-            domains = _read_domains_file(snap)
-            if domains:
-                logger.warning(
-                    "Using stale policy pack snapshot",
-                    extra=structured_extra(
-                        "policy_pack_stale_snapshot",
-                        slug=slug,
-                        domain_count=len(domains),
-                    ),
-                )
-                return frozenset(domains)
+        pack = _snapshot_pack(slug)
+        if pack is not None:
+            logger.warning(
+                "Using stale policy pack snapshot",
+                extra=structured_extra(
+                    "policy_pack_stale_snapshot",
+                    slug=slug,
+                    domain_count=len(pack),
+                ),
+            )
+            return pack
         if static_fallback.is_file():
-            domains = _read_domains_file(static_fallback)
+            pack = _static_pack(slug)
             logger.warning(
                 "Using static policy pack fallback",
                 extra=structured_extra(
                     "policy_pack_static_fallback",
                     slug=slug,
-                    domain_count=len(domains),
+                    domain_count=len(pack),
                 ),
             )
-            return frozenset(domains)
+            return pack
         raise
 
 
-def load_cached_pack(slug: str) -> FrozenSet[str]:
+def load_cached_pack(slug: str) -> PackIndex:
     """Load domains from on-disk snapshot or bundled static file (no network I/O)."""
-    snap = snapshot_path(slug)
-    if snap.is_file():
-        domains = _read_domains_file(snap)
-        if domains:
-            return frozenset(domains)
-    static = DATA_DIR / f"{slug}.txt"
-    if static.is_file():
-        return frozenset(_read_domains_file(static))
-    return frozenset()
+    pack = _snapshot_pack(slug)
+    if pack is not None:
+        return pack
+    return _static_pack(slug)
 
 
 def count_cached_pack_domains(slug: str) -> int:
@@ -217,24 +409,50 @@ def pack_domain_count_meta(slug: str) -> tuple[int, str]:
     """
     snap = snapshot_path(slug)
     if snap.is_file():
-        snap_count = len(_read_domains_file(snap))
-        if snap_count > 0:
-            return snap_count, "snapshot"
+        meta = read_snapshot_meta(slug) or _backfill_snapshot_meta(slug)
+        if meta.count > 0:
+            return meta.count, "snapshot"
     static = DATA_DIR / f"{slug}.txt"
     if static.is_file():
-        seed_count = len(_read_domains_file(static))
+        seed_count = _seed_domain_count(str(static), static.stat().st_mtime_ns)
         if seed_count > 0:
             return seed_count, "seed"
     return 0, "empty"
 
 
+def _backfill_snapshot_meta(slug: str) -> PackSnapshotMeta:
+    """Sidecar for a snapshot written without one (older release or copied in by hand)."""
+    snap = snapshot_path(slug)
+    pack = _snapshot_pack(slug)
+    digest = hashlib.sha256()
+    with open(snap, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    meta = PackSnapshotMeta(
+        count=len(pack) if pack is not None else 0,
+        sha256=digest.hexdigest(),
+        source_url="",
+        fetched_at=datetime.fromtimestamp(snap.stat().st_mtime, timezone.utc).isoformat(),
+    )
+    try:
+        _write_snapshot_meta(slug, meta)
+    except OSError:
+        pass
+    return meta
+
+
+@lru_cache(maxsize=16)
+def _seed_domain_count(path: str, mtime_ns: int) -> int:
+    return len(_read_domains_file(Path(path)))
+
+
 def clear_sorted_pack_domains_cache() -> None:
     _sorted_pack_domains.cache_clear()
 
 
 @lru_cache(maxsize=16)
-def _sorted_pack_domains(slug: str) -> Tuple[str, ...]:
-    return tuple(sorted(load_cached_pack(slug)))
+def _sorted_pack_domains(slug: str) -> PackIndex:
+    return load_cached_pack(slug)
 
 
 def list_pack_domains_page(
@@ -246,16 +464,16 @@ def list_pack_domains_page(
 ) -> Tuple[List[str], int, str]:
     """Paginated domain list for admin UI (search is substring match)."""
     _, source = pack_domain_count_meta(slug)
-    domains = list(_sorted_pack_domains(slug))
+    domains = _sorted_pack_domains(slug)
     query = q.strip().lower()
     if query:
         domains = [d for d in domains if query in d]
     total = len(domains)
-    page = domains[max(0, skip) : max(0, skip) + limit]
+    page = list(domains[max(0, skip) : max(0, skip) + limit])
     return page, total, source
 
 
-def load_remote_or_static_pack(slug: str) -> FrozenSet[str]:
+def load_remote_or_static_pack(slug: str) -> PackIndex:
     """DNS sync path: prefer cache; refresh from network only if cache is empty."""
     cached = load_cached_pack(slug)
     if cached:
@@ -268,4 +486,4 @@ def load_remote_or_static_pack(slug: str) -> FrozenSet[str]:
                 "Policy pack refresh failed during load",
                 extra=structured_extra("policy_pack_load_empty", slug=slug),
             )
-    return frozenset()
+    return cached
@@ -3,9 +3,10 @@
 from __future__ import annotations
 
 from functools import lru_cache
-from typing import Dict, List, Set
+from typing import Dict, List, Set, Tuple
 
 from app.features.policy.pack_common import BUILTIN_PACK_SLUGS, REMOTE_PACK_SLUGS
+from app.features.policy.pack_store import PackIndex
 from app.features.policy.pack_fetch import (
     clear_sorted_pack_domains_cache,
     load_remote_or_static_pack,
@@ -20,8 +21,9 @@ def clear_pack_cache() -> None:
 
 
 @lru_cache(maxsize=1)
-def load_all_packs() -> Dict[str, frozenset[str]]:
-    packs: Dict[str, frozenset[str]] = {}
+def load_all_packs() -> Dict[str, PackIndex]:
+    """Sorted, mmap-backed pack lists (shared between workers via the page cache)."""
+    packs: Dict[str, PackIndex] = {}
     for slug in BUILTIN_PACK_SLUGS:
         packs[slug] = load_remote_or_static_pack(slug)
     return packs
@@ -38,13 +40,9 @@ def refresh_pack(slug: str) -> int:
     return count
 
 
-def pack_domain_counts() -> Dict[str, int]:
-    """Counts for admin API — never triggers upstream fetch."""
-    return {slug: pack_domain_count_meta(slug)[0] for slug in BUILTIN_PACK_SLUGS}
-
-
-def pack_domain_count_sources() -> Dict[str, str]:
-    return {slug: pack_domain_count_meta(slug)[1] for slug in BUILTIN_PACK_SLUGS}
+def pack_domain_count_metas() -> Dict[str, Tuple[int, str]]:
+    """(count, source) per pack for the admin API; reads sidecars, never fetches upstream."""
+    return {slug: pack_domain_count_meta(slug) for slug in BUILTIN_PACK_SLUGS}
 
 
 def domains_for_packs(slugs: List[str]) -> Set[str]:
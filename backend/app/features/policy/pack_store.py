@@ -0,0 +1,128 @@
+"""Compiled pack domain lists: sorted, deduplicated, memory-mapped read-only.
+
+Layout (little-endian)::
+
+    magic    8 bytes   b"TEPACK01"
+    count    uint32
+    offsets  (count + 1) x uint32   byte offsets of each domain in ``data``
+    data     UTF-8 domains back to back, sorted
+
+Packs are compiled once when a snapshot is written and then ``mmap``ed, so every
+API worker shares one copy through the page cache instead of building its own
+set of str objects. UTF-8 preserves code point order, so membership is a plain
+binary search over the decoded entries.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Iterable, Iterator, List, Union, overload
+
+_MAGIC = b"TEPACK01"
+_HEADER = struct.Struct("<8sI")
+
+
+def _encode(domains: Iterable[str]) -> bytes:
+    entries = sorted({d.encode("utf-8") for d in domains if d})
+    offsets = array("I", [0])
+    total = 0
+    for entry in entries:
+        total += len(entry)
+        offsets.append(total)
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    return _HEADER.pack(_MAGIC, len(entries)) + offsets.tobytes() + b"".join(entries)
+
+
+class PackIndex(Sequence):
+    """Sorted domains backed by an mmap (or bytes for small in-memory packs)."""
+
+    def __init__(self, buffer: Union[mmap.mmap, bytes]):
+        if len(buffer) < _HEADER.size:
+            raise ValueError("pack index is truncated")
+        magic, count = _HEADER.unpack_from(buffer, 0)
+        if magic != _MAGIC:
+            raise ValueError("not a pack index file")
+        start = _HEADER.size
+        self._data_start = start + 4 * (count + 1)
+        if len(buffer) < self._data_start:
+            raise ValueError("pack index is truncated")
+        view = memoryview(buffer)[start : self._data_start]
+        if sys.byteorder == "little":
+            offsets = view.cast("I")
+        else:
+            offsets = array("I", view.tobytes())
+            offsets.byteswap()
+        if self._data_start + offsets[count] != len(buffer):
+            raise ValueError("pack index size does not match its offsets")
+        self._buffer = buffer
+        self._offsets = offsets
+        self._count = count
+
+    @classmethod
+    def from_domains(cls, domains: Iterable[str]) -> "PackIndex":
+        return cls(_encode(domains))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _entry(self, i: int) -> str:
+        base = self._data_start
+        return self._buffer[base + self._offsets[i] : base + self._offsets[i + 1]].decode("utf-8")
+
+    @overload
+    def __getitem__(self, i: int) -> str: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> List[str]: ...
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._entry(j) for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("pack index out of range")
+        return self._entry(i)
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._count):
+            yield self._entry(i)
+
+    def __contains__(self, domain: object) -> bool:
+        if not isinstance(domain, str):
+            return False
+        i = bisect_left(self, domain)
+        return i < self._count and self._entry(i) == domain
+
+
+def write_pack_index(path: Path, domains: Iterable[str]) -> int:
+    """Compile ``domains`` to ``path`` atomically; returns the stored count.
+
+    Readers that already mapped the old file keep it until they reopen.
+    """
+    body = _encode(domains)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return _HEADER.unpack_from(body, 0)[1]
+
+
+def open_pack_index(path: Path) -> PackIndex:
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return PackIndex(buffer)
@@ -1,5 +1,5 @@
 from datetime import datetime, timedelta, timezone
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from sqlalchemy.orm import Session, joinedload
 
@@ -9,6 +9,8 @@ from app.features.policy.models.policy_pack import PolicyPack
 from app.features.policy.models.policy_profile import PolicyProfile
 from app.features.vpn.models.ip_lease import IpLease
 
+DEFAULT_PROFILE_SLUG = "teen"
+
 
 class PolicyRepository:
     def __init__(self, db: Session):
@@ -30,7 +32,7 @@ class PolicyRepository:
         return self.db.query(PolicyProfile).filter(PolicyProfile.slug == slug).first()
 
     def get_default_profile(self) -> Optional[PolicyProfile]:
-        return self.get_profile_by_slug("teen")
+        return self.get_profile_by_slug(DEFAULT_PROFILE_SLUG)
 
     def update_pack_global(self, slug: str, enabled: bool) -> Optional[PolicyPack]:
         pack = self.get_pack_by_slug(slug)
@@ -82,6 +84,15 @@ class PolicyRepository:
             .first()
         )
 
+    def active_quarantines_by_device(self) -> Dict[int, DeviceQuarantine]:
+        """Same pick as ``get_active_quarantine`` (latest expiry), for every device at once."""
+        by_device: Dict[int, DeviceQuarantine] = {}
+        for row in self.list_active_quarantines():
+            current = by_device.get(row.device_id)
+            if current is None or row.expires_at > current.expires_at:
+                by_device[row.device_id] = row
+        return by_device
+
     def start_quarantine(self, device_id: int, score: int, hours: int) -> DeviceQuarantine:
         now = datetime.now(timezone.utc)
         existing = self.get_active_quarantine(device_id)
@@ -1,4 +1,7 @@
-from fastapi import APIRouter, Depends, Query
+from typing import Optional
+
+from fastapi import APIRouter, Body, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.features.policy.schemas.policy import (
@@ -8,6 +11,7 @@ from app.features.policy.schemas.policy import (
     ForbiddenCountryPolicyRead,
     GeoCountryPolicyUpdate,
     PolicyApplyResponse,
+    PolicyDnsSyncDeltaRequest,
     PolicyDnsSyncResponse,
     PolicyPackDomainsPage,
     PolicyPackRead,
@@ -117,13 +121,76 @@ def update_forbidden_country_policy(
     return GeoCountryPolicyService(db).save_policy(body)
 
 
+def _if_none_match(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match", "")
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _dns_sync_response(
+    sync: PolicyDnsSyncResponse,
+    request: Request,
+    response: Response,
+    known: Optional[PolicyDnsSyncDeltaRequest] = None,
+):
+    etag = f'"{sync.version}"'
+    if _if_none_match(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    if known is None:
+        return sync
+    return PolicyDnsService.diff_dns_sync(sync, known)
+
+
 @router.get("/dns-sync", response_model=PolicyDnsSyncResponse)
 def policy_dns_sync(
+    request: Request,
+    response: Response,
+    _: None = Depends(verify_dns_ingest_service),
+    db: Session = Depends(get_db),
+):
+    """Merged pack/profile/schedule/behavior blocks for dnsmasq (replaces blocked-sites sync).
+
+    Sends an ETag of the content version; a matching If-None-Match gets 304.
+    """
+    return _dns_sync_response(PolicyDnsService(db).build_dns_sync(), request, response)
+
+
+@router.post("/dns-sync", response_model=PolicyDnsSyncResponse)
+def policy_dns_sync_delta(
+    body: PolicyDnsSyncDeltaRequest,
+    request: Request,
+    response: Response,
+    _: None = Depends(verify_dns_ingest_service),
+    db: Session = Depends(get_db),
+):
+    """Like GET, but leaves out the global list and device entries whose hashes are in the body."""
+    return _dns_sync_response(PolicyDnsService(db).build_dns_sync(), request, response, known=body)
+
+
+@router.post("/dns-sync/stream")
+def policy_dns_sync_stream(
+    request: Request,
+    body: Optional[PolicyDnsSyncDeltaRequest] = Body(default=None),
     _: None = Depends(verify_dns_ingest_service),
     db: Session = Depends(get_db),
 ):
-    """Merged pack/profile/schedule/behavior blocks for dnsmasq (replaces blocked-sites sync)."""
-    return PolicyDnsService(db).build_dns_sync()
+    """NDJSON stream of the dns-sync payload (one device per line, domain lists chunked).
+
+    With a body of applied hashes, unchanged parts become ``*_unchanged`` markers.
+    The version is only known once every part is built, so an If-None-Match header
+    costs a hashes-only build first: a match gets 304, anything else is streamed
+    from a second build.
+    """
+    service = PolicyDnsService(db)
+    if request.headers.get("if-none-match"):
+        etag = f'"{service.dns_sync_version()}"'
+        if _if_none_match(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+    return StreamingResponse(
+        service.stream_dns_sync(body),
+        media_type="application/x-ndjson",
+    )
 
 
 @router.get("/sync-status", response_model=PolicySyncStatusRead)
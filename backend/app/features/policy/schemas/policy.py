@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -119,17 +119,48 @@ class PolicyDeviceDnsEntry(BaseModel):
     mac_address: str = ""
     tag: str
     block_domains: List[str]
+    """Device-only blocks (profile extras, behavior auto-blocks); pack domains are in ``packs``."""
+    pack_slugs: List[str] = Field(default_factory=list)
+    """Shared packs this device picks up by setting each pack's tag."""
     allowlist_only: bool = False
     allowlist_domains: List[str] = Field(default_factory=list)
     block_country_tlds: List[str] = Field(
         default_factory=list,
         description="dnsmasq suffix patterns (e.g. .ir) for forbidden-country ccTLD blocking",
     )
+    content_hash: str = ""
+    """sha256 of the entry's rules; dns-sync rewrites the device file only when it changes."""
+
+
+class PolicyPackDnsEntry(BaseModel):
+    """A profile/schedule pack written once and shared by tag across devices."""
+
+    slug: str
+    tag: str
+    domains: List[str] = Field(default_factory=list)
+    content_hash: str = ""
 
 
 class PolicyDnsSyncResponse(BaseModel):
     global_domains: List[str] = Field(default_factory=list)
     entries: List[PolicyDeviceDnsEntry] = Field(default_factory=list)
+    packs: List[PolicyPackDnsEntry] = Field(default_factory=list)
+    global_hash: str = ""
+    version: str = ""
+    """Hash of the global list and every entry hash; served as the ETag."""
+    global_unchanged: bool = False
+    """Delta responses: global_domains omitted because the caller's global_hash is current."""
+    unchanged_device_ids: List[int] = Field(default_factory=list)
+    """Delta responses: devices whose content_hash the caller already has (entries omitted)."""
+    unchanged_pack_slugs: List[str] = Field(default_factory=list)
+
+
+class PolicyDnsSyncDeltaRequest(BaseModel):
+    """Hashes dns-sync applied last time; unchanged parts are left out of the response."""
+
+    global_hash: str = ""
+    device_hashes: Dict[int, str] = Field(default_factory=dict)
+    pack_hashes: Dict[str, str] = Field(default_factory=dict)
 
 
 class PolicySyncStatusRead(BaseModel):
@@ -73,6 +73,33 @@ class ForbiddenCountryService:
             patterns.update(dnsmasq_tld_patterns_for_country(code))
         return sorted(patterns, key=len, reverse=True)
 
+    def dnsmasq_tld_patterns_by_device(self) -> Dict[int, List[str]]:
+        """``dnsmasq_tld_patterns_for_device`` for every device with a login country.
+
+        Loads rules once and the latest login geo for all devices in one query;
+        devices missing from the result have no blocked TLDs.
+        """
+        if not self.is_enabled():
+            return {}
+        rules = self.list_rules()
+        if not rules:
+            return {}
+        by_country: Dict[str, List[str]] = {}
+        out: Dict[int, List[str]] = {}
+        for row in self.login_geo.list_latest_per_device():
+            code = (row.country_code or "").strip().upper()
+            if not code:
+                continue
+            patterns = by_country.get(code)
+            if patterns is None:
+                found: Set[str] = set()
+                for dest in blocked_countries_for_user(code, rules):
+                    found.update(dnsmasq_tld_patterns_for_country(dest))
+                patterns = by_country[code] = sorted(found, key=len, reverse=True)
+            if patterns:
+                out[row.device_id] = patterns
+        return out
+
     def process_queries(self, queries: List[DnsQueryCreate]) -> int:
         """Alert + per-device block for explicit domains that match forbidden destination country."""
         if not self.is_enabled() or not queries:
@@ -2,7 +2,11 @@
 
 from __future__ import annotations
 
-from typing import List, Set
+import hashlib
+import json
+import re
+from itertools import islice
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
 
 from sqlalchemy.orm import Session
 
@@ -10,12 +14,72 @@ from app.features.client_behavior.behavior_whitelist import BEHAVIOR_BLOCK_WHITE
 from app.features.client_behavior.repositories.client_blocked_domain_repository import (
     ClientBlockedDomainRepository,
 )
+from app.features.policy.domain_compaction import CompactedDomains, CompactionStats, DomainTrie
 from app.features.policy.pack_common import normalize_domain
-from app.features.policy.pack_loader import domains_for_packs
-from app.features.policy.repositories.policy_repository import PolicyRepository
+from app.features.policy.pack_loader import domains_for_packs, load_all_packs
+from app.features.policy.repositories.policy_repository import DEFAULT_PROFILE_SLUG, PolicyRepository
 from app.features.policy.schedule import active_schedule_pack_slugs
-from app.features.policy.schemas.policy import PolicyDeviceDnsEntry, PolicyDnsSyncResponse
+from app.features.policy.schemas.policy import (
+    PolicyDeviceDnsEntry,
+    PolicyDnsSyncDeltaRequest,
+    PolicyDnsSyncResponse,
+    PolicyPackDnsEntry,
+)
 from app.features.policy.services.forbidden_country_service import ForbiddenCountryService
+from app.shared.logging_context import structured_extra
+from app.shared.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class _ProfileLayer(NamedTuple):
+    """Per-build result shared by every device with the same packs and profile extras."""
+
+    pack_slugs: List[str]
+    compacted: CompactedDomains  # extras not covered by global or pack rules
+    extras: FrozenSet[str]
+
+
+def _digest(lines: Iterable[str]) -> str:
+    digest = hashlib.sha256()
+    for line in lines:
+        digest.update(line.encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def pack_tag(slug: str) -> str:
+    """dnsmasq tag that devices set to pick up a shared pack file."""
+    return "ng_pack_" + re.sub(r"[^a-z0-9_]", "_", slug.lower())
+
+
+# Domains per global_domains / pack_domains record in the NDJSON stream
+STREAM_CHUNK_DOMAINS = 5000
+
+DnsSyncPart = Union[PolicyDeviceDnsEntry, PolicyPackDnsEntry]
+
+
+def _sync_version(
+    global_hash: str,
+    device_hashes: Iterable[Tuple[int, str]],
+    pack_hashes: Iterable[Tuple[str, str]],
+) -> str:
+    """Overall content version (the ETag) from the global hash and every part hash."""
+    return _digest(
+        [global_hash]
+        + [f"{device_id}:{content_hash}" for device_id, content_hash in sorted(device_hashes)]
+        + [f"pack:{slug}:{content_hash}" for slug, content_hash in sorted(pack_hashes)]
+    )
+
+
+def _ndjson(record: Dict[str, Any]) -> bytes:
+    return (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _chunked(domains: List[str]) -> Iterator[List[str]]:
+    it = iter(domains)
+    while chunk := list(islice(it, STREAM_CHUNK_DOMAINS)):
+        yield chunk
 
 
 class PolicyDnsService:
@@ -27,32 +91,200 @@ class PolicyDnsService:
 
     def build_dns_sync(self) -> PolicyDnsSyncResponse:
         """Build dnsmasq rules: global_domains apply to all VPN/LAN DNS clients."""
+        parts = self.iter_dns_sync()
+        global_domains: List[str] = next(parts)  # type: ignore[assignment]
+        entries: List[PolicyDeviceDnsEntry] = []
+        packs: List[PolicyPackDnsEntry] = []
+        for part in parts:
+            if isinstance(part, PolicyDeviceDnsEntry):
+                entries.append(part)
+            else:
+                packs.append(part)
+        global_hash = _digest(global_domains)
+        return PolicyDnsSyncResponse(
+            global_domains=global_domains,
+            entries=entries,
+            packs=packs,
+            global_hash=global_hash,
+            version=_sync_version(
+                global_hash,
+                ((e.device_id, e.content_hash) for e in entries),
+                ((p.slug, p.content_hash) for p in packs),
+            ),
+        )
+
+    def dns_sync_version(self) -> str:
+        """Content version (the ETag) of the current dns-sync, keeping only part hashes."""
+        parts = self.iter_dns_sync()
+        global_hash = _digest(next(parts))  # type: ignore[arg-type]
+        device_hashes: List[Tuple[int, str]] = []
+        pack_hashes: List[Tuple[str, str]] = []
+        for part in parts:
+            if isinstance(part, PolicyDeviceDnsEntry):
+                device_hashes.append((part.device_id, part.content_hash))
+            else:
+                pack_hashes.append((part.slug, part.content_hash))
+        return _sync_version(global_hash, device_hashes, pack_hashes)
+
+    def stream_dns_sync(self, known: Optional[PolicyDnsSyncDeltaRequest] = None) -> Iterator[bytes]:
+        """NDJSON form of ``build_dns_sync`` (and ``diff_dns_sync`` when ``known`` is given).
+
+        Records, in order: ``global`` (hash, count, unchanged) and its ``global_domains``
+        chunks; one ``device`` or ``device_unchanged`` per device; ``pack`` or
+        ``pack_unchanged`` per shared pack with ``pack_domains`` chunks; and a final
+        ``end`` carrying the version. Each device part is encoded as soon as it is
+        built. The global list and every referenced pack's compacted list stay in
+        memory until the packs are sent at the end, since later devices are compacted
+        against them; see ``iter_dns_sync``.
+        """
+        known = known or PolicyDnsSyncDeltaRequest()
+        device_hashes: List[Tuple[int, str]] = []
+        pack_hashes: List[Tuple[str, str]] = []
+        try:
+            parts = self.iter_dns_sync()
+            global_domains: List[str] = next(parts)  # type: ignore[assignment]
+            global_hash = _digest(global_domains)
+            global_unchanged = bool(known.global_hash) and known.global_hash == global_hash
+            yield _ndjson({
+                "type": "global",
+                "global_hash": global_hash,
+                "count": len(global_domains),
+                "unchanged": global_unchanged,
+            })
+            if not global_unchanged:
+                for chunk in _chunked(global_domains):
+                    yield _ndjson({"type": "global_domains", "domains": chunk})
+            del global_domains
+
+            for part in parts:
+                if isinstance(part, PolicyDeviceDnsEntry):
+                    device_hashes.append((part.device_id, part.content_hash))
+                    if known.device_hashes.get(part.device_id) == part.content_hash:
+                        yield _ndjson({
+                            "type": "device_unchanged",
+                            "device_id": part.device_id,
+                            "content_hash": part.content_hash,
+                        })
+                    else:
+                        yield _ndjson({"type": "device", **part.model_dump()})
+                    continue
+                pack_hashes.append((part.slug, part.content_hash))
+                header = {"slug": part.slug, "tag": part.tag, "content_hash": part.content_hash}
+                if known.pack_hashes.get(part.slug) == part.content_hash:
+                    yield _ndjson({"type": "pack_unchanged", **header})
+                    continue
+                yield _ndjson({"type": "pack", **header, "count": len(part.domains)})
+                for chunk in _chunked(part.domains):
+                    yield _ndjson({"type": "pack_domains", "slug": part.slug, "domains": chunk})
+
+            yield _ndjson({
+                "type": "end",
+                "version": _sync_version(global_hash, device_hashes, pack_hashes),
+                "devices": len(device_hashes),
+                "packs": len(pack_hashes),
+            })
+        finally:
+            # FastAPI closes yield dependencies before a StreamingResponse is sent, so the
+            # session reconnects lazily for the stream and must be released here.
+            self.db.close()
+
+    def iter_dns_sync(self) -> Iterator[Union[List[str], DnsSyncPart]]:
+        """Yield the global domain list, then one entry per device, then each shared pack.
+
+        Profile and schedule packs are emitted once each in ``packs``; a device lists
+        the pack slugs it uses and only its own extra/behavior blocks in block_domains.
+        Every list is suffix-compacted: a domain under a blocked ancestor (in the same
+        list, the global list or one of the device's packs) is left out. Entries and
+        packs carry their content hashes.
+
+        Pack slugs and compacted profile extras are worked out once per distinct
+        (effective packs, extras) combination; each device only layers its own
+        behavior blocks on top, so build time follows the number of profiles.
+
+        Tries are only used to compact a list and are dropped right after. The global
+        list, each referenced pack and each profile layer are then kept as
+        ``CompactedDomains`` (the sorted list plus a set of the same strings) until the
+        end of the build, because devices are compacted against them and packs are
+        emitted last.
+        """
         self.policy_repo.end_expired_quarantines()
         packs = self.policy_repo.list_packs()
         global_slugs = [p.slug for p in packs if p.enabled_globally]
-        global_domains = sorted(domains_for_packs(global_slugs))
+        global_set = domains_for_packs(global_slugs)
+        global_cover = CompactedDomains(DomainTrie(global_set).domains())
+        stats = [CompactionStats(len(global_set), len(global_cover))]
+        yield global_cover.domains
+        del global_set
+        all_packs = load_all_packs()
+        referenced: Dict[str, None] = {}
+        pack_covers: Dict[str, CompactedDomains] = {}
+
+        def pack_cover(slug: str) -> CompactedDomains:
+            cover = pack_covers.get(slug)
+            if cover is None:
+                cover = pack_covers[slug] = CompactedDomains(
+                    DomainTrie(d for d in all_packs[slug] if not global_cover.covers(d)).domains()
+                )
+            return cover
+
+        profile_keys: Dict[int, Tuple[FrozenSet[str], FrozenSet[str]]] = {}
+        layers: Dict[Tuple[FrozenSet[str], FrozenSet[str]], _ProfileLayer] = {}
+        allowlists: Dict[int, List[str]] = {}
+
+        def profile_layer(profile) -> _ProfileLayer:
+            key = profile_keys.get(profile.id)
+            if key is None:
+                # Global packs already reach every client through global_domains.
+                slugs = frozenset(
+                    slug
+                    for slug in {
+                        *(profile.enabled_pack_slugs or []),
+                        *active_schedule_pack_slugs(profile.schedule_rules or []),
+                    }
+                    if slug in all_packs and slug not in global_slugs
+                )
+                extras = frozenset(
+                    d for d in (normalize_domain(str(raw)) for raw in profile.extra_block_domains or []) if d
+                )
+                key = profile_keys[profile.id] = (slugs, extras)
+            layer = layers.get(key)
+            if layer is None:
+                slugs, extras = key
+                pack_slugs = sorted(slugs)
+                trie = DomainTrie(
+                    d for d in extras
+                    if not global_cover.covers(d) and not any(pack_cover(slug).covers(d) for slug in pack_slugs)
+                )
+                layer = layers[key] = _ProfileLayer(pack_slugs, CompactedDomains(trie.domains()), extras)
+            return layer
+
+        # A fixed number of queries for all devices; the loop below only reads these maps.
+        profiles = {profile.id: profile for profile in self.policy_repo.list_profiles()}
+        default_profile = next((p for p in profiles.values() if p.slug == DEFAULT_PROFILE_SLUG), None)
+        quarantines = self.policy_repo.active_quarantines_by_device()
+        device_blocks = self.block_repo.list_active_domains_by_device()
+        country_tlds_by_device = self.forbidden_country.dnsmasq_tld_patterns_by_device()
 
-        entries: List[PolicyDeviceDnsEntry] = []
         for device in self.policy_repo.list_devices_for_dns_sync():
             client_ip = self._device_client_ip(device)
             if not client_ip and not device.mac_address:
                 continue
-            profile = None
-            if device.policy_profile_id:
-                profile = self.policy_repo.get_profile_by_id(device.policy_profile_id)
+            profile = profiles.get(device.policy_profile_id) if device.policy_profile_id else None
             if profile is None:
-                profile = self.policy_repo.get_default_profile()
+                profile = default_profile
             if profile is None:
                 continue
 
-            quarantine = self.policy_repo.get_active_quarantine(device.id)
+            quarantine = quarantines.get(device.id)
             if quarantine:
                 # Admin quarantine (score=None): block all DNS. Behavior quarantine keeps allowlist.
                 if quarantine.score is None:
                     allowlist_domains: list[str] = []
                 else:
-                    allowlist_domains = sorted(self._build_allowlist(profile))
-                entries.append(
+                    allowlist_domains = allowlists.get(profile.id)
+                    if allowlist_domains is None:
+                        allowlist_domains = allowlists[profile.id] = sorted(self._build_allowlist(profile))
+                yield self._stamped(
                     PolicyDeviceDnsEntry(
                         device_id=device.id,
                         client_ip=client_ip,
@@ -65,37 +297,94 @@ class PolicyDnsService:
                 )
                 continue
 
-            pack_slugs = list(profile.enabled_pack_slugs or [])
-            pack_slugs.extend(global_slugs)
-            for slug in active_schedule_pack_slugs(profile.schedule_rules or []):
-                if slug not in pack_slugs:
-                    pack_slugs.append(slug)
-
-            domains: Set[str] = set(domains_for_packs(pack_slugs))
-            for raw in profile.extra_block_domains or []:
-                d = normalize_domain(str(raw))
-                if d:
-                    domains.add(d)
-
-            for block in self.block_repo.list_active_for_device(device.id):
-                domains.add(block.domain.lower())
+            layer = profile_layer(profile)
+            pack_slugs = layer.pack_slugs
+            referenced.update(dict.fromkeys(pack_slugs))
 
-            country_tlds = self.forbidden_country.dnsmasq_tld_patterns_for_device(device.id)
+            blocks = {domain.lower() for domain in device_blocks.get(device.id, ())}
+            additions = [
+                d for d in blocks
+                if not layer.compacted.covers(d)
+                and not global_cover.covers(d)
+                and not any(pack_cover(slug).covers(d) for slug in pack_slugs)
+            ]
+            if additions:
+                block_domains = DomainTrie([*layer.compacted.domains, *additions]).domains()
+            else:
+                block_domains = layer.compacted.domains
+            domains_in = len(layer.extras) + sum(1 for d in blocks if d not in layer.extras)
+            stats.append(CompactionStats(domains_in, len(block_domains)))
 
-            entries.append(
+            yield self._stamped(
                 PolicyDeviceDnsEntry(
                     device_id=device.id,
                     client_ip=client_ip,
                     mac_address=device.mac_address or "",
                     tag=f"ng_device_{device.id}",
-                    block_domains=sorted(domains),
+                    block_domains=block_domains,
+                    pack_slugs=pack_slugs,
                     allowlist_only=False,
                     allowlist_domains=[],
-                    block_country_tlds=country_tlds,
+                    block_country_tlds=country_tlds_by_device.get(device.id, []),
                 )
             )
 
-        return PolicyDnsSyncResponse(global_domains=global_domains, entries=entries)
+        for slug in sorted(referenced):
+            pack_domains = pack_cover(slug).domains
+            del pack_covers[slug]
+            stats.append(CompactionStats(len(all_packs[slug]), len(pack_domains)))
+            yield self._stamped(PolicyPackDnsEntry(slug=slug, tag=pack_tag(slug), domains=pack_domains))
+
+        total = CompactionStats(sum(st.domains_in for st in stats), sum(st.domains_out for st in stats))
+        logger.info(
+            "Policy DNS block lists compacted",
+            extra=structured_extra(
+                "policy_dns_compacted",
+                domains_in=total.domains_in,
+                domains_out=total.domains_out,
+                reduction_ratio=round(total.reduction, 4),
+            ),
+        )
+
+    @staticmethod
+    def _stamped(part: DnsSyncPart) -> DnsSyncPart:
+        if isinstance(part, PolicyDeviceDnsEntry):
+            part.content_hash = _digest([part.model_dump_json(exclude={"content_hash"})])
+        else:
+            part.content_hash = _digest([part.tag, *part.domains])
+        return part
+
+    @staticmethod
+    def diff_dns_sync(
+        sync: PolicyDnsSyncResponse,
+        known: PolicyDnsSyncDeltaRequest,
+    ) -> PolicyDnsSyncResponse:
+        """Leave out the global list, entries and packs whose hashes the caller already applied."""
+        global_unchanged = bool(known.global_hash) and known.global_hash == sync.global_hash
+        changed: List[PolicyDeviceDnsEntry] = []
+        unchanged: List[int] = []
+        for entry in sync.entries:
+            if known.device_hashes.get(entry.device_id) == entry.content_hash:
+                unchanged.append(entry.device_id)
+            else:
+                changed.append(entry)
+        changed_packs: List[PolicyPackDnsEntry] = []
+        unchanged_packs: List[str] = []
+        for pack in sync.packs:
+            if known.pack_hashes.get(pack.slug) == pack.content_hash:
+                unchanged_packs.append(pack.slug)
+            else:
+                changed_packs.append(pack)
+        return PolicyDnsSyncResponse(
+            global_domains=[] if global_unchanged else sync.global_domains,
+            entries=changed,
+            packs=changed_packs,
+            global_hash=sync.global_hash,
+            version=sync.version,
+            global_unchanged=global_unchanged,
+            unchanged_device_ids=unchanged,
+            unchanged_pack_slugs=unchanged_packs,
+        )
 
     @staticmethod
     def _device_client_ip(device) -> str:
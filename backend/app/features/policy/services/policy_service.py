@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
@@ -8,11 +8,10 @@ from app.features.client_behavior.repositories.device_security_policy_repository
 )
 from app.features.devices.repositories.device_repository import DeviceRepository
 from app.features.policy.pack_common import BUILTIN_PACK_SLUGS, REMOTE_PACK_SLUGS
-from app.features.policy.pack_fetch import list_pack_domains_page
+from app.features.policy.pack_fetch import list_pack_domains_page, pack_domain_count_meta
 from app.features.policy.pack_loader import (
     load_all_packs,
-    pack_domain_count_sources,
-    pack_domain_counts,
+    pack_domain_count_metas,
     refresh_pack,
 )
 from app.features.policy.repositories.policy_repository import PolicyRepository
@@ -49,21 +48,8 @@ class PolicyService:
         self.sync_repo = PolicySyncRepository(db)
 
     def list_packs(self) -> List[PolicyPackRead]:
-        counts = pack_domain_counts()
-        sources = pack_domain_count_sources()
-        return [
-            PolicyPackRead(
-                id=p.id,
-                slug=p.slug,
-                name=p.name,
-                description=p.description,
-                enabled_globally=p.enabled_globally,
-                domain_count=counts.get(p.slug, 0),
-                blocked_sites_count=counts.get(p.slug, 0) if p.enabled_globally else 0,
-                domain_list_source=sources.get(p.slug, "empty"),
-            )
-            for p in self.repo.list_packs()
-        ]
+        metas = pack_domain_count_metas()
+        return [self._pack_read(p, metas.get(p.slug, (0, "empty"))) for p in self.repo.list_packs()]
 
     def list_pack_domains(
         self,
@@ -115,17 +101,21 @@ class PolicyService:
         if not pack:
             raise HTTPException(status_code=404, detail=f"Pack {slug} not found")
         self.db.commit()
-        counts = pack_domain_counts()
-        sources = pack_domain_count_sources()
+        meta = pack_domain_count_meta(pack.slug) if pack.slug in BUILTIN_PACK_SLUGS else (0, "empty")
+        return self._pack_read(pack, meta)
+
+    @staticmethod
+    def _pack_read(pack, meta: Tuple[int, str]) -> PolicyPackRead:
+        count, source = meta
         return PolicyPackRead(
             id=pack.id,
             slug=pack.slug,
             name=pack.name,
             description=pack.description,
             enabled_globally=pack.enabled_globally,
-            domain_count=counts.get(pack.slug, 0),
-            blocked_sites_count=counts.get(pack.slug, 0) if pack.enabled_globally else 0,
-            domain_list_source=sources.get(pack.slug, "empty"),
+            domain_count=count,
+            blocked_sites_count=count if pack.enabled_globally else 0,
+            domain_list_source=source,
         )
 
     def list_profiles(self) -> List[PolicyProfileRead]:
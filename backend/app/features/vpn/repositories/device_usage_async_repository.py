@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.features.vpn.repositories.device_usage_repository import (
+    UsageSampleWithDevice,
+    latest_usage_with_device_statement,
+)
+
+
+class AsyncDeviceUsageRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def list_latest_with_device_since(self, since: datetime) -> list[UsageSampleWithDevice]:
+        """Most recent usage sample per VPN device_id with optional registered Device row."""
+        result = await self.db.execute(latest_usage_with_device_statement(since))
+        return [
+            UsageSampleWithDevice(sample=sample, device_id=device_id, client_ip=client_ip)
+            for sample, device_id, client_ip in result.all()
+        ]
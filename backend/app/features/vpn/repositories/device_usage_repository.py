@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta, timezone
 from typing import NamedTuple, Optional
 
-from sqlalchemy import and_, func
+from sqlalchemy import Select, and_, func, select
 from sqlalchemy.orm import Session
 
 from app.features.devices.models.device import Device
@@ -16,6 +16,30 @@ class UsageSampleWithDevice(NamedTuple):
     client_ip: Optional[str]
 
 
+def latest_usage_with_device_statement(since: datetime) -> Select:
+    """Latest sample per VPN device since ``since`` joined to its Device/lease (sync + async)."""
+    latest = (
+        select(
+            DeviceUsageSample.device_external_id,
+            func.max(DeviceUsageSample.id).label("max_id"),
+        )
+        .where(DeviceUsageSample.recorded_at >= since)
+        .group_by(DeviceUsageSample.device_external_id)
+        .subquery()
+    )
+    return (
+        select(DeviceUsageSample, Device.id, IpLease.ip)
+        .join(latest, DeviceUsageSample.id == latest.c.max_id)
+        .outerjoin(VpnPeer, VpnPeer.device_id == DeviceUsageSample.device_external_id)
+        .outerjoin(
+            IpLease,
+            and_(IpLease.peer_id == VpnPeer.id, IpLease.released_at.is_(None)),
+        )
+        .outerjoin(Device, Device.ip_lease_id == IpLease.id)
+        .order_by(DeviceUsageSample.recorded_at.desc())
+    )
+
+
 class DeviceUsageRepository:
     def __init__(self, db: Session):
         self.db = db
@@ -46,27 +70,7 @@ class DeviceUsageRepository:
 
     def list_latest_with_device_since(self, since: datetime) -> list[UsageSampleWithDevice]:
         """Most recent usage sample per VPN device_id with optional registered Device row."""
-        latest = (
-            self.db.query(
-                DeviceUsageSample.device_external_id,
-                func.max(DeviceUsageSample.id).label("max_id"),
-            )
-            .filter(DeviceUsageSample.recorded_at >= since)
-            .group_by(DeviceUsageSample.device_external_id)
-            .subquery()
-        )
-        rows = (
-            self.db.query(DeviceUsageSample, Device.id, IpLease.ip)
-            .join(latest, DeviceUsageSample.id == latest.c.max_id)
-            .outerjoin(VpnPeer, VpnPeer.device_id == DeviceUsageSample.device_external_id)
-            .outerjoin(
-                IpLease,
-                and_(IpLease.peer_id == VpnPeer.id, IpLease.released_at.is_(None)),
-            )
-            .outerjoin(Device, Device.ip_lease_id == IpLease.id)
-            .order_by(DeviceUsageSample.recorded_at.desc())
-            .all()
-        )
+        rows = self.db.execute(latest_usage_with_device_statement(since)).all()
         return [
             UsageSampleWithDevice(sample=sample, device_id=device_id, client_ip=client_ip)
             for sample, device_id, client_ip in rows
@@ -182,15 +182,18 @@ def _identity_map(db: Session, vpn_device_ids: list[str]) -> dict[str, dict[str,
     return out
 
 
-def list_live(db: Session, *, max_age_sec: Optional[int] = None) -> DeviceUsageLiveResponse:
+def read_live_raw(*, max_age_sec: Optional[int] = None) -> tuple[Optional[list[DeviceUsageLiveItem]], int]:
+    """Redis half of list_live (no database access): raw items, or None without Redis."""
     age = max_age_sec if max_age_sec is not None else settings.USAGE_LIVE_MAX_AGE_SEC
     age = max(5, min(age, 300))
-    cutoff_ms = _ms_now() - age * 1000
     if not redis_available():
-        return DeviceUsageLiveResponse(items=[], max_age_sec=age)
+        return None, age
+    return _list_live_raw(get_redis(), _ms_now() - age * 1000), age
+
 
-    raw = _list_live_raw(get_redis(), cutoff_ms)
-    items = enrich_live_items(db, raw)
+def list_live(db: Session, *, max_age_sec: Optional[int] = None) -> DeviceUsageLiveResponse:
+    raw, age = read_live_raw(max_age_sec=max_age_sec)
+    items = enrich_live_items(db, raw) if raw is not None else []
     return DeviceUsageLiveResponse(items=items, max_age_sec=age)
 
 
@@ -1,10 +1,13 @@
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.features.dns_queries.repositories.dns_alert_repository import DnsAlertRepository
-from app.features.vpn.repositories.device_usage_repository import DeviceUsageRepository
+from app.features.vpn.repositories.device_usage_async_repository import AsyncDeviceUsageRepository
+from app.features.vpn.repositories.device_usage_repository import DeviceUsageRepository, UsageSampleWithDevice
 from app.features.vpn.schemas.usage import UsageReportRequest, UsageReportResponse
 from app.features.vpn.schemas.usage_history import UsageHistoryResponse
 from app.features.vpn.schemas.usage_live import DeviceUsageLiveItem, DeviceUsageLiveResponse
@@ -20,6 +23,58 @@ logger = get_logger(__name__)
 MIB = 1024 * 1024
 
 
+def _live_age(max_age_sec: Optional[int]) -> int:
+    age = max_age_sec if max_age_sec is not None else settings.USAGE_LIVE_MAX_AGE_SEC
+    return max(5, min(age, 300))
+
+
+def _live_item(row: UsageSampleWithDevice) -> DeviceUsageLiveItem:
+    sample = row.sample
+    interval = float(sample.interval_sec) or 1.0
+    rx_rate = (sample.delta_rx_bytes / MIB) / interval
+    tx_rate = (sample.delta_tx_bytes / MIB) / interval
+    return DeviceUsageLiveItem(
+        device_id=row.device_id,
+        vpn_device_id=sample.device_external_id,
+        client_ip=row.client_ip,
+        recorded_at=sample.recorded_at,
+        interval_sec=interval,
+        rx_bytes=sample.rx_bytes,
+        tx_bytes=sample.tx_bytes,
+        delta_rx_bytes=sample.delta_rx_bytes,
+        delta_tx_bytes=sample.delta_tx_bytes,
+        rx_mib_per_sec=round(rx_rate, 3),
+        tx_mib_per_sec=round(tx_rate, 3),
+        total_mib_per_sec=round(rx_rate + tx_rate, 3),
+    )
+
+
+async def list_live_bandwidth_async(
+    db: AsyncSession, *, max_age_sec: Optional[int] = None
+) -> DeviceUsageLiveResponse:
+    """UsageService.list_live_bandwidth for async read endpoints.
+
+    The Redis reads are blocking, so they run in the threadpool; the device lookup then
+    goes through run_sync on the async connection. The PostgreSQL fallback is a
+    native async select.
+    """
+    try:
+        raw, age = await run_in_threadpool(usage_redis_store.read_live_raw, max_age_sec=max_age_sec)
+        if raw is not None:
+            items = await db.run_sync(lambda session: usage_redis_store.enrich_live_items(session, raw))
+            return DeviceUsageLiveResponse(items=items, max_age_sec=age)
+    except Exception as exc:
+        logger.warning(
+            "Redis usage live read failed",
+            extra=structured_extra("usage_redis_live_read_failed", error=str(exc)),
+        )
+
+    age = _live_age(max_age_sec)
+    since = datetime.now(timezone.utc) - timedelta(seconds=age)
+    rows = await AsyncDeviceUsageRepository(db).list_latest_with_device_since(since)
+    return DeviceUsageLiveResponse(items=[_live_item(row) for row in rows], max_age_sec=age)
+
+
 class UsageService:
     def __init__(self, db: Session):
         self.db = db
@@ -105,33 +160,10 @@ class UsageService:
                     extra=structured_extra("usage_redis_live_read_failed", error=str(exc)),
                 )
 
-        age = max_age_sec if max_age_sec is not None else settings.USAGE_LIVE_MAX_AGE_SEC
-        age = max(5, min(age, 300))
+        age = _live_age(max_age_sec)
         since = datetime.now(timezone.utc) - timedelta(seconds=age)
         rows = self.usage_repo.list_latest_with_device_since(since)
-        pg_items = []
-        for row in rows:
-            sample = row.sample
-            interval = float(sample.interval_sec) or 1.0
-            rx_rate = (sample.delta_rx_bytes / MIB) / interval
-            tx_rate = (sample.delta_tx_bytes / MIB) / interval
-            pg_items.append(
-                DeviceUsageLiveItem(
-                    device_id=row.device_id,
-                    vpn_device_id=sample.device_external_id,
-                    client_ip=row.client_ip,
-                    recorded_at=sample.recorded_at,
-                    interval_sec=interval,
-                    rx_bytes=sample.rx_bytes,
-                    tx_bytes=sample.tx_bytes,
-                    delta_rx_bytes=sample.delta_rx_bytes,
-                    delta_tx_bytes=sample.delta_tx_bytes,
-                    rx_mib_per_sec=round(rx_rate, 3),
-                    tx_mib_per_sec=round(tx_rate, 3),
-                    total_mib_per_sec=round(rx_rate + tx_rate, 3),
-                )
-            )
-        return DeviceUsageLiveResponse(items=pg_items, max_age_sec=age)
+        return DeviceUsageLiveResponse(items=[_live_item(row) for row in rows], max_age_sec=age)
 
     def list_usage_history(self, *, minutes: Optional[int] = None) -> UsageHistoryResponse:
         if redis_available():
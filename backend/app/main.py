@@ -11,6 +11,8 @@ import os
 
 from app.shared.request_logging_middleware import RequestLoggingMiddleware
 from app.shared.utils.logging import setup_logging
+from app.shared.admin_auth import verify_admin_api_token
+from app.shared.db_pool_metrics import pool_snapshots
 from app.shared.dependencies import get_db
 from app.features.dns_queries.routes.dns_query_route import router as dns_query_router
 from app.features.policy.routes.policy_route import router as policy_router
@@ -20,6 +22,7 @@ from app.features.vpn.routes.usage_route import router as usage_router
 from app.features.vpn.routes.topology_route import router as vpn_topology_router
 from app.features.dashboard.routes.dashboard_route import router as dashboard_router
 from app.features.policy.startup import warmup_policy_packs
+from app.shared.async_database import dispose_async_engines
 from app.shared.redis_client import close_redis
 from app.shared.config import settings
 
@@ -50,6 +53,7 @@ async def lifespan(app: FastAPI):
         threading.Thread(target=warmup_policy_packs, name="policy-pack-warmup", daemon=True).start()
     yield
     close_redis()
+    await dispose_async_engines()
 
 # Middleware to ensure redirects use HTTPS when behind CloudFront
 class HTTPSRedirectMiddleware(BaseHTTPMiddleware):
@@ -130,6 +134,12 @@ app.add_middleware(RequestLoggingMiddleware)
 def health(db: Session = Depends(get_db)):
     return {"status": "ok"}
 
+
+@app.get("/health/db-pool", dependencies=[Depends(verify_admin_api_token)])
+def db_pool_health():
+    """Connection pool checkout wait, in-use and overflow counters per engine."""
+    return {"pools": pool_snapshots()}
+
 # Include routers
 app.include_router(policy_router)
 app.include_router(dns_query_router)
@@ -0,0 +1,135 @@
+"""Async engines (asyncpg / aiosqlite) for the high-concurrency read endpoints.
+
+Built lazily from DB_URL / DB_READ_URL so importing the app does not require the
+async driver until an async route is hit. The sync engine in ``database.py`` stays
+the default for writes and every other service.
+"""
+
+from __future__ import annotations
+
+import ssl
+from typing import Optional
+
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from app.shared.config import settings
+from app.shared.db_pool_metrics import (
+    InstrumentedAsyncQueuePool,
+    register_engine_pool,
+    unregister_engine_pool,
+)
+
+_ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+# libpq (psycopg2) URL parameters that asyncpg.connect() does not accept; they are
+# translated into connect_args by _asyncpg_connect_args.
+_LIBPQ_PARAMS = ("sslmode", "sslrootcert", "sslcert", "sslkey", "connect_timeout", "application_name")
+
+_async_engine: Optional[AsyncEngine] = None
+_async_read_engine: Optional[AsyncEngine] = None
+_session_factories: dict[int, async_sessionmaker] = {}
+
+
+def async_db_url(url: str) -> str:
+    """Swap the sync driver in a SQLAlchemy URL for its asyncio counterpart."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    driver = _ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        raise ValueError(f"No async driver configured for {backend!r} URLs")
+    if backend == "postgresql":
+        parsed = parsed.difference_update_query(_LIBPQ_PARAMS)
+    return parsed.set(drivername=f"{backend}+{driver}").render_as_string(hide_password=False)
+
+
+def _asyncpg_connect_args(url: URL) -> dict:
+    """asyncpg equivalents of the libpq parameters async_db_url strips from the URL."""
+    query = {key: value for key, value in url.query.items() if isinstance(value, str)}
+    args: dict = {}
+    sslmode = query.get("sslmode")
+    if "sslrootcert" in query or "sslcert" in query:
+        context = ssl.create_default_context(cafile=query.get("sslrootcert"))
+        if "sslcert" in query:
+            context.load_cert_chain(query["sslcert"], query.get("sslkey"))
+        if sslmode != "verify-full":
+            context.check_hostname = False
+        args["ssl"] = context
+    elif sslmode:
+        args["ssl"] = sslmode  # asyncpg takes the libpq mode names
+    if "connect_timeout" in query:
+        args["timeout"] = float(query["connect_timeout"])
+    if "application_name" in query:
+        args["server_settings"] = {"application_name": query["application_name"]}
+    return args
+
+
+def async_engine_options(url: str) -> dict:
+    """Own pool sizing (DB_ASYNC_*), instrumented like the sync pools.
+
+    These connections come on top of the sync engine's: each worker may open
+    DB_POOL_SIZE + DB_MAX_OVERFLOW + DB_ASYNC_POOL_SIZE + DB_ASYNC_MAX_OVERFLOW.
+    libpq URL parameters (``sslmode`` and friends) and the statement timeout go
+    through asyncpg connect args.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        return {}
+    options: dict = {
+        "poolclass": InstrumentedAsyncQueuePool,
+        "pool_size": settings.DB_ASYNC_POOL_SIZE,
+        "max_overflow": settings.DB_ASYNC_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SEC,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SEC,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    connect_args = _asyncpg_connect_args(parsed)
+    if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        connect_args.setdefault("server_settings", {})["statement_timeout"] = str(
+            settings.DB_STATEMENT_TIMEOUT_MS
+        )
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def _build(name: str, url: str) -> AsyncEngine:
+    engine = create_async_engine(async_db_url(url), **async_engine_options(url))
+    register_engine_pool(name, engine.sync_engine)
+    return engine
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = _build("async_primary", settings.DB_URL)
+    return _async_engine
+
+
+def get_async_read_engine() -> Optional[AsyncEngine]:
+    """Async engine for DB_READ_URL, or None when no replica is configured."""
+    global _async_read_engine
+    if not settings.DB_READ_URL.strip():
+        return None
+    if _async_read_engine is None:
+        _async_read_engine = _build("async_read", settings.DB_READ_URL)
+    return _async_read_engine
+
+
+def async_session_factory(engine: AsyncEngine) -> async_sessionmaker:
+    factory = _session_factories.get(id(engine))
+    if factory is None:
+        factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+        _session_factories[id(engine)] = factory
+    return factory
+
+
+async def dispose_async_engines() -> None:
+    global _async_engine, _async_read_engine
+    for engine in (_async_engine, _async_read_engine):
+        if engine is not None:
+            await engine.dispose()
+    _async_engine = None
+    _async_read_engine = None
+    _session_factories.clear()
+    unregister_engine_pool("async_primary")
+    unregister_engine_pool("async_read")
@@ -3,6 +3,24 @@ from typing import Dict, List
 
 class Settings(BaseSettings):
     DB_URL: str
+    # Optional read replica for dashboard reads (empty = all reads use DB_URL)
+    DB_READ_URL: str = ""
+    DB_READ_FALLBACK_TO_PRIMARY: bool = True
+    DB_READ_MAX_LAG_SEC: float = 30.0
+    DB_READ_HEALTH_CHECK_INTERVAL_SEC: float = 10.0
+    # Connection pool (per uvicorn worker; ignored for SQLite)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 30
+    DB_POOL_TIMEOUT_SEC: float = 30.0
+    DB_POOL_RECYCLE_SEC: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_SLOW_CHECKOUT_MS: float = 250.0
+    # Separate pool for the async read engine (event loop, so it needs far fewer)
+    DB_ASYNC_POOL_SIZE: int = 5
+    DB_ASYNC_MAX_OVERFLOW: int = 10
+    # Per-statement timeout on PostgreSQL connections (opt-in; 0 = server default).
+    # Retention deletes and archival lift it for their own transaction.
+    DB_STATEMENT_TIMEOUT_MS: int = 0
     CORS_ORIGINS: str = (
         "http://localhost:3000,http://localhost:3001,"
         "https://d2qp7beltc09b8.cloudfront.net,https://daemixzdg8jfd.cloudfront.net"
@@ -26,9 +44,40 @@ class Settings(BaseSettings):
 
     # DNS ingest: when false, only blocked queries are stored in RDS (live feed uses WebSocket)
     PERSIST_ALL_DNS: bool = False
+    # Per-minute / per-hour stats rollups (dns_stats_minute, dns_stats_hour) updated at ingest
+    DNS_STATS_ROLLUPS_ENABLED: bool = True
+    DNS_STATS_MINUTE_RETENTION_HOURS: int = 48
+    DNS_STATS_HOUR_RETENTION_DAYS: int = 400
+    # Cold storage: cleanup moves aged rows into gzip NDJSON day files + manifest (empty = delete only)
+    DNS_ARCHIVE_DIR: str = ""
+    DNS_ARCHIVE_COMPRESS_LEVEL: int = 6
+    # In-memory live DNS stats (lock stripes and hard caps per process)
+    DNS_LIVE_STATS_SHARDS: int = 8
+    DNS_LIVE_STATS_MAX_SITES: int = 20000
+    DNS_LIVE_STATS_MAX_SUBDOMAINS: int = 50
+    DNS_LIVE_STATS_TOP_K_CAPACITY: int = 1000
+    DNS_LIVE_STATS_MAX_CLIENTS: int = 2000
+    DNS_LIVE_STATS_MAX_SITES_PER_CLIENT: int = 500
+    # Windowed live stats (minute/hour buckets, shared via Redis when available)
+    DNS_LIVE_WINDOWS_ENABLED: bool = True
+    DNS_LIVE_WINDOWS_REDIS_ENABLED: bool = True
+    DNS_LIVE_WINDOW_DEFAULT_MINUTES: int = 1440
+    DNS_LIVE_WINDOW_TOP_K: int = 500
+    DNS_LIVE_WINDOW_CLIENT_TOP_K: int = 100
 
     # Anomaly detection
     NEW_DOMAIN_ALERTS: bool = True
+    DNS_SUSPICIOUS_DOMAIN_CACHE_SIZE: int = 50000
+    # Character-bigram DGA model on registrable labels (reason added at/above this confidence)
+    DNS_DGA_ENABLED: bool = True
+    DNS_DGA_MIN_CONFIDENCE: float = 0.8
+    # Streaming DNS tunnel detection per (client, root) sliding window, in memory
+    DNS_TUNNEL_DETECTION_ENABLED: bool = True
+    DNS_TUNNEL_WINDOW_SEC: int = 300
+    DNS_TUNNEL_MIN_UNIQUE_SUBDOMAINS: int = 40
+    DNS_TUNNEL_MIN_ENCODED_BYTES: int = 2048
+    DNS_TUNNEL_ALERT_COOLDOWN_SEC: int = 1800
+    DNS_TUNNEL_MAX_KEYS: int = 20000
     BANDWIDTH_ALERT_MIB_PER_SEC: float = 50.0
     USAGE_LIVE_MAX_AGE_SEC: int = 45
     REDIS_URL: str = "redis://redis:6379/0"
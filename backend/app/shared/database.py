@@ -1,10 +1,61 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from app.shared.config import settings
+from app.shared.db_pool_metrics import InstrumentedQueuePool, register_engine_pool
 
-engine = create_engine(settings.DB_URL)
+
+def engine_options(url: str) -> dict:
+    """Pool and timeout options for create_engine; SQLite keeps SQLAlchemy defaults.
+
+    Sync routes run in Starlette's threadpool (40 threads per worker by default), so
+    DB_POOL_SIZE + DB_MAX_OVERFLOW should cover it. The async read engine has its own
+    DB_ASYNC_* pool, so per-worker connections are the sum of both, times workers.
+    """
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite":
+        return {}
+    options: dict = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SEC,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SEC,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if backend == "postgresql" and settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        options["connect_args"] = {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+def lift_statement_timeout(db: Session) -> None:
+    """Disable DB_STATEMENT_TIMEOUT_MS for the rest of the current transaction.
+
+    For maintenance statements (retention deletes, archive scans) that may
+    legitimately run longer than an API query. No-op off PostgreSQL.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SET LOCAL statement_timeout = 0"))
+
+
+engine = create_engine(settings.DB_URL, **engine_options(settings.DB_URL))
+register_engine_pool("primary", engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
+# Optional read replica for heavy dashboard reads (see get_read_db).
+read_engine = (
+    create_engine(settings.DB_READ_URL, **engine_options(settings.DB_READ_URL))
+    if settings.DB_READ_URL.strip()
+    else None
+)
+if read_engine is not None:
+    register_engine_pool("read", read_engine)
 
+ReadSessionLocal = (
+    sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+    if read_engine is not None
+    else None
+)
+
+Base = declarative_base()
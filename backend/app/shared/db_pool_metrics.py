@@ -0,0 +1,166 @@
+"""Connection pool instrumentation: checkout wait, in-use connections and overflow.
+
+Exported two ways, matching the rest of the backend's observability:
+
+- structured log events (``db_pool_checkout_slow``, ``db_pool_overflow``,
+  ``db_pool_timeout``) for CloudWatch Logs Insights / metric filters;
+- ``GET /health/db-pool`` returning :func:`pool_snapshots` for dashboards and load tests.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.shared.config import settings
+from app.shared.logging_context import structured_extra
+from app.shared.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Recent checkout waits kept per pool for the p95 in snapshots.
+_WAIT_SAMPLE_SIZE = 1024
+
+
+class PoolMetrics:
+    """Thread-safe counters for one engine's pool."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._waits_ms: deque[float] = deque(maxlen=_WAIT_SAMPLE_SIZE)
+        self.checkouts = 0
+        self.overflow_checkouts = 0
+        self.timeouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self._in_overflow = False
+
+    def observe_checkout(self, wait_ms: float, *, checked_out: int, overflow: int) -> None:
+        entered_overflow = False
+        with self._lock:
+            self.checkouts += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+            self._waits_ms.append(wait_ms)
+            if overflow > 0:
+                self.overflow_checkouts += 1
+                entered_overflow = not self._in_overflow
+            self._in_overflow = overflow > 0
+
+        if entered_overflow:
+            logger.warning(
+                "DB pool using overflow connections",
+                extra=structured_extra(
+                    "db_pool_overflow", pool=self.name, checked_out=checked_out, overflow=overflow
+                ),
+            )
+        if wait_ms >= settings.DB_POOL_SLOW_CHECKOUT_MS:
+            logger.warning(
+                "Slow DB pool checkout",
+                extra=structured_extra(
+                    "db_pool_checkout_slow",
+                    pool=self.name,
+                    wait_ms=round(wait_ms, 1),
+                    checked_out=checked_out,
+                ),
+            )
+
+    def observe_timeout(self, wait_ms: float, *, checked_out: int) -> None:
+        with self._lock:
+            self.timeouts += 1
+        logger.error(
+            "DB pool checkout timed out",
+            extra=structured_extra(
+                "db_pool_timeout", pool=self.name, wait_ms=round(wait_ms, 1), checked_out=checked_out
+            ),
+        )
+
+    def snapshot(self, pool: QueuePool) -> Dict[str, object]:
+        with self._lock:
+            waits = sorted(self._waits_ms)
+            checkouts = self.checkouts
+            result: Dict[str, object] = {
+                "pool": self.name,
+                "pool_size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "checked_out": pool.checkedout(),
+                "overflow_in_use": max(pool.overflow(), 0),
+                "checkouts": checkouts,
+                "overflow_checkouts": self.overflow_checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": round(self.wait_ms_total / checkouts, 2) if checkouts else 0.0,
+                "wait_ms_max": round(self.wait_ms_max, 2),
+                "wait_ms_p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 2)
+                if waits
+                else 0.0,
+            }
+        return result
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited (incl. pre-ping)."""
+
+    metrics: Optional[PoolMetrics] = None
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            conn = super().connect()
+        except PoolTimeoutError:
+            if self.metrics is not None:
+                self.metrics.observe_timeout(
+                    (time.perf_counter() - started) * 1000, checked_out=self.checkedout()
+                )
+            raise
+        if self.metrics is not None:
+            self.metrics.observe_checkout(
+                (time.perf_counter() - started) * 1000,
+                checked_out=self.checkedout(),
+                overflow=self.overflow(),
+            )
+        return conn
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        # engine.dispose() swaps in a fresh pool; keep counting into the same metrics.
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """Instrumented pool for asyncio engines (same counters, asyncio-safe queue)."""
+
+
+_registry_lock = threading.Lock()
+_registered: Dict[str, object] = {}
+
+
+def register_engine_pool(name: str, engine) -> None:
+    """Attach metrics to an engine built with InstrumentedQueuePool (no-op otherwise)."""
+    if not isinstance(engine.pool, InstrumentedQueuePool):
+        return
+    engine.pool.metrics = PoolMetrics(name)
+    with _registry_lock:
+        _registered[name] = engine
+
+
+def unregister_engine_pool(name: str) -> None:
+    with _registry_lock:
+        _registered.pop(name, None)
+
+
+def pool_snapshots() -> List[Dict[str, object]]:
+    with _registry_lock:
+        engines = list(_registered.values())
+    snapshots = []
+    for engine in engines:
+        pool = engine.pool
+        if isinstance(pool, InstrumentedQueuePool) and pool.metrics is not None:
+            snapshots.append(pool.metrics.snapshot(pool))
+    return snapshots
@@ -1,6 +1,13 @@
-from typing import Generator
+from typing import AsyncGenerator, Generator
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.shared.database import SessionLocal
+from app.shared.async_database import async_session_factory, get_async_engine, get_async_read_engine
+from app.shared.config import settings
+from app.shared.database import ReadSessionLocal, SessionLocal, read_engine
+from app.shared.read_replica import replica_health
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -11,3 +18,52 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+def get_read_db() -> Generator[Session, None, None]:
+    """Session for read-only routes: the DB_READ_URL replica when healthy, else the primary.
+
+    Without DB_READ_URL this is the primary. With DB_READ_FALLBACK_TO_PRIMARY=false a
+    lagging or unreachable replica yields 503 instead of loading the primary.
+    """
+    if ReadSessionLocal is None or read_engine is None:
+        yield from get_db()
+        return
+
+    if not replica_health.is_usable(read_engine):
+        if not settings.DB_READ_FALLBACK_TO_PRIMARY:
+            raise HTTPException(status_code=503, detail="Read replica unavailable")
+        yield from get_db()
+        return
+
+    db = ReadSessionLocal()
+    try:
+        yield db
+    except OperationalError:
+        replica_health.mark_unhealthy()
+        raise
+    finally:
+        db.close()
+
+
+async def get_async_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Async counterpart of get_read_db for read endpoints served on the event loop.
+
+    Uses the DB_READ_URL replica under the same health/lag rules (the cached probe
+    runs in the threadpool), otherwise the primary.
+    """
+    engine = get_async_engine()
+    async_read_engine = get_async_read_engine()
+    use_replica = False
+    if async_read_engine is not None and read_engine is not None:
+        use_replica = await run_in_threadpool(replica_health.is_usable, read_engine)
+        if not use_replica and not settings.DB_READ_FALLBACK_TO_PRIMARY:
+            raise HTTPException(status_code=503, detail="Read replica unavailable")
+        if use_replica:
+            engine = async_read_engine
+
+    async with async_session_factory(engine)() as db:
+        try:
+            yield db
+        except OperationalError:
+            if use_replica:
+                replica_health.mark_unhealthy()
+            raise
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+from functools import lru_cache
+
 from app.shared.domain_utils import extract_root_domain
 
 # ISO 3166-1 alpha-2 codes for two-letter ccTLDs (excludes generic .io .tv .cc etc.)
@@ -128,27 +130,42 @@ def dnsmasq_tld_patterns_for_country(iso_code: str) -> list[str]:
     return sorted(patterns, key=len, reverse=True)
 
 
-def country_code_for_domain(domain: str) -> str:
+def _compile_suffix_country() -> dict[str, str]:
+    """One suffix table: generic TLDs, ccTLDs and multi-part public suffixes."""
+    table = {tld: tld.upper() for tld in _CCTLD_CODES if len(tld) == 2}
+    table.update((tld, "GLOBAL") for tld in _GENERIC_TLDS)
+    table.update(_PUBLIC_SUFFIX_COUNTRY)
+    return table
+
+
+_SUFFIX_COUNTRY: dict[str, str] = _compile_suffix_country()
+_MAX_SUFFIX_LABELS = max(suffix.count(".") + 1 for suffix in _SUFFIX_COUNTRY)
+
+
+@lru_cache(maxsize=65536)
+def country_code_for_root(root: str) -> str:
     """
-    Return ISO 3166-1 alpha-2 country code, or GLOBAL for generic TLDs, or UNKNOWN if unclear.
+    Country code for an already-extracted root domain (see ``country_code_for_domain``).
+
+    Walks label suffixes longest first against the precompiled table; memoized per root.
     """
-    root = extract_root_domain((domain or "").strip().lower())
     if not root or "." not in root:
         return "UNKNOWN"
-
-    for suffix, code in sorted(_PUBLIC_SUFFIX_COUNTRY.items(), key=lambda x: -len(x[0])):
-        if root == suffix or root.endswith("." + suffix):
+    labels = root.split(".")
+    for n in range(min(_MAX_SUFFIX_LABELS, len(labels)), 0, -1):
+        code = _SUFFIX_COUNTRY.get(".".join(labels[-n:]))
+        if code is not None:
             return code
-
-    parts = root.split(".")
-    tld = parts[-1]
-    if tld in _GENERIC_TLDS:
-        return "GLOBAL"
-    if len(tld) == 2 and tld in _CCTLD_CODES:
-        return tld.upper()
     return "GLOBAL"
 
 
+def country_code_for_domain(domain: str) -> str:
+    """
+    Return ISO 3166-1 alpha-2 country code, or GLOBAL for generic TLDs, or UNKNOWN if unclear.
+    """
+    return country_code_for_root(extract_root_domain((domain or "").strip().lower()))
+
+
 def country_display_name(code: str) -> str:
     key = (code or "").strip().upper()
     if not key:
@@ -0,0 +1,84 @@
+"""Health and lag tracking for the optional DB_READ_URL replica."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.shared.config import settings
+from app.shared.logging_context import structured_extra
+from app.shared.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# A replica that has replayed everything it received is current even when the last
+# replayed transaction is old (an idle primary), so that counts as zero lag.
+_REPLAY_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaHealth:
+    """Cached replica probe: reachable and replay lag under DB_READ_MAX_LAG_SEC.
+
+    The probe runs at most once per DB_READ_HEALTH_CHECK_INTERVAL_SEC per process so
+    read requests do not pay for a round trip each time.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._healthy = True
+        self._lag_sec: Optional[float] = None
+
+    def is_usable(self, engine: Engine) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at < settings.DB_READ_HEALTH_CHECK_INTERVAL_SEC:
+                return self._healthy
+            self._checked_at = now
+
+        healthy, lag = self._probe(engine)
+        with self._lock:
+            if healthy != self._healthy:
+                logger.warning(
+                    "Read replica health changed",
+                    extra=structured_extra("db_read_replica_health", healthy=healthy, lag_sec=lag),
+                )
+            self._healthy = healthy
+            self._lag_sec = lag
+        return healthy
+
+    def _probe(self, engine: Engine) -> tuple[bool, Optional[float]]:
+        try:
+            with engine.connect() as conn:
+                if engine.dialect.name != "postgresql":
+                    conn.execute(text("SELECT 1"))
+                    return True, None
+                lag = float(conn.execute(_REPLAY_LAG_SQL).scalar() or 0.0)
+        except Exception as exc:
+            logger.warning(
+                "Read replica probe failed",
+                extra=structured_extra("db_read_replica_probe_failed", error=str(exc)),
+            )
+            return False, None
+        return lag <= settings.DB_READ_MAX_LAG_SEC, lag
+
+    def mark_unhealthy(self) -> None:
+        """Force the next request to the primary until the next probe interval."""
+        with self._lock:
+            self._healthy = False
+            self._checked_at = time.monotonic()
+
+    @property
+    def lag_sec(self) -> Optional[float]:
+        return self._lag_sec
+
+
+replica_health = ReplicaHealth()
@@ -24,6 +24,11 @@ def get_redis() -> redis.Redis:
 def redis_available() -> bool:
     if not settings.USAGE_REDIS_ENABLED:
         return False
+    return redis_reachable()
+
+
+def redis_reachable() -> bool:
+    """PING the configured Redis, whatever feature flags say."""
     if not settings.REDIS_URL.strip():
         return False
     try:
@@ -14,6 +14,7 @@ from tests.helpers.factories import create_vpn_device, seed_policy_catalog
 from app.features.dns_queries.models.dns_query import DnsQuery  # noqa: F401
 from app.features.dns_queries.models.dns_alert import DnsAlert  # noqa: F401
 from app.features.dns_queries.models.domain_first_seen import DomainFirstSeen  # noqa: F401
+from app.features.dns_queries.models.dns_stats_rollup import DnsStatsHour, DnsStatsMinute  # noqa: F401
 from app.features.devices.models.device import Device  # noqa: F401
 from app.features.devices.models.device_country_presence import DeviceCountryPresence  # noqa: F401
 from app.features.devices.models.device_login_geo import DeviceLoginGeoObservation  # noqa: F401
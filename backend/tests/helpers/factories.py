@@ -110,16 +110,18 @@ def create_vpn_device(
     mac_address: str = "aa:bb:cc:dd:ee:ff",
     device_id: str = "dev-test",
 ):
-    pool = IpPool(
-        name="pool-test",
-        cidr="10.0.0.0/24",
-        gateway_ip="10.0.0.1",
-        dns_ip="10.0.0.1",
-        endpoint="vpn:51820",
-        server_public_key="server-pubkey-test",
-    )
-    db_session.add(pool)
-    db_session.flush()
+    pool = db_session.query(IpPool).filter_by(name="pool-test").first()
+    if pool is None:
+        pool = IpPool(
+            name="pool-test",
+            cidr="10.0.0.0/24",
+            gateway_ip="10.0.0.1",
+            dns_ip="10.0.0.1",
+            endpoint="vpn:51820",
+            server_public_key="server-pubkey-test",
+        )
+        db_session.add(pool)
+        db_session.flush()
 
     peer = VpnPeer(device_id=device_id, public_key=f"pubkey-{device_id}", pool_id=pool.id)
     db_session.add(peer)
@@ -53,3 +53,37 @@ def usage_report_payload(
         "delta_rx_bytes": delta_rx_bytes,
         "delta_tx_bytes": delta_tx_bytes,
     }
+
+
+class _SharedSqliteConnection:
+    """sqlite3 connection proxy whose close() is a no-op (owned by the sync test engine)."""
+
+    def __init__(self, conn: Any) -> None:
+        object.__setattr__(self, "_conn", conn)
+
+    def close(self) -> None:
+        pass
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._conn, name, value)
+
+
+def async_session_factory_for(db_session: Any):
+    """Async sessions over the same in-memory SQLite connection as ``db_session``.
+
+    Lets async read routes see rows seeded (even uncommitted) through the sync session.
+    """
+    import aiosqlite
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    raw = db_session.connection().connection.driver_connection
+
+    async def _creator():
+        return await aiosqlite.Connection(lambda: _SharedSqliteConnection(raw), 64)
+
+    engine = create_async_engine("sqlite+aiosqlite://", async_creator=_creator, poolclass=NullPool)
+    return async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
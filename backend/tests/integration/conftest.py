@@ -8,8 +8,8 @@ from app.features.vpn.models.ip_pool import IpPool
 from app.features.vpn.schemas.usage_history import UsageHistoryPoint, UsageHistoryResponse
 from app.features.vpn.schemas.usage_live import DeviceUsageLiveResponse
 from app.main import app
-from app.shared.dependencies import get_db
-from tests.helpers.integration import dns_query_payload, enroll_payload
+from app.shared.dependencies import get_async_read_db, get_db, get_read_db
+from tests.helpers.integration import async_session_factory_for, dns_query_payload, enroll_payload
 
 pytestmark = pytest.mark.integration
 
@@ -25,7 +25,15 @@ def api_client(db_session, monkeypatch):
         finally:
             pass
 
+    async_sessions = async_session_factory_for(db_session)
+
+    async def override_get_async_read_db():
+        async with async_sessions() as session:
+            yield session
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_async_read_db] = override_get_async_read_db
     with TestClient(app) as client:
         yield client
     app.dependency_overrides.clear()
@@ -49,3 +49,34 @@ def test_cleanup_old_records(api_client, dns_ingest_env, vpn_device):
     assert response.status_code == 200
     body = response.json()
     assert body["deleted"] >= 0
+
+
+def test_export_dns_queries_csv(api_client, dns_ingest_env, vpn_device):
+    api_client.post(
+        "/dns-queries/bulk",
+        json={
+            "queries": [
+                dns_query_payload(domain="one.export", blocked=False),
+                dns_query_payload(domain="two.export", blocked=True),
+            ]
+        },
+    )
+    response = api_client.get("/dns-queries/export", params={"format": "csv", "blocked_only": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.strip().splitlines()
+    assert lines[0].startswith("id,timestamp,client_ip")
+    assert len(lines) == 2
+    assert "two.export" in lines[1]
+
+
+def test_export_dns_queries_ndjson_gzip(api_client, post_dns_query, dns_ingest_env, vpn_device):
+    import gzip
+    import json
+
+    post_dns_query(domain="gz.export", blocked=True)
+    response = api_client.get("/dns-queries/export", params={"gzip": True})
+    assert response.status_code == 200
+    assert response.headers["content-disposition"].endswith('.ndjson.gz"')
+    records = [json.loads(line) for line in gzip.decompress(response.content).splitlines()]
+    assert [r["domain"] for r in records] == ["gz.export"]
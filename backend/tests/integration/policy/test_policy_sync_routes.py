@@ -1,3 +1,6 @@
+import json
+
+
 def test_policy_sync_status_empty(api_client, seed_policy):
     response = api_client.get("/policy/sync-status")
     assert response.status_code == 200
@@ -35,6 +38,62 @@ def test_policy_dns_sync(api_client, seed_policy, dns_ingest_env):
     assert "entries" in body
 
 
+def test_policy_dns_sync_etag_not_modified(api_client, seed_policy, dns_ingest_env):
+    first = api_client.get("/policy/dns-sync")
+    etag = first.headers["etag"]
+    assert etag == '"%s"' % first.json()["version"]
+
+    response = api_client.get("/policy/dns-sync", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+
+def test_policy_dns_sync_delta(api_client, seed_policy, dns_ingest_env):
+    full = api_client.get("/policy/dns-sync").json()
+    known = {
+        "global_hash": full["global_hash"],
+        "device_hashes": {str(e["device_id"]): e["content_hash"] for e in full["entries"]},
+    }
+    response = api_client.post("/policy/dns-sync", json=known)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["global_unchanged"] is True
+    assert body["entries"] == []
+    assert sorted(body["unchanged_device_ids"]) == sorted(e["device_id"] for e in full["entries"])
+
+    response = api_client.post(
+        "/policy/dns-sync", json=known, headers={"If-None-Match": '"%s"' % full["version"]}
+    )
+    assert response.status_code == 304
+
+
+def test_policy_dns_sync_stream(api_client, seed_policy, dns_ingest_env):
+    full = api_client.get("/policy/dns-sync").json()
+    response = api_client.post("/policy/dns-sync/stream")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert records[0]["type"] == "global"
+    assert records[0]["global_hash"] == full["global_hash"]
+    assert records[-1] == {
+        "type": "end",
+        "version": full["version"],
+        "devices": len(full["entries"]),
+        "packs": len(full["packs"]),
+    }
+
+
+def test_policy_dns_sync_stream_honours_if_none_match(api_client, seed_policy, dns_ingest_env):
+    version = api_client.get("/policy/dns-sync").json()["version"]
+    response = api_client.post("/policy/dns-sync/stream", headers={"If-None-Match": f'"{version}"'})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == f'"{version}"'
+
+    response = api_client.post("/policy/dns-sync/stream", headers={"If-None-Match": '"stale"'})
+    assert response.status_code == 200
+    assert json.loads(response.text.splitlines()[-1])["version"] == version
+
+
 def test_list_pack_domains(api_client, seed_policy):
     response = api_client.get("/policy/packs/malware/domains", params={"limit": 10})
     assert response.status_code == 200
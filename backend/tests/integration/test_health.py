@@ -2,3 +2,9 @@ def test_health_endpoint(api_client):
     response = api_client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
+
+
+def test_db_pool_endpoint(api_client):
+    response = api_client.get("/health/db-pool")
+    assert response.status_code == 200
+    assert isinstance(response.json()["pools"], list)
@@ -2,6 +2,8 @@ from unittest.mock import patch
 
 from app.features.dashboard.services.network_overview_service import NetworkOverviewService
 from app.features.dns_queries.models.dns_query import DnsQuery
+from app.features.dns_queries.repositories.dns_stats_rollup_repository import DnsStatsRollupRepository
+from app.features.dns_queries.schemas.dns_query import DnsQueryCreate
 from datetime import datetime, timezone
 from tests.helpers.factories import seed_policy_catalog
 
@@ -35,6 +37,9 @@ def test_build_overview_template_mode(mock_live, mock_history, db_session, dashb
             blocked=True,
         )
     )
+    DnsStatsRollupRepository(db_session).record_batch(
+        [DnsQueryCreate(timestamp=since, client_ip="10.0.0.1", domain="blocked.example", blocked=True)]
+    )
     db_session.commit()
 
     overview = NetworkOverviewService(db_session).build_overview(period_minutes=60)
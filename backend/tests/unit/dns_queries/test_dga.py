@@ -0,0 +1,101 @@
+import random
+import string
+import time
+
+import pytest
+
+from app.features.dns_queries.dga import DgaModel, get_dga_model, train_bigram_table
+from app.features.dns_queries.dns_anomaly import SuspiciousDomainDetector
+from app.shared.domain_utils import extract_root_domain
+
+
+def test_shipped_model_separates_random_labels_from_names():
+    model = get_dga_model()
+    benign = ["www.google.com", "facebook.com", "en.wikipedia.org", "shopping-deals.xyz", "cloudflare.com"]
+    generated = ["xk2jq9vd.net", "qwzxjvkpd.com", "a8f3k2m9x1.ru", "zcvbnmqwrt.top"]
+    assert all(v.confidence < 0.5 for v in model.verdicts(benign))
+    assert all(v.confidence > 0.9 for v in model.verdicts(generated))
+
+
+def test_short_and_punycode_labels_are_not_scored():
+    model = get_dga_model()
+    assert model.score_labels(["ynet", "xn--4gbrim", "ünïcode"]) == [None, None, None]
+    assert model.verdict("cdn.ynet.co.il") is None
+
+
+def test_batch_scores_match_per_label_scores():
+    model = get_dga_model()
+    labels = ["google", "abc", "xk2jq9vd", "shopping-deals", "x", "qwzxjvkpd1"]
+    batch = model.score_labels(labels)
+    single = [model.score_labels([label])[0] for label in labels]
+    assert [b is None for b in batch] == [s is None for s in single]
+    assert [b for b in batch if b is not None] == pytest.approx([s for s in single if s is not None])
+
+
+def test_train_bigram_table_roundtrip(tmp_path):
+    path = tmp_path / "model.bin"
+    path.write_bytes(train_bigram_table(["banana", "bandana", "cabana"] * 10, threshold=-3.0, temperature=0.5))
+    model = DgaModel.load(path)
+    assert model.threshold == -3.0
+    assert model.score_labels(["banana"])[0] > model.score_labels(["zqxjkv"])[0]
+
+
+def test_detector_adds_dga_reason_with_confidence():
+    detector = SuspiciousDomainDetector(cache_size=16, dga_model=get_dga_model(), dga_min_confidence=0.8)
+    finding, benign = detector.findings(["www.xk2jq9vd.net", "www.google.com"])
+    assert finding.dga_confidence > 0.8
+    assert any("machine-generated ('xk2jq9vd'" in reason for reason in finding.reasons)
+    assert benign.reasons == ()
+
+
+def test_batch_scoring_matches_single_label_scoring():
+    rng = random.Random(3)
+    labels = [
+        "".join(rng.choice(string.ascii_lowercase + string.digits) for _ in range(rng.randint(6, 14)))
+        for _ in range(1000)
+    ]
+    model = get_dga_model()
+    batch = model.score_labels(labels)
+    assert len(batch) == len(labels)
+    assert batch[::97] == pytest.approx([model.score_labels([label])[0] for label in labels[::97]])
+
+
+def test_findings_with_precomputed_roots_match():
+    domains = ["www.xk2jq9vd.net", "cdn.ynet.co.il", "mail.google.com"]
+    roots = [extract_root_domain(domain) for domain in domains]
+    model = get_dga_model()
+    assert model.verdicts(domains, roots) == model.verdicts(domains)
+    fresh = SuspiciousDomainDetector(cache_size=0, dga_model=model)
+    assert fresh.findings(domains, roots) == fresh.findings(domains)
+
+
+def _best_ms(fn, repeat=50):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+@pytest.mark.benchmark
+def test_report_dga_batch_cost():
+    rng = random.Random(7)
+    domains = [
+        f"www.{''.join(rng.choices(string.ascii_lowercase + string.digits, k=rng.randint(6, 14)))}.com"
+        for _ in range(1000)
+    ]
+    roots = [extract_root_domain(domain) for domain in domains]
+    labels = [root.split(".", 1)[0] for root in roots]
+    model = get_dga_model()
+    report = {
+        "score_labels": _best_ms(lambda: model.score_labels(labels)),
+        "verdicts (roots given)": _best_ms(lambda: model.verdicts(domains, roots)),
+        "verdicts": _best_ms(lambda: model.verdicts(domains)),
+        "findings cold (roots given)": _best_ms(
+            lambda: SuspiciousDomainDetector(cache_size=0, dga_model=model).findings(domains, roots)
+        ),
+        "findings cold": _best_ms(lambda: SuspiciousDomainDetector(cache_size=0, dga_model=model).findings(domains)),
+    }
+    for name, ms in report.items():
+        print(f"1k domains, {name}: {ms:.2f} ms")
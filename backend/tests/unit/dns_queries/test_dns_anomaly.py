@@ -1,6 +1,7 @@
 import pytest
 
 from app.features.dns_queries.dns_anomaly import (
+    SuspiciousDomainDetector,
     get_suspicious_domain_reasons,
     high_entropy_subdomain_reasons,
     is_high_entropy_subdomain,
@@ -46,3 +47,37 @@ def test_hyphenated_service_subdomain_not_flagged():
     assert is_high_entropy_subdomain(domain) is False
     assert is_suspicious_domain(domain) is False
     assert high_entropy_subdomain_reasons(domain) == []
+
+
+def test_detector_matches_longest_tld_suffix():
+    detector = SuspiciousDomainDetector(tlds={".cn", ".com.cn", ".xyz"}, cache_size=16)
+    assert detector.matched_tld("shop.com.cn") == ".com.cn"
+    assert detector.matched_tld("baidu.cn") == ".cn"
+    assert detector.matched_tld("xyz") is None
+    assert detector.matched_tld("example.com") is None
+
+
+def test_detector_first_label_scan_reports_both_reasons_once():
+    reasons = high_entropy_subdomain_reasons("1234567890123456a-x.example.com")
+    assert len(reasons) == 1
+    assert "94% digits in '1234567890123456a'" in reasons[0]
+
+    detector = SuspiciousDomainDetector(cache_size=16)
+    assert len(detector.reasons("abc123456789012345678901234567890.example.com")) == 2
+
+
+def test_detector_pluggable_rules_and_memo():
+    calls = []
+
+    def long_root_rule(domain, root):
+        calls.append(domain)
+        return ["Root domain is long"] if len(root) > 20 else []
+
+    detector = SuspiciousDomainDetector(rules=[long_root_rule], cache_size=16)
+    assert detector.reasons("WWW.averyveryverylongname.com.") == ("Root domain is long",)
+    assert detector.reasons("www.averyveryverylongname.com") == ("Root domain is long",)
+    assert calls == ["www.averyveryverylongname.com"]
+
+    detector.add_rule(lambda domain, root: ["always"])
+    assert detector.reasons("www.averyveryverylongname.com") == ("Root domain is long", "always")
+    assert len(detector) == 1
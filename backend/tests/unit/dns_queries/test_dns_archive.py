@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.features.devices.repositories.device_repository import DeviceRepository
+from app.features.dns_queries.dns_archive import load_manifest, write_day_file
+from app.features.dns_queries.models.dns_query import DnsQuery
+from app.features.dns_queries.services import dns_query_service
+from app.features.dns_queries.services.dns_query_service import DnsQueryService
+
+
+def _row(domain: str, ts: datetime, *, blocked: bool = True) -> DnsQuery:
+    return DnsQuery(timestamp=ts, client_ip="10.0.0.5", domain=domain, blocked=blocked)
+
+
+def test_cleanup_archives_then_deletes(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr("app.shared.config.settings.DNS_ARCHIVE_DIR", str(tmp_path))
+    now = datetime.now(timezone.utc)
+    old_day_one = now - timedelta(days=40)
+    old_day_two = now - timedelta(days=39)
+    db_session.add_all(
+        [
+            _row("first.test", old_day_one),
+            _row("second.test", old_day_two, blocked=False),
+            _row("fresh.test", now),
+        ]
+    )
+    db_session.commit()
+
+    result = DnsQueryService().cleanup_old_records(db_session, days=30)
+    assert result == {"deleted": 2, "archived": 2}
+    assert [r.domain for r in db_session.query(DnsQuery).all()] == ["fresh.test"]
+
+    manifest = load_manifest(tmp_path)
+    assert len(manifest) == 2
+    assert all((tmp_path / entry["path"]).is_file() for entry in manifest)
+
+    svc = DnsQueryService()
+    everything = list(svc.iter_archived_queries())
+    assert [r["domain"] for r in everything] == ["first.test", "second.test"]
+
+    window = list(
+        svc.iter_archived_queries(
+            start_date=old_day_two - timedelta(hours=1),
+            end_date=now,
+        )
+    )
+    assert [r["domain"] for r in window] == ["second.test"]
+    assert list(svc.iter_archived_queries(blocked_only=True))[0]["domain"] == "first.test"
+
+
+def test_cleanup_without_archive_dir_only_deletes(db_session, monkeypatch):
+    monkeypatch.setattr("app.shared.config.settings.DNS_ARCHIVE_DIR", "")
+    db_session.add(_row("old.test", datetime.now(timezone.utc) - timedelta(days=40)))
+    db_session.commit()
+
+    result = DnsQueryService().cleanup_old_records(db_session, days=30)
+    assert result == {"deleted": 1, "archived": 0}
+
+
+def test_archive_only_deletes_rows_it_wrote(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr("app.shared.config.settings.DNS_ARCHIVE_DIR", str(tmp_path))
+    old = datetime.now(timezone.utc) - timedelta(days=40)
+    archived_row = _row("archived.test", old)
+    archived_row.id = 10
+    db_session.add(archived_row)
+    db_session.commit()
+
+    real_write = dns_query_service.write_day_file
+
+    def write_then_late_row(*args, **kwargs):
+        entry = real_write(*args, **kwargs)
+        # A backlog row committed while the pass runs; its id was allocated earlier,
+        # so it sorts below the archived ids but was never in the cursor.
+        late_row = _row("late.test", old)
+        late_row.id = 5
+        db_session.add(late_row)
+        db_session.flush()
+        return entry
+
+    monkeypatch.setattr(dns_query_service, "write_day_file", write_then_late_row)
+    archived, deleted = DnsQueryService().archive_old_records(db_session, days=30)
+
+    assert (archived, deleted) == (1, 1)
+    assert [r.domain for r in db_session.query(DnsQuery).all()] == ["late.test"]
+
+
+def test_archive_resolves_device_names_once_per_batch(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr("app.shared.config.settings.DNS_ARCHIVE_DIR", str(tmp_path))
+    old = datetime.now(timezone.utc) - timedelta(days=40)
+    db_session.add_all(
+        [DnsQuery(timestamp=old, client_ip=f"10.0.0.{i}", domain=f"d{i}.test", blocked=True) for i in range(5)]
+    )
+    db_session.commit()
+    lookups = []
+    real_lookup = DeviceRepository.get_identity_map_by_client_ips
+
+    def counting_lookup(self, client_ips):
+        lookups.append(sorted(client_ips))
+        return real_lookup(self, client_ips)
+
+    monkeypatch.setattr(DeviceRepository, "get_identity_map_by_client_ips", counting_lookup)
+    assert DnsQueryService().archive_old_records(db_session, days=30) == (5, 5)
+    assert lookups == [[f"10.0.0.{i}" for i in range(5)]]
+
+
+def test_archive_runs_in_the_same_second_keep_both_files(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr("app.shared.config.settings.DNS_ARCHIVE_DIR", str(tmp_path))
+    old = datetime.now(timezone.utc) - timedelta(days=40)
+    for domain in ("first.test", "second.test"):
+        db_session.add(_row(domain, old))
+        db_session.commit()
+        assert DnsQueryService().archive_old_records(db_session, days=30) == (1, 1)
+
+    manifest = load_manifest(tmp_path)
+    assert len({entry["path"] for entry in manifest}) == 2
+    assert sorted(r["domain"] for r in DnsQueryService().iter_archived_queries()) == ["first.test", "second.test"]
+
+
+def test_write_day_file_refuses_to_overwrite(tmp_path):
+    record = {"timestamp": "2026-01-01T00:00:00+00:00", "domain": "a.test"}
+    day = datetime(2026, 1, 1).date()
+    assert write_day_file(tmp_path, day, "run", [record]) is not None
+    with pytest.raises(FileExistsError):
+        write_day_file(tmp_path, day, "run", [record])
@@ -1,12 +1,14 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 from app.features.dns_queries.dns_ingest_stats import DnsIngestStats
 from app.features.dns_queries.schemas.dns_query import DnsQueryCreate
 
 
-def _q(domain: str, *, blocked: bool = False, client_ip: str = "10.0.0.2") -> DnsQueryCreate:
+def _q(
+    domain: str, *, blocked: bool = False, client_ip: str = "10.0.0.2", ts: datetime | None = None
+) -> DnsQueryCreate:
     return DnsQueryCreate(
-        timestamp=datetime.now(timezone.utc),
+        timestamp=ts or datetime.now(timezone.utc),
         client_ip=client_ip,
         domain=domain,
         query_type="A",
@@ -36,3 +38,96 @@ def test_ingest_stats_grouped_sites():
     assert sites["total_sites"] == 1
     assert sites["sites"][0]["root_domain"] == "ynet.co.il"
     assert sites["sites"][0]["total_queries"] == 2
+
+
+def test_ingest_stats_evicts_least_recent_site_at_cap():
+    stats = DnsIngestStats(shards=1, max_sites=2)
+    stats.record([_q("a.com"), _q("b.com"), _q("a.com"), _q("c.com")])
+    sites = stats.get_grouped_sites(limit=10)
+    assert {s["root_domain"] for s in sites["sites"]} == {"a.com", "c.com"}
+    assert sites["sites_evicted"] == 1
+
+
+def test_ingest_stats_caps_subdomains_per_site():
+    stats = DnsIngestStats(shards=2, max_subdomains=3)
+    stats.record([_q(f"h{i}.example.com") for i in range(10)])
+    site = stats.get_grouped_sites(limit=1)["sites"][0]
+    assert site["total_queries"] == 10
+    assert len(site["subdomains"]) == 3
+
+
+def test_ingest_stats_merges_shards_for_top_lists():
+    stats = DnsIngestStats(shards=4, top_k_capacity=32)
+    stats.record(
+        [_q(f"ad{i}.test", blocked=True, client_ip="10.0.0.3") for i in range(20)]
+        + [_q("tracker.test", blocked=True) for _ in range(5)]
+    )
+    result = stats.get_stats()
+    assert result["total_queries"] == 25
+    assert result["top_blocked_domains"][0] == {"domain": "tracker.test", "count": 5}
+    assert result["top_clients"][0] == {"client_ip": "10.0.0.3", "count": 20}
+    assert stats.get_unique_clients() == ["10.0.0.2", "10.0.0.3"]
+
+
+def test_ingest_stats_grouped_sites_newest_first_across_shards():
+    stats = DnsIngestStats(shards=4)
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    stats.record([_q(f"site{i}.com", ts=base + timedelta(seconds=i)) for i in range(30)])
+    stats.record([_q("site3.com", ts=base + timedelta(minutes=5))])
+    # Late arrival: older than site3's last_seen, must not move it.
+    stats.record([_q("site3.com", ts=base)])
+
+    result = stats.get_grouped_sites(limit=3)
+    assert [s["root_domain"] for s in result["sites"]] == ["site3.com", "site29.com", "site28.com"]
+    assert result["sites"][0]["total_queries"] == 3
+    assert result["sites"][0]["first_seen"] == base.isoformat()
+    assert result["total_sites"] == 30
+
+
+def test_ingest_stats_blocked_only_uses_blocked_index():
+    stats = DnsIngestStats(shards=2)
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    stats.record([
+        _q("ads.one.com", blocked=True, ts=base),
+        _q("two.com", ts=base + timedelta(seconds=1)),
+        _q("ads.three.com", blocked=True, ts=base + timedelta(seconds=2)),
+        _q("www.three.com", ts=base + timedelta(seconds=3)),
+    ])
+    result = stats.get_grouped_sites(blocked_only=True, limit=10)
+    assert [s["root_domain"] for s in result["sites"]] == ["three.com", "one.com"]
+    assert result["sites"][0]["subdomains"] == ["ads.three.com", "www.three.com"]
+    assert result["total_sites"] == 2
+
+
+def test_ingest_stats_grouped_sites_per_client():
+    stats = DnsIngestStats(shards=2, max_clients=2, max_client_sites=10)
+    stats.record([
+        _q("www.google.com", client_ip="10.0.0.5"),
+        _q("ads.tracker.com", blocked=True, client_ip="10.0.0.5"),
+        _q("news.ycombinator.com", client_ip="10.0.0.6"),
+    ])
+
+    mine = stats.get_grouped_sites(client_ip="10.0.0.5", limit=10)
+    assert {s["root_domain"] for s in mine["sites"]} == {"google.com", "tracker.com"}
+    assert mine["total_sites"] == 2
+    blocked = stats.get_grouped_sites(client_ip="10.0.0.5", blocked_only=True, limit=10)
+    assert [s["root_domain"] for s in blocked["sites"]] == ["tracker.com"]
+    assert stats.get_grouped_sites(client_ip="10.0.0.9", limit=10)["sites"] == []
+
+    stats.record([_q("example.com", client_ip="10.0.0.7")])
+    assert stats.get_grouped_sites(client_ip="10.0.0.7", limit=10)["total_sites"] == 1
+    assert stats.get_grouped_sites(limit=10)["total_sites"] == 4
+
+
+def test_ingest_stats_late_new_site_sorts_by_last_seen():
+    stats = DnsIngestStats(shards=1)
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    stats.record([_q(f"site{i}.com", blocked=True, ts=base + timedelta(minutes=i)) for i in range(5)])
+    # First seen through a delayed batch: held at the newest end, but older than the rest.
+    stats.record([_q("late.com", blocked=True, ts=base - timedelta(minutes=10))])
+
+    for blocked_only in (False, True):
+        result = stats.get_grouped_sites(limit=2, blocked_only=blocked_only)
+        assert [s["root_domain"] for s in result["sites"]] == ["site4.com", "site3.com"]
+    oldest = stats.get_grouped_sites(limit=6)["sites"][-1]
+    assert oldest["root_domain"] == "late.com"
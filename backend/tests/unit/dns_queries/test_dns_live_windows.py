@@ -0,0 +1,197 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+import redis
+
+from app.features.dns_queries.dns_ingest_stats import prepare_queries
+from app.features.dns_queries.dns_live_windows import DnsLiveWindows, window_bucket_keys
+from app.features.dns_queries.schemas.dns_query import DnsQueryCreate
+
+NOW = datetime(2026, 3, 1, 12, 30, 15, tzinfo=timezone.utc)
+
+
+def _q(domain: str, *, minutes_ago: float = 0, blocked: bool = False, client_ip: str = "10.0.0.2"):
+    return DnsQueryCreate(
+        timestamp=NOW - timedelta(minutes=minutes_ago),
+        client_ip=client_ip,
+        domain=domain,
+        query_type="A",
+        action="blocked" if blocked else "forwarded",
+        blocked=blocked,
+    )
+
+
+def _batch():
+    return prepare_queries([
+        _q("www.google.com", minutes_ago=1),
+        _q("mail.google.com", minutes_ago=2),
+        _q("ads.tracker.com", minutes_ago=3, blocked=True, client_ip="10.0.0.9"),
+        _q("old.example.com", minutes_ago=90),
+        _q("ancient.example.org", minutes_ago=20 * 60),
+        _q("ancient.example.org", minutes_ago=20 * 60),
+        _q("v10.events.data.microsoft.com", minutes_ago=1),
+    ])
+
+
+@pytest.fixture
+def memory_windows():
+    with patch("app.features.dns_queries.dns_live_windows.redis_reachable", return_value=False):
+        windows = DnsLiveWindows(top_k=50)
+        windows.record(_batch(), now=NOW.timestamp())
+        yield windows
+
+
+@pytest.fixture
+def redis_windows():
+    client = fakeredis.FakeRedis(decode_responses=True)
+    with patch("app.features.dns_queries.dns_live_windows.get_redis", return_value=client):
+        with patch("app.features.dns_queries.dns_live_windows.redis_reachable", return_value=True):
+            windows = DnsLiveWindows(top_k=50)
+            windows.record(_batch(), now=NOW.timestamp())
+            yield windows
+
+
+def test_window_bucket_keys_cover_window_once():
+    now = NOW.timestamp()
+    short = window_bucket_keys(5, now)
+    assert {level for level, _ in short} == {"m"}
+    assert len(short) == 6
+
+    day = window_bucket_keys(1440, now)
+    hours = [start for level, start in day if level == "h"]
+    minutes = [start for level, start in day if level == "m"]
+    assert len(hours) == 24
+    assert all(start >= max(hours) + 3600 for start in minutes)
+
+
+@pytest.mark.parametrize("windows_fixture", ["memory_windows", "redis_windows"])
+def test_stats_follow_window(windows_fixture, request):
+    windows = request.getfixturevalue(windows_fixture)
+    now = NOW.timestamp()
+
+    five = windows.get_stats(5, now=now)
+    assert five["total_queries"] == 4
+    assert five["blocked_queries"] == 1
+    assert five["top_blocked_domains"] == [{"domain": "ads.tracker.com", "count": 1}]
+    assert five["window_minutes"] == 5
+
+    assert windows.get_stats(120, now=now)["total_queries"] == 5
+    day = windows.get_stats(1440, now=now)
+    assert day["total_queries"] == 7
+    assert day["top_clients"][0] == {"client_ip": "10.0.0.2", "count": 6}
+
+
+@pytest.mark.parametrize("windows_fixture", ["memory_windows", "redis_windows"])
+def test_grouped_sites_by_recency(windows_fixture, request):
+    windows = request.getfixturevalue(windows_fixture)
+    now = NOW.timestamp()
+
+    result = windows.get_grouped_sites(window_minutes=1440, limit=10, now=now)
+    roots = [site["root_domain"] for site in result["sites"]]
+    assert roots == ["google.com", "tracker.com", "example.com", "example.org"]
+    assert result["sites"][0]["total_queries"] == 2
+    assert result["sites"][3]["total_queries"] == 2
+    assert result["total_sites"] == 4
+    assert result["noise_filtered"] == 1
+
+    blocked = windows.get_grouped_sites(window_minutes=5, blocked_only=True, now=now)
+    assert [site["root_domain"] for site in blocked["sites"]] == ["tracker.com"]
+    assert blocked["sites"][0]["blocked"] is True
+
+
+def test_redis_buckets_are_shared_between_instances(redis_windows):
+    other_worker = DnsLiveWindows(top_k=50)
+    assert other_worker.get_stats(1440, now=NOW.timestamp())["total_queries"] == 7
+
+
+@pytest.mark.parametrize("use_redis", [False, True])
+def test_new_keys_accumulate_past_top_k(use_redis):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    with patch("app.features.dns_queries.dns_live_windows.get_redis", return_value=client):
+        with patch("app.features.dns_queries.dns_live_windows.redis_reachable", return_value=use_redis):
+            windows = DnsLiveWindows(top_k=3)
+            now = NOW.timestamp()
+            heavy = [_q(f"heavy{i}.example", blocked=True, minutes_ago=0.2) for i in range(3)]
+            windows.record(prepare_queries(heavy * 5), now=now)
+            for i in range(20):
+                windows.record(prepare_queries([_q(f"site{i}.test", minutes_ago=0.19 - i / 200)]), now=now)
+            windows.record(prepare_queries([_q("late.bad", blocked=True, minutes_ago=0.05)]), now=now)
+            windows.record(prepare_queries([_q("www.late.bad", blocked=True)]), now=now)
+
+            stats = windows.get_stats(5, now=now)
+            grouped = windows.get_grouped_sites(window_minutes=5, limit=2, now=now)
+
+    assert {"late.bad", "www.late.bad"} <= {row["domain"] for row in stats["top_blocked_domains"]}
+    assert stats["total_queries"] == 15 + 20 + 2
+    newest = grouped["sites"][0]
+    assert newest["root_domain"] == "late.bad"
+    assert newest["total_queries"] == 2
+    assert newest["subdomains"] == ["late.bad", "www.late.bad"]
+    assert newest["first_seen"] == (NOW - timedelta(minutes=0.05)).isoformat()
+    assert grouped["sites"][1]["root_domain"] == "site19.test"
+    assert grouped["sites"][1]["total_queries"] == 1
+    # One minute bucket: trimmed back to 2x top_k once past 4x top_k, never below.
+    assert 6 <= grouped["total_sites"] <= 12
+
+
+def test_redis_site_details_are_shared_between_instances(redis_windows):
+    other_worker = DnsLiveWindows(top_k=50)
+    sites = other_worker.get_grouped_sites(window_minutes=1440, now=NOW.timestamp())["sites"]
+    google = sites[0]
+    assert google["subdomains"] == ["mail.google.com", "www.google.com"]
+    assert google["first_seen"] == (NOW - timedelta(minutes=2)).isoformat()
+    client_view = other_worker.get_grouped_sites(client_ip="10.0.0.9", now=NOW.timestamp())
+    assert [s["root_domain"] for s in client_view["sites"]] == ["tracker.com"]
+
+
+@pytest.mark.parametrize("windows_fixture", ["memory_windows", "redis_windows"])
+def test_grouped_sites_per_client_follow_window(windows_fixture, request):
+    windows = request.getfixturevalue(windows_fixture)
+    now = NOW.timestamp()
+
+    mine = windows.get_grouped_sites(client_ip="10.0.0.2", window_minutes=1440, now=now)
+    assert [s["root_domain"] for s in mine["sites"]] == ["google.com", "example.com", "example.org"]
+    assert mine["total_sites"] == 3
+    recent = windows.get_grouped_sites(client_ip="10.0.0.2", window_minutes=5, now=now)
+    assert [s["root_domain"] for s in recent["sites"]] == ["google.com"]
+    assert recent["sites"][0]["total_queries"] == 2
+
+    theirs = windows.get_grouped_sites(client_ip="10.0.0.9", blocked_only=True, window_minutes=5, now=now)
+    assert [s["root_domain"] for s in theirs["sites"]] == ["tracker.com"]
+    assert windows.get_grouped_sites(client_ip="10.0.0.99", now=now)["sites"] == []
+
+
+def test_redis_outage_serves_memory_and_pings_once_per_interval():
+    client = fakeredis.FakeRedis(decode_responses=True)
+    now = NOW.timestamp()
+    with patch("app.features.dns_queries.dns_live_windows.get_redis", return_value=client):
+        with patch("app.features.dns_queries.dns_live_windows.redis_reachable", return_value=True) as ping:
+            windows = DnsLiveWindows(top_k=50)
+            windows.record(_batch(), now=now)
+            assert windows.get_stats(1440, now=now)["total_queries"] == 7
+            assert ping.call_count == 1
+
+            with patch.object(client, "pipeline", side_effect=redis.ConnectionError("down")):
+                windows.record(prepare_queries([_q("outage.example")]), now=now)
+                stats = windows.get_stats(5, now=now)
+                grouped = windows.get_grouped_sites(window_minutes=5, now=now)
+            assert ping.call_count == 1
+
+            reader = DnsLiveWindows(top_k=50)
+            with patch.object(client, "pipeline", side_effect=redis.ConnectionError("down")):
+                assert reader.get_stats(1440, now=now)["total_queries"] == 0
+            assert ping.call_count == 2
+
+    assert stats["total_queries"] == 1
+    assert [site["root_domain"] for site in grouped["sites"]] == ["outage.example"]
+
+
+def test_live_windows_redis_flag_keeps_buckets_in_memory(monkeypatch):
+    monkeypatch.setattr("app.shared.config.settings.DNS_LIVE_WINDOWS_REDIS_ENABLED", False)
+    with patch("app.features.dns_queries.dns_live_windows.redis_reachable", return_value=True) as ping:
+        windows = DnsLiveWindows(top_k=50)
+        windows.record(_batch(), now=NOW.timestamp())
+        assert windows.get_stats(1440, now=NOW.timestamp())["total_queries"] == 7
+    ping.assert_not_called()
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql
+
+from app.features.dns_queries.models.dns_query import DnsQuery
+from app.features.dns_queries.repositories.dns_query_repository import DnsQueryRepository
+
+
+def _row(domain: str, *, client_ip: str = "10.0.0.2", blocked: bool = False, ts=None) -> DnsQuery:
+    return DnsQuery(
+        timestamp=ts or datetime.now(timezone.utc),
+        client_ip=client_ip,
+        domain=domain,
+        blocked=blocked,
+    )
+
+
+def test_get_stats_totals_and_top_lists(db_session):
+    db_session.add_all(
+        [
+            _row("a.test"),
+            _row("ads.test", blocked=True),
+            _row("ads.test", blocked=True, client_ip="10.0.0.3"),
+            _row("malware.test", blocked=True, client_ip="10.0.0.3"),
+            _row("old.test", blocked=True, ts=datetime.now(timezone.utc) - timedelta(days=3)),
+        ]
+    )
+    db_session.commit()
+
+    stats = DnsQueryRepository(db_session).get_stats(top_n=1)
+    assert stats["total_queries"] == 4
+    assert stats["blocked_queries"] == 3
+    assert stats["allowed_queries"] == 1
+    assert stats["top_blocked_domains"] == [{"domain": "ads.test", "count": 2}]
+    assert len(stats["top_clients"]) == 1
+
+
+def test_get_stats_grouping_sets_sql_compiles_for_postgres(db_session):
+    repo = DnsQueryRepository(db_session)
+    captured = {}
+
+    class _Result:
+        def all(self):
+            return []
+
+    def _execute(stmt):
+        captured["sql"] = str(stmt.compile(dialect=postgresql.dialect()))
+        return _Result()
+
+    db_session.execute = _execute
+    now = datetime.now(timezone.utc)
+    totals = repo._stats_grouping_sets(
+        DnsQuery.timestamp >= now,
+        func.count().filter(DnsQuery.blocked.is_(True)),
+        10,
+    )
+    assert totals == (0, 0, [], [])
+    assert "GROUPING SETS" in captured["sql"]
+    assert "FILTER (WHERE dns_queries.blocked IS true)" in captured["sql"]
+    assert "row_number() OVER" in captured["sql"]
@@ -32,10 +32,49 @@ def test_create_query_skips_allowed_when_selective(db_session, dns_live_stats_en
     assert result.id == 0
 
 
+@patch("app.features.dns_queries.services.dns_query_service.live_windows")
+def test_get_grouped_by_site_uses_live_stats(mock_windows, db_session, dns_live_stats_env):
+    mock_windows.get_grouped_sites.return_value = {"sites": [], "source": "memory"}
+    svc = DnsQueryService()
+    result = svc.get_grouped_by_site(db_session, limit=10, window_minutes=60)
+    mock_windows.get_grouped_sites.assert_called_once_with(
+        client_ip=None, window_minutes=60, blocked_only=False, limit=10
+    )
+    assert result["source"] == "memory"
+
+
 @patch("app.features.dns_queries.services.dns_query_service.ingest_stats")
-def test_get_grouped_by_site_uses_live_stats(mock_stats, db_session, dns_live_stats_env):
+def test_get_grouped_by_site_falls_back_to_process_stats(mock_stats, db_session, dns_live_stats_env):
     mock_stats.get_grouped_sites.return_value = {"sites": [], "source": "memory"}
-    svc = DnsQueryService()
-    result = svc.get_grouped_by_site(db_session, limit=10)
+    with patch("app.features.dns_queries.services.dns_query_service.settings.DNS_LIVE_WINDOWS_ENABLED", False):
+        result = DnsQueryService().get_grouped_by_site(db_session, limit=10)
     mock_stats.get_grouped_sites.assert_called_once()
     assert result["source"] == "memory"
+
+
+def test_get_grouped_by_site_per_client_from_memory(db_session, dns_ingest_env):
+    svc = DnsQueryService()
+    svc.bulk_create_queries(
+        [
+            _blocked_query(domain="www.allowed-site.test", blocked=False, client_ip="10.0.0.81"),
+            _blocked_query(domain="ads.blocked-site.test", client_ip="10.0.0.81"),
+        ],
+        db_session,
+    )
+    result = svc.get_grouped_by_site(db_session, client_ip="10.0.0.81", limit=10)
+    assert result["source"] == "live"
+    assert {s["root_domain"] for s in result["sites"]} == {"allowed-site.test", "blocked-site.test"}
+
+
+@patch("app.features.dns_queries.services.dns_query_service.DnsQueryRepository")
+@patch("app.features.dns_queries.services.dns_query_service.ingest_stats")
+def test_get_grouped_by_site_unknown_client_falls_back_to_database(
+    mock_stats, mock_repo, db_session, dns_live_stats_env
+):
+    mock_stats.get_grouped_sites.return_value = {"sites": [], "source": "live"}
+    mock_repo.return_value.get_grouped_by_site.return_value = {"sites": [{"root_domain": "x.test"}]}
+    with patch("app.features.dns_queries.services.dns_query_service.settings.DNS_LIVE_WINDOWS_ENABLED", False):
+        result = DnsQueryService().get_grouped_by_site(db_session, client_ip="10.0.0.82", limit=10)
+    mock_stats.get_grouped_sites.assert_called_once()
+    assert mock_repo.return_value.get_grouped_by_site.call_args.kwargs["client_ip"] == "10.0.0.82"
+    assert result["source"] == "database"
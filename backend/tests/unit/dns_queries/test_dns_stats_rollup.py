@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta, timezone
+
+from app.features.dns_queries.models.dns_stats_rollup import DnsStatsHour, DnsStatsMinute
+from app.features.dns_queries.repositories.dns_stats_rollup_repository import DnsStatsRollupRepository
+from app.features.dns_queries.schemas.dns_query import DnsQueryCreate
+
+
+def _q(domain: str, *, ts: datetime, blocked: bool = False, client_ip: str = "10.0.0.2") -> DnsQueryCreate:
+    return DnsQueryCreate(timestamp=ts, client_ip=client_ip, domain=domain, blocked=blocked)
+
+
+def test_record_batch_accumulates_minute_and_hour_rows(db_session):
+    repo = DnsStatsRollupRepository(db_session)
+    ts = datetime.now(timezone.utc).replace(second=5, microsecond=0)
+    repo.record_batch([_q("a.example.com", ts=ts), _q("ads.bad.test", ts=ts, blocked=True)])
+    repo.record_batch([_q("b.example.com", ts=ts)])
+    db_session.commit()
+
+    client_minute = (
+        db_session.query(DnsStatsMinute)
+        .filter(DnsStatsMinute.dimension == "client", DnsStatsMinute.key == "10.0.0.2")
+        .one()
+    )
+    assert client_minute.query_count == 3
+    assert client_minute.blocked_count == 1
+
+    client_hour = (
+        db_session.query(DnsStatsHour)
+        .filter(DnsStatsHour.dimension == "client", DnsStatsHour.key == "10.0.0.2")
+        .one()
+    )
+    assert client_hour.query_count == 3
+    assert {row.dimension for row in db_session.query(DnsStatsHour)} == {"client", "blocked_domain"}
+
+
+def test_get_stats_sums_hours_and_minute_edges(db_session):
+    repo = DnsStatsRollupRepository(db_session)
+    now = datetime.now(timezone.utc)
+    three_hours_ago = now - timedelta(hours=3)
+    repo.record_batch(
+        [
+            _q("old.test", ts=three_hours_ago, blocked=True, client_ip="10.0.0.3"),
+            _q("recent.test", ts=now - timedelta(minutes=1)),
+            _q("recent.test", ts=now - timedelta(minutes=1), blocked=True),
+            _q("outside.test", ts=now - timedelta(days=3)),
+        ]
+    )
+    db_session.commit()
+
+    stats = repo.get_stats(start_date=now - timedelta(hours=4), end_date=now)
+    assert stats["total_queries"] == 3
+    assert stats["blocked_queries"] == 2
+    assert stats["top_blocked_domains"][0]["count"] == 1
+    assert {c["client_ip"] for c in stats["top_clients"]} == {"10.0.0.2", "10.0.0.3"}
+
+    recent = repo.get_stats(start_date=now - timedelta(minutes=10), end_date=now)
+    assert recent["total_queries"] == 2
+    assert recent["top_blocked_domains"] == [{"domain": "recent.test", "count": 1}]
@@ -0,0 +1,89 @@
+import base64
+from datetime import datetime, timedelta, timezone
+
+from app.features.dns_queries.dns_tunnel import DnsTunnelDetector
+from app.features.dns_queries.repositories.dns_alert_repository import DnsAlertRepository
+from app.features.dns_queries.schemas.dns_query import DnsQueryCreate
+from app.features.dns_queries.services.dns_anomaly_service import DnsAnomalyService
+
+BASE = datetime.now(timezone.utc) - timedelta(hours=1)
+
+
+def _q(domain: str, *, seconds: float = 0, query_type: str = "A", client_ip: str = "10.0.0.40"):
+    return DnsQueryCreate(
+        timestamp=BASE + timedelta(seconds=seconds),
+        client_ip=client_ip,
+        domain=domain,
+        query_type=query_type,
+        action="forwarded",
+        blocked=False,
+    )
+
+
+def _tunnel_batch(n: int, *, root: str = "exfil.example", start: int = 0):
+    """One query per second, each carrying a fresh base32 chunk."""
+    return [
+        _q(
+            base64.b32encode(f"secret-payload-{i:04d}".encode()).decode().lower().rstrip("=") + f".{root}",
+            seconds=i,
+        )
+        for i in range(start, start + n)
+    ]
+
+
+def _detector(**overrides):
+    params = dict(window_sec=300, min_unique_subdomains=40, min_encoded_bytes=1024, cooldown_sec=600, max_keys=100)
+    params.update(overrides)
+    return DnsTunnelDetector(**params)
+
+
+def test_long_unique_prefixes_raise_one_suspicion_per_cooldown():
+    detector = _detector()
+    assert detector.observe(_tunnel_batch(30)) == []
+
+    suspicions = detector.observe(_tunnel_batch(30, start=30))
+    assert len(suspicions) == 1
+    suspicion = suspicions[0]
+    assert suspicion.root_domain == "exfil.example"
+    assert suspicion.unique_subdomains == 60
+    assert suspicion.mean_prefix_length > 20
+    assert "Possible DNS tunnel via exfil.example" in suspicion.message()
+
+    assert detector.observe(_tunnel_batch(30, start=60)) == []
+
+
+def test_normal_browsing_is_not_flagged():
+    detector = _detector(min_unique_subdomains=5, min_encoded_bytes=10)
+    batch = [_q(f"{sub}.google.com", seconds=i) for i, sub in enumerate(["www", "mail", "docs", "drive", "maps", "news"] * 20)]
+    assert detector.observe(batch) == []
+
+
+def test_txt_heavy_short_prefixes_are_flagged():
+    detector = _detector(min_encoded_bytes=200)
+    batch = [_q(f"c{i:05d}.cmd.example", seconds=i, query_type="TXT") for i in range(50)]
+    suspicions = detector.observe(batch)
+    assert len(suspicions) == 1
+    assert suspicions[0].txt_null_ratio == 1.0
+
+
+def test_window_expiry_and_key_bound():
+    detector = _detector(max_keys=2)
+    detector.observe(_tunnel_batch(30))
+    # Same pair again after the window: old prefixes no longer count.
+    assert detector.observe(_tunnel_batch(30, start=1000)) == []
+
+    detector.observe([_q("a.one.example"), _q("b.two.example"), _q("c.three.example")])
+    assert len(detector) == 2
+
+
+def test_anomaly_service_records_dns_tunnel_alert(db_session, monkeypatch):
+    detector = _detector()
+    monkeypatch.setattr("app.features.dns_queries.services.dns_anomaly_service.tunnel_detector", detector)
+    monkeypatch.setattr("app.shared.config.settings.NEW_DOMAIN_ALERTS", False)
+
+    DnsAnomalyService(db_session).process_queries(_tunnel_batch(60))
+
+    alerts, total = DnsAlertRepository(db_session).get_recent(alert_type="dns_tunnel_suspected")
+    assert total == 1
+    assert alerts[0].root_domain == "exfil.example"
+    assert alerts[0].severity == "high"
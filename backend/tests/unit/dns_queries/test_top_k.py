@@ -0,0 +1,20 @@
+from app.features.dns_queries.top_k import SpaceSaving
+
+
+def test_space_saving_keeps_heavy_hitters_within_capacity():
+    summary = SpaceSaving(capacity=5)
+    for i in range(200):
+        summary.add("hot")
+        summary.add(f"cold-{i}")
+    assert len(summary) == 5
+    key, count = summary.most_common(1)[0]
+    assert key == "hot"
+    assert count >= 200
+
+
+def test_space_saving_exact_below_capacity():
+    summary = SpaceSaving(capacity=10)
+    summary.add("a", 3)
+    summary.add("b")
+    summary.add("a")
+    assert summary.most_common(2) == [("a", 4), ("b", 1)]
@@ -0,0 +1,43 @@
+import pytest
+
+from app.features.policy.domain_compaction import CompactedDomains, CompactionStats, DomainTrie
+
+
+def test_trie_drops_subdomains_of_blocked_ancestors():
+    trie = DomainTrie(["cdn.ads.example.com", "ads.example.com", "example.org", "img.example.org"])
+    assert trie.domains() == ["ads.example.com", "example.org"]
+    assert len(trie) == 2
+
+    assert trie.add("example.com") is True
+    assert trie.add("tracker.example.com") is False
+    assert trie.add("example.com") is False
+    assert trie.domains() == ["example.com", "example.org"]
+    assert len(trie) == 2
+
+
+def test_trie_covers_only_self_and_descendants():
+    trie = DomainTrie(["ads.example.com"])
+    assert trie.covers("ads.example.com")
+    assert trie.covers("x.ads.example.com")
+    assert not trie.covers("example.com")
+    assert not trie.covers("bads.example.com")
+    assert not trie.covers("other.net")
+
+
+def test_trie_ignores_malformed_domains():
+    trie = DomainTrie(["", "a..com", ".com", "ok.com"])
+    assert trie.domains() == ["ok.com"]
+
+
+def test_compacted_domains_cover_like_the_trie():
+    domains = ["ads.example.com", "example.org"]
+    trie = DomainTrie(domains)
+    compacted = CompactedDomains(trie.domains())
+    assert compacted.domains == ["ads.example.com", "example.org"]
+    for domain in ["ads.example.com", "x.ads.example.com", "example.com", "bads.example.com", "a.b.example.org", "org"]:
+        assert compacted.covers(domain) == trie.covers(domain), domain
+
+
+def test_compaction_stats_reduction():
+    assert CompactionStats(100, 70).reduction == pytest.approx(0.3)
+    assert CompactionStats(0, 0).reduction == 0.0
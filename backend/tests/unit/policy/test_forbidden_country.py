@@ -106,3 +106,14 @@ def test_policy_dns_sync_includes_country_tlds(db_session, monkeypatch):
     sync = PolicyDnsService(db_session).build_dns_sync()
     entry = next(e for e in sync.entries if e.device_id == device.id)
     assert ".ir" in entry.block_country_tlds
+
+
+def test_bulk_tld_patterns_match_per_device_lookup(db_session, monkeypatch):
+    monkeypatch.setattr(
+        "app.shared.config.settings.FORBIDDEN_COUNTRY_RULES",
+        '[{"user_country":"IL","blocked_countries":["IR"]}]',
+    )
+    monkeypatch.setattr("app.shared.config.settings.FORBIDDEN_COUNTRY_ENABLED", True)
+    device = _device_with_login_geo(db_session)
+    svc = ForbiddenCountryService(db_session)
+    assert svc.dnsmasq_tld_patterns_by_device() == {device.id: svc.dnsmasq_tld_patterns_for_device(device.id)}
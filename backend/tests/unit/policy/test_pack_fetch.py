@@ -1,4 +1,12 @@
-from app.features.policy.pack_fetch import parse_hosts_file
+import io
+import os
+import urllib.error
+from email.message import Message
+
+import pytest
+
+from app.features.policy import pack_fetch
+from app.features.policy.pack_fetch import parse_hosts_file, parse_pack_lines, parse_pack_text
 
 
 def test_parse_hosts_file_strips_comments_and_localhosts():
@@ -17,3 +25,71 @@ def test_parse_hosts_file_strips_comments_and_localhosts():
 def test_parse_hosts_file_normalizes_case():
     text = "0.0.0.0 Facebook.COM\n"
     assert "facebook.com" in parse_hosts_file(text)
+
+
+def test_parse_pack_lines_single_pass_matches_text_parser():
+    hosts = ["plain.example\n", "0.0.0.0 ads.example\n", "0.0.0.0 track.example\n"]
+    assert parse_pack_lines(iter(hosts)) == parse_pack_text("".join(hosts)) == {"ads.example", "track.example"}
+    assert parse_pack_lines(iter(["# list\n", "one.example\n", "two.example\n"])) == {"one.example", "two.example"}
+
+
+class _Response(io.BytesIO):
+    def __init__(self, body: bytes, headers: dict):
+        super().__init__(body)
+        self.headers = Message()
+        for key, value in headers.items():
+            self.headers[key] = value
+
+
+@pytest.fixture
+def upstream(tmp_path, monkeypatch):
+    monkeypatch.setattr(pack_fetch, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(pack_fetch.settings, "POLICY_PACK_SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    monkeypatch.setattr(pack_fetch.settings, "POLICY_PACK_FETCH_ENABLED", True)
+    monkeypatch.setattr(pack_fetch, "remote_pack_url", lambda slug: "https://lists.example/social")
+    requests = []
+    replies = []
+
+    def fake_urlopen(req, timeout):
+        requests.append(dict(req.header_items()))
+        status, body, headers = replies.pop(0)
+        if status == 304:
+            hdrs = Message()
+            for key, value in headers.items():
+                hdrs[key] = value
+            raise urllib.error.HTTPError(req.full_url, 304, "Not Modified", hdrs, None)
+        return _Response(body, headers)
+
+    monkeypatch.setattr(pack_fetch.urllib.request, "urlopen", fake_urlopen)
+    return tmp_path / "snapshots", requests, replies
+
+
+def test_refresh_sends_validators_and_keeps_snapshot_on_304(upstream):
+    snapshot_dir, requests, replies = upstream
+    replies.append((200, b"0.0.0.0 fb.example\n0.0.0.0 ig.example\n", {"ETag": '"abc"', "Last-Modified": "Mon, 05 Oct 2026 10:00:00 GMT"}))
+    replies.append((304, b"", {"ETag": '"abc"'}))
+
+    assert list(pack_fetch.refresh_remote_pack("social", force=True)) == ["fb.example", "ig.example"]
+    assert "If-none-match" not in requests[0]
+    snapshot = snapshot_dir / "social.txt"
+    old = snapshot.stat().st_mtime - 3600
+    os.utime(snapshot, (old, old))
+    body = snapshot.read_bytes()
+
+    pack = pack_fetch.refresh_remote_pack("social", force=True)
+    assert requests[1]["If-none-match"] == '"abc"'
+    assert requests[1]["If-modified-since"] == "Mon, 05 Oct 2026 10:00:00 GMT"
+    assert list(pack) == ["fb.example", "ig.example"]
+    assert snapshot.read_bytes() == body
+    assert snapshot.stat().st_mtime > old
+    assert pack_fetch.snapshot_age_seconds("social") < 60
+    assert pack_fetch.read_snapshot_meta("social").etag == '"abc"'
+
+
+def test_refresh_ignores_validators_from_another_source(upstream):
+    _snapshot_dir, requests, replies = upstream
+    pack_fetch.write_snapshot("social", {"old.example"}, source_url="https://old.example/list", etag='"x"')
+    replies.append((200, b"new.example\n", {}))
+
+    assert list(pack_fetch.refresh_remote_pack("social", force=True)) == ["new.example"]
+    assert "If-none-match" not in requests[0]
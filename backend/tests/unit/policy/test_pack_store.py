@@ -0,0 +1,124 @@
+import hashlib
+import os
+
+import pytest
+
+from app.features.policy import pack_fetch
+from app.features.policy.pack_store import PackIndex, open_pack_index, write_pack_index
+
+
+def test_pack_index_round_trip_sorted_and_deduplicated(tmp_path):
+    path = tmp_path / "social.pack"
+    count = write_pack_index(path, ["b.example", "a.example", "b.example", "bücher.example", ""])
+
+    pack = open_pack_index(path)
+    assert count == len(pack) == 3
+    assert list(pack) == ["a.example", "b.example", "bücher.example"]
+    assert pack[-1] == "bücher.example"
+    assert pack[1:5] == ["b.example", "bücher.example"]
+    assert not [p for p in tmp_path.iterdir() if p.name.startswith(".")]
+
+
+def test_pack_index_membership_uses_binary_search():
+    domains = [f"d{i:05d}.example" for i in range(1000)]
+    pack = PackIndex.from_domains(domains)
+    assert "d00000.example" in pack
+    assert "d00999.example" in pack
+    assert "d01000.example" not in pack
+    assert "a.example" not in pack
+    assert 42 not in pack
+    assert "x" not in PackIndex.from_domains([])
+
+
+def test_pack_index_rejects_foreign_files(tmp_path):
+    path = tmp_path / "bad.pack"
+    path.write_bytes(b"not a pack index")
+    with pytest.raises(ValueError):
+        open_pack_index(path)
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pack_fetch, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(pack_fetch.settings, "POLICY_PACK_SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    return tmp_path / "snapshots"
+
+
+def test_write_snapshot_compiles_pack_index(snapshot_dir):
+    pack_fetch.write_snapshot("social", {"beta.com", "alpha.com"})
+
+    assert (snapshot_dir / "social.pack").is_file()
+    pack = pack_fetch.load_cached_pack("social")
+    assert list(pack) == ["alpha.com", "beta.com"]
+    assert "beta.com" in pack
+
+
+def test_text_only_snapshot_is_compiled_on_load(snapshot_dir):
+    snapshot_dir.mkdir()
+    (snapshot_dir / "games.txt").write_text("Www.Game.example\n# comment\nplay.example\n")
+
+    assert list(pack_fetch.load_cached_pack("games")) == ["game.example", "play.example"]
+    assert (snapshot_dir / "games.pack").is_file()
+
+
+def test_newer_text_snapshot_recompiles_pack_index(snapshot_dir):
+    pack_fetch.write_snapshot("games", {"old.example"})
+    text = snapshot_dir / "games.txt"
+    text.write_text("new.example\n")
+    stamp = (snapshot_dir / "games.pack").stat().st_mtime + 10
+    os.utime(text, (stamp, stamp))
+
+    assert list(pack_fetch.load_cached_pack("games")) == ["new.example"]
+
+
+def test_seed_list_used_without_snapshot(snapshot_dir):
+    (snapshot_dir.parent / "adult.txt").write_text("seed.example\n")
+    assert list(pack_fetch.load_cached_pack("adult")) == ["seed.example"]
+
+
+def test_write_snapshot_records_sidecar_meta(snapshot_dir):
+    path = pack_fetch.write_snapshot("social", {"beta.com", "alpha.com"}, source_url="https://lists.example/social")
+
+    meta = pack_fetch.read_snapshot_meta("social")
+    assert meta.count == 2
+    assert meta.sha256 == hashlib.sha256(path.read_bytes()).hexdigest()
+    assert meta.source_url == "https://lists.example/social"
+    assert meta.fetched_at
+    assert not [p.name for p in snapshot_dir.iterdir() if p.name.startswith(".")]
+
+
+def test_failed_sidecar_write_leaves_no_temp_file(snapshot_dir, monkeypatch):
+    pack_fetch.write_snapshot("social", {"alpha.com"})
+
+    def fail_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(pack_fetch.os, "replace", fail_replace)
+    with pytest.raises(OSError):
+        pack_fetch._write_snapshot_meta("social", pack_fetch.read_snapshot_meta("social"))
+    assert not [p.name for p in snapshot_dir.iterdir() if p.name.startswith(".")]
+
+
+def test_counts_come_from_sidecar_without_reparsing(snapshot_dir, monkeypatch):
+    pack_fetch.write_snapshot("social", {"alpha.com", "beta.com", "gamma.net"})
+
+    def no_parse(path):
+        raise AssertionError(f"reparsed {path}")
+
+    monkeypatch.setattr(pack_fetch, "_read_domains_file", no_parse)
+    assert pack_fetch.pack_domain_count_meta("social") == (3, "snapshot")
+
+
+def test_sidecar_backfilled_for_snapshot_without_one(snapshot_dir):
+    snapshot_dir.mkdir()
+    (snapshot_dir / "games.txt").write_text("a.example\nb.example\n")
+
+    assert pack_fetch.pack_domain_count_meta("games") == (2, "snapshot")
+    assert pack_fetch.read_snapshot_meta("games").count == 2
+
+    text = snapshot_dir / "games.txt"
+    text.write_text("c.example\n")
+    stamp = (snapshot_dir / "games.meta.json").stat().st_mtime + 10
+    os.utime(text, (stamp, stamp))
+    assert pack_fetch.read_snapshot_meta("games") is None
+    assert pack_fetch.pack_domain_count_meta("games") == (1, "snapshot")
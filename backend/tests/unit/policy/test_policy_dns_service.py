@@ -1,6 +1,13 @@
+import json
 from datetime import datetime, timedelta, timezone
 
+from sqlalchemy import event
+
 from app.features.policy.models.device_quarantine import DeviceQuarantine
+from app.features.policy.models.policy_profile import PolicyProfile
+from app.features.policy.pack_loader import load_all_packs
+from app.features.policy.schemas.policy import PolicyDnsSyncDeltaRequest
+from app.features.policy.services import policy_dns_service
 from app.features.policy.services.policy_dns_service import PolicyDnsService
 from tests.helpers.factories import create_behavior_block, create_vpn_device, seed_policy_catalog
 
@@ -67,3 +74,177 @@ def test_behavior_quarantine_keeps_allowlist(db_session):
     entry = next(e for e in result.entries if e.device_id == device.id)
     assert entry.allowlist_only is True
     assert len(entry.allowlist_domains) > 0
+
+
+def test_build_dns_sync_hashes_are_stable_and_track_changes(db_session):
+    seed_policy_catalog(db_session)
+    device, _ = create_vpn_device(db_session, mac_address="aa:bb:cc:dd:ee:04")
+    svc = PolicyDnsService(db_session)
+    first = svc.build_dns_sync()
+    again = svc.build_dns_sync()
+    assert first.version and first.version == again.version
+    hash_before = next(e for e in first.entries if e.device_id == device.id).content_hash
+
+    create_behavior_block(db_session, device, domain="changed.behavior.test")
+    changed = svc.build_dns_sync()
+    assert changed.version != first.version
+    assert changed.global_hash == first.global_hash
+    assert next(e for e in changed.entries if e.device_id == device.id).content_hash != hash_before
+
+
+def test_diff_dns_sync_leaves_out_known_parts(db_session):
+    seed_policy_catalog(db_session)
+    device, _ = create_vpn_device(db_session, mac_address="aa:bb:cc:dd:ee:05")
+    sync = PolicyDnsService(db_session).build_dns_sync()
+    entry = next(e for e in sync.entries if e.device_id == device.id)
+
+    delta = PolicyDnsService.diff_dns_sync(
+        sync,
+        PolicyDnsSyncDeltaRequest(global_hash=sync.global_hash, device_hashes={device.id: entry.content_hash}),
+    )
+    assert delta.global_unchanged is True
+    assert delta.global_domains == []
+    assert device.id in delta.unchanged_device_ids
+    assert all(e.device_id != device.id for e in delta.entries)
+    assert delta.version == sync.version
+
+    stale = PolicyDnsService.diff_dns_sync(
+        sync, PolicyDnsSyncDeltaRequest(global_hash="old", device_hashes={device.id: "old"})
+    )
+    assert stale.global_unchanged is False
+    assert stale.global_domains == sync.global_domains
+    assert any(e.device_id == device.id for e in stale.entries)
+
+
+def test_profile_packs_are_shared_by_tag_not_expanded_per_device(db_session):
+    seed_policy_catalog(db_session)
+    device, _ = create_vpn_device(db_session, mac_address="aa:bb:cc:dd:ee:06")
+    all_packs = load_all_packs()
+    social_domain = sorted(all_packs["social"])[0]
+    malware_domain = sorted(all_packs["malware"])[0]
+    for profile in db_session.query(PolicyProfile).all():
+        profile.enabled_pack_slugs = ["malware", "social"]
+        profile.extra_block_domains = [
+            social_domain,
+            f"cdn.{social_domain}",
+            malware_domain,
+            "only-this-device.test",
+            "ads.only-this-device.test",
+        ]
+    db_session.commit()
+
+    result = PolicyDnsService(db_session).build_dns_sync()
+    entry = next(e for e in result.entries if e.device_id == device.id)
+    assert entry.pack_slugs == ["social"]
+    assert entry.block_domains == ["only-this-device.test"]
+    assert [pack.slug for pack in result.packs] == ["social"]
+    assert result.packs[0].tag == "ng_pack_social"
+    assert social_domain in result.packs[0].domains
+    assert malware_domain in result.global_domains
+
+
+def test_devices_sharing_a_profile_reuse_its_layer(db_session, monkeypatch):
+    seed_policy_catalog(db_session)
+    first, _ = create_vpn_device(db_session, mac_address="aa:bb:cc:dd:ee:07")
+    second, _ = create_vpn_device(
+        db_session, ip="10.0.0.11", mac_address="aa:bb:cc:dd:ee:08", device_id="dev-test-2"
+    )
+    for profile in db_session.query(PolicyProfile).all():
+        profile.enabled_pack_slugs = ["social"]
+        profile.extra_block_domains = ["shared.test", "ads.shared.test"]
+    db_session.commit()
+    create_behavior_block(db_session, second, domain="own.behavior.test")
+    create_behavior_block(db_session, second, domain="x.shared.test")
+
+    schedule_calls = []
+    real_schedule = policy_dns_service.active_schedule_pack_slugs
+    monkeypatch.setattr(
+        policy_dns_service,
+        "active_schedule_pack_slugs",
+        lambda rules: schedule_calls.append(rules) or real_schedule(rules),
+    )
+
+    result = PolicyDnsService(db_session).build_dns_sync()
+    entries = {e.device_id: e for e in result.entries}
+    assert len(schedule_calls) == 1
+    assert entries[first.id].block_domains == ["shared.test"]
+    assert entries[second.id].block_domains == ["own.behavior.test", "shared.test"]
+    assert entries[first.id].pack_slugs == entries[second.id].pack_slugs == ["social"]
+
+
+def _count_queries(db_session, fn):
+    statements = []
+    engine = db_session.get_bind()
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return len(statements)
+
+
+def test_build_dns_sync_query_count_does_not_grow_with_devices(db_session):
+    seed_policy_catalog(db_session)
+    first, _ = create_vpn_device(db_session, mac_address="aa:bb:cc:dd:ee:09")
+    create_behavior_block(db_session, first, domain="one.behavior.test")
+    svc = PolicyDnsService(db_session)
+    one_device = _count_queries(db_session, svc.build_dns_sync)
+
+    for n in range(2, 6):
+        device, _ = create_vpn_device(
+            db_session, ip=f"10.0.0.{10 + n}", mac_address=f"aa:bb:cc:dd:ef:0{n}", device_id=f"dev-{n}"
+        )
+        create_behavior_block(db_session, device, domain=f"{n}.behavior.test")
+    db_session.expire_all()
+    assert _count_queries(db_session, svc.build_dns_sync) <= one_device
+
+
+def _records(chunks):
+    return [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+
+
+def test_stream_dns_sync_matches_build_and_chunks_lists(db_session, monkeypatch):
+    seed_policy_catalog(db_session)
+    device, _ = create_vpn_device(db_session, mac_address="aa:bb:cc:dd:ee:07")
+    for profile in db_session.query(PolicyProfile).all():
+        profile.enabled_pack_slugs = ["malware", "social"]
+    db_session.commit()
+    monkeypatch.setattr(policy_dns_service, "STREAM_CHUNK_DOMAINS", 3)
+
+    full = PolicyDnsService(db_session).build_dns_sync()
+    records = _records(PolicyDnsService(db_session).stream_dns_sync())
+
+    assert records[0] == {
+        "type": "global",
+        "global_hash": full.global_hash,
+        "count": len(full.global_domains),
+        "unchanged": False,
+    }
+    streamed_global = [d for r in records if r["type"] == "global_domains" for d in r["domains"]]
+    assert streamed_global == full.global_domains
+    assert all(len(r["domains"]) <= 3 for r in records if r["type"].endswith("_domains"))
+
+    device_record = next(r for r in records if r["type"] == "device" and r["device_id"] == device.id)
+    assert device_record["content_hash"] == next(e for e in full.entries if e.device_id == device.id).content_hash
+    social = [d for r in records if r["type"] == "pack_domains" and r["slug"] == "social" for d in r["domains"]]
+    assert social == full.packs[0].domains
+    assert records[-1]["type"] == "end"
+    assert records[-1]["version"] == full.version
+
+
+def test_stream_dns_sync_marks_known_parts_unchanged(db_session):
+    seed_policy_catalog(db_session)
+    device, _ = create_vpn_device(db_session, mac_address="aa:bb:cc:dd:ee:08")
+    full = PolicyDnsService(db_session).build_dns_sync()
+    known = PolicyDnsSyncDeltaRequest(
+        global_hash=full.global_hash,
+        device_hashes={e.device_id: e.content_hash for e in full.entries},
+        pack_hashes={p.slug: p.content_hash for p in full.packs},
+    )
+
+    records = _records(PolicyDnsService(db_session).stream_dns_sync(known))
+    assert records[0]["unchanged"] is True
+    assert {r["type"] for r in records[1:-1]} <= {"device_unchanged", "pack_unchanged"}
+    assert any(r["type"] == "device_unchanged" and r["device_id"] == device.id for r in records)
+    assert records[-1]["version"] == full.version
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.shared import async_database
+from app.shared.async_database import async_db_url, async_engine_options
+from app.shared.db_pool_metrics import InstrumentedAsyncQueuePool, pool_snapshots
+
+
+def test_async_db_url_swaps_driver():
+    assert (
+        async_db_url("postgresql+psycopg2://user:secret@db:5432/trustedge")
+        == "postgresql+asyncpg://user:secret@db:5432/trustedge"
+    )
+    assert async_db_url("postgresql://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+    assert async_db_url("sqlite:///:memory:") == "sqlite+aiosqlite:///:memory:"
+    with pytest.raises(ValueError):
+        async_db_url("mysql://u:p@db/app")
+
+
+def test_async_engine_options_statement_timeout(monkeypatch):
+    monkeypatch.setattr("app.shared.config.settings.DB_STATEMENT_TIMEOUT_MS", 5000)
+    assert async_engine_options("sqlite:///:memory:") == {}
+    options = async_engine_options("postgresql://u:p@db/app")
+    assert options["connect_args"] == {"server_settings": {"statement_timeout": "5000"}}
+    assert options["pool_pre_ping"] is True
+
+
+def test_libpq_params_become_asyncpg_connect_args(monkeypatch):
+    monkeypatch.setattr("app.shared.config.settings.DB_STATEMENT_TIMEOUT_MS", 5000)
+    url = "postgresql://u:p@db/app?sslmode=require&connect_timeout=10&application_name=api"
+    assert async_db_url(url) == "postgresql+asyncpg://u:p@db/app"
+    options = async_engine_options(url)
+    assert options["connect_args"] == {
+        "ssl": "require",
+        "timeout": 10.0,
+        "server_settings": {"application_name": "api", "statement_timeout": "5000"},
+    }
+
+    engine = create_async_engine(async_db_url(url), **options)
+    try:
+        _, kwargs = engine.dialect.create_connect_args(engine.sync_engine.url)
+        assert "sslmode" not in kwargs
+    finally:
+        asyncio.run(engine.dispose())
+
+
+def test_async_engine_has_its_own_instrumented_pool(monkeypatch):
+    monkeypatch.setattr("app.shared.config.settings.DB_URL", "postgresql://u:p@db/app")
+    monkeypatch.setattr("app.shared.config.settings.DB_ASYNC_POOL_SIZE", 3)
+    monkeypatch.setattr("app.shared.config.settings.DB_ASYNC_MAX_OVERFLOW", 4)
+    monkeypatch.setattr(async_database, "_async_engine", None)
+
+    engine = async_database.get_async_engine()
+    try:
+        assert isinstance(engine.sync_engine.pool, InstrumentedAsyncQueuePool)
+        assert engine.sync_engine.pool.size() == 3
+        assert "async_primary" in [s["pool"] for s in pool_snapshots()]
+    finally:
+        asyncio.run(async_database.dispose_async_engines())
+    assert "async_primary" not in [s["pool"] for s in pool_snapshots()]
@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.shared.database import engine_options
+from app.shared.db_pool_metrics import (
+    InstrumentedQueuePool,
+    PoolMetrics,
+    register_engine_pool,
+    unregister_engine_pool,
+)
+
+
+@pytest.fixture
+def instrumented_engine(tmp_path):
+    engines = []
+
+    def build(**pool_kwargs):
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool, **pool_kwargs
+        )
+        register_engine_pool("test", engine)
+        engines.append(engine)
+        return engine
+
+    yield build
+    unregister_engine_pool("test")
+    for engine in engines:
+        engine.dispose()
+
+
+def test_pool_metrics_track_checkouts_and_overflow(instrumented_engine):
+    engine = instrumented_engine(pool_size=1, max_overflow=1)
+    first = engine.connect()
+    second = engine.connect()
+    second.execute(text("SELECT 1"))
+
+    snapshot = engine.pool.metrics.snapshot(engine.pool)
+    assert snapshot["checkouts"] == 2
+    assert snapshot["checked_out"] == 2
+    assert snapshot["overflow_in_use"] == 1
+    assert snapshot["overflow_checkouts"] == 1
+    assert snapshot["wait_ms_max"] >= snapshot["wait_ms_avg"] >= 0
+
+    first.close()
+    second.close()
+    assert engine.pool.metrics.snapshot(engine.pool)["checked_out"] == 0
+
+
+def test_pool_metrics_count_timeouts(instrumented_engine):
+    engine = instrumented_engine(pool_size=1, max_overflow=0, pool_timeout=0.01)
+    held = engine.connect()
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+    held.close()
+    assert engine.pool.metrics.timeouts == 1
+
+
+def test_metrics_survive_pool_recreate(instrumented_engine):
+    engine = instrumented_engine()
+    metrics = engine.pool.metrics
+    engine.dispose()
+    assert isinstance(metrics, PoolMetrics)
+    assert engine.pool.metrics is metrics
+
+
+def test_engine_options_by_backend(monkeypatch):
+    monkeypatch.setattr("app.shared.config.settings.DB_STATEMENT_TIMEOUT_MS", 5000)
+    assert engine_options("sqlite:///:memory:") == {}
+
+    options = engine_options("postgresql://u:p@db/app")
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert options["pool_pre_ping"] is True
+    assert options["connect_args"] == {"options": "-c statement_timeout=5000"}
@@ -1,4 +1,5 @@
-from app.shared.domain_country import country_code_for_domain, country_display_name
+from app.shared.domain_country import country_code_for_domain, country_code_for_root, country_display_name
+from app.shared.domain_utils import extract_root_domain
 
 
 def test_country_il_tld():
@@ -19,3 +20,18 @@ def test_country_de_tld():
 
 def test_display_name():
     assert "Israel" in country_display_name("IL")
+
+
+def test_country_for_root_walks_longest_suffix_first():
+    assert country_code_for_root("bbc.co.uk") == "GB"
+    assert country_code_for_root("co.uk") == "GB"
+    assert country_code_for_root("shop.com.au") == "AU"
+    assert country_code_for_root("startup.io") == "GLOBAL"
+    assert country_code_for_root("example.unknowntld") == "GLOBAL"
+    assert country_code_for_root("localhost") == "UNKNOWN"
+    assert country_code_for_root("") == "UNKNOWN"
+
+
+def test_country_for_domain_matches_root_lookup():
+    for domain in ("www.ynet.co.il", "a.b.example.com.br", "Mail.Example.FR.", "x.y.ir"):
+        assert country_code_for_domain(domain) == country_code_for_root(extract_root_domain(domain))
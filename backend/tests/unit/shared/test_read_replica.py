@@ -0,0 +1,57 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+
+from app.shared import dependencies
+from app.shared.read_replica import ReplicaHealth
+
+
+def test_replica_health_caches_probe(monkeypatch):
+    monkeypatch.setattr("app.shared.config.settings.DB_READ_HEALTH_CHECK_INTERVAL_SEC", 60.0)
+    health = ReplicaHealth()
+    calls = []
+
+    def _probe(engine):
+        calls.append(engine)
+        return True, None
+
+    monkeypatch.setattr(health, "_probe", _probe)
+    engine = create_engine("sqlite:///:memory:")
+    assert health.is_usable(engine) is True
+    assert health.is_usable(engine) is True
+    assert len(calls) == 1
+
+    health.mark_unhealthy()
+    assert health.is_usable(engine) is False
+
+
+def test_replica_probe_reports_unreachable():
+    health = ReplicaHealth()
+    engine = create_engine("sqlite:////nonexistent-dir/replica.db")
+    assert health._probe(engine) == (False, None)
+
+
+def _replica_configured(monkeypatch, *, usable: bool):
+    monkeypatch.setattr(dependencies, "read_engine", create_engine("sqlite:///:memory:"))
+    monkeypatch.setattr(dependencies, "ReadSessionLocal", lambda: "replica-session")
+    monkeypatch.setattr(dependencies.replica_health, "is_usable", lambda engine: usable)
+    monkeypatch.setattr(dependencies, "SessionLocal", lambda: _FakeSession("primary"))
+
+
+class _FakeSession(str):
+    def close(self):
+        pass
+
+
+def test_get_read_db_falls_back_to_primary(monkeypatch):
+    _replica_configured(monkeypatch, usable=False)
+    monkeypatch.setattr("app.shared.config.settings.DB_READ_FALLBACK_TO_PRIMARY", True)
+    assert next(dependencies.get_read_db()) == "primary"
+
+
+def test_get_read_db_without_fallback_returns_503(monkeypatch):
+    _replica_configured(monkeypatch, usable=False)
+    monkeypatch.setattr("app.shared.config.settings.DB_READ_FALLBACK_TO_PRIMARY", False)
+    with pytest.raises(HTTPException) as exc:
+        next(dependencies.get_read_db())
+    assert exc.value.status_code == 503
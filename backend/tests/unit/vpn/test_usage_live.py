@@ -1,3 +1,4 @@
+import asyncio
 from datetime import datetime, timedelta, timezone
 
 from app.features.devices.models.device import Device
@@ -5,7 +6,8 @@ from app.features.vpn.models.device_usage_sample import DeviceUsageSample
 from app.features.vpn.models.ip_lease import IpLease
 from app.features.vpn.models.ip_pool import IpPool
 from app.features.vpn.models.vpn_peer import VpnPeer
-from app.features.vpn.services.usage_service import UsageService
+from app.features.vpn.services.usage_service import UsageService, list_live_bandwidth_async
+from tests.helpers.integration import async_session_factory_for
 
 
 def _seed_pool_peer_lease_device(db_session):
@@ -31,7 +33,7 @@ def _seed_pool_peer_lease_device(db_session):
     return device, peer
 
 
-def test_list_live_bandwidth_returns_latest_rates(db_session):
+def _seed_two_samples(db_session):
     device, peer = _seed_pool_peer_lease_device(db_session)
     now = datetime.now(timezone.utc)
     db_session.add(
@@ -58,6 +60,11 @@ def test_list_live_bandwidth_returns_latest_rates(db_session):
     )
     db_session.commit()
 
+    return device
+
+
+def test_list_live_bandwidth_returns_latest_rates(db_session):
+    device = _seed_two_samples(db_session)
     resp = UsageService(db_session).list_live_bandwidth(max_age_sec=60)
     assert len(resp.items) == 1
     item = resp.items[0]
@@ -67,3 +74,16 @@ def test_list_live_bandwidth_returns_latest_rates(db_session):
     assert item.rx_mib_per_sec == 2.0
     assert item.tx_mib_per_sec == 0.4
     assert item.total_mib_per_sec == 2.4
+
+
+def test_list_live_bandwidth_async_matches_sync(db_session):
+    _seed_two_samples(db_session)
+    sessions = async_session_factory_for(db_session)
+
+    async def _run():
+        async with sessions() as session:
+            return await list_live_bandwidth_async(session, max_age_sec=60)
+
+    resp = asyncio.run(_run())
+    assert resp == UsageService(db_session).list_live_bandwidth(max_age_sec=60)
+    assert resp.items[0].total_mib_per_sec == 2.4
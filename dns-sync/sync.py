@@ -5,12 +5,15 @@ Fetches policy DNS rules from TrustEdge API and updates dnsmasq configuration.
 """
 
 import os
+import re
+import shutil
 import sys
 import subprocess
+import tempfile
 import time
 import json
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import IO, Iterable, Iterator, List, NamedTuple, Optional, Dict, Any, Tuple
 
 from log_config import setup_logging, structured_extra
 
@@ -18,6 +21,7 @@ logger = setup_logging(service="dns-sync", logger_name=__name__)
 
 API_BASE_URL = os.getenv('API_BASE_URL', 'http://localhost:8000')
 POLICY_DNS_SYNC_ENDPOINT = os.getenv('POLICY_DNS_SYNC_ENDPOINT', '/policy/dns-sync')
+POLICY_DNS_STREAM_ENDPOINT = os.getenv('POLICY_DNS_STREAM_ENDPOINT', '/policy/dns-sync/stream')
 POLICY_SYNC_REPORT_ENDPOINT = os.getenv('POLICY_SYNC_REPORT_ENDPOINT', '/policy/sync-report')
 BLOCK_IP = os.getenv('BLOCK_IP', '0.0.0.0')
 BLOCK_IPV6_IP = os.getenv('BLOCK_IPV6_IP', '::')
@@ -30,6 +34,9 @@ DEVICE_SYNC_ENABLED = os.getenv('DEVICE_SYNC_ENABLED', '1').lower() not in ('0',
 DNS_INGEST_TOKEN = os.getenv('DNS_INGEST_TOKEN', '').strip()
 ADMIN_API_TOKEN = os.getenv('ADMIN_API_TOKEN', '').strip()
 CLIENT_BLOCKS_CONFIG_DIR = os.getenv('CLIENT_BLOCKS_CONFIG_DIR', '/etc/dnsmasq.d/trustedge-devices')
+# Hashes of the last applied policy (ETag, global list, per device); empty disables delta sync.
+# dnsmasq conf-dir skips dotfiles, so the default can live next to the generated configs.
+DNS_SYNC_STATE_PATH = os.getenv('DNS_SYNC_STATE_PATH', '/etc/dnsmasq.d/.trustedge-dns-sync.json')
 
 
 def _api_headers(admin: bool = False, ingest: bool = False) -> Dict[str, str]:
@@ -70,6 +77,200 @@ def fetch_policy_dns_sync(api_url: str, endpoint: str) -> Optional[Dict[str, Any
         return None
 
 
+class PolicyFetch(NamedTuple):
+    data: Optional[Dict[str, Any]]  # None when the server answered 304 Not Modified
+    etag: str
+
+
+def fetch_policy_dns_delta(
+    api_url: str,
+    endpoint: str,
+    state: Dict[str, Any],
+) -> Optional[PolicyFetch]:
+    """POST the applied hashes; the server leaves out unchanged parts or answers 304."""
+    if not api_url:
+        logger.error(
+            "API_BASE_URL not set",
+            extra=structured_extra("policy_sync_config_error"),
+        )
+        return None
+    import urllib.error
+    import urllib.request
+
+    url = f"{api_url.rstrip('/')}{endpoint}"
+    body = json.dumps({
+        'global_hash': state.get('global_hash') or '',
+        'device_hashes': state.get('device_hashes') or {},
+        'pack_hashes': state.get('pack_hashes') or {},
+    }).encode('utf-8')
+    headers = {**_api_headers(ingest=True), 'Content-Type': 'application/json'}
+    if state.get('etag'):
+        headers['If-None-Match'] = state['etag']
+    req = urllib.request.Request(url, data=body, method='POST', headers=headers)
+    try:
+        with urllib.request.urlopen(req, timeout=60) as response:
+            data = json.loads(response.read().decode('utf-8'))
+            return PolicyFetch(data, response.headers.get('ETag') or '')
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return PolicyFetch(None, e.headers.get('ETag') or state.get('etag') or '')
+        if e.code in (404, 405):
+            # API without delta support: fall back to the full payload
+            data = fetch_policy_dns_sync(api_url, endpoint)
+            return PolicyFetch(data, '') if data is not None else None
+        logger.error(
+            "Policy DNS sync API error",
+            extra=structured_extra("policy_sync_fetch_failed", status_code=e.code),
+        )
+        return None
+    except Exception:
+        logger.error(
+            "Policy DNS sync fetch failed",
+            extra=structured_extra("policy_sync_fetch_failed"),
+            exc_info=True,
+        )
+        return None
+
+
+class StreamUnsupported(Exception):
+    """The API has no NDJSON dns-sync stream (older backend)."""
+
+
+def stream_policy_records(api_url: str, endpoint: str, state: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """POST the applied hashes and yield NDJSON dns-sync records as they arrive.
+
+    A 304 for the stored ETag yields the applied state back as unchanged records.
+    """
+    import urllib.error
+    import urllib.request
+
+    url = f"{api_url.rstrip('/')}{endpoint}"
+    body = json.dumps({
+        'global_hash': state.get('global_hash') or '',
+        'device_hashes': state.get('device_hashes') or {},
+        'pack_hashes': state.get('pack_hashes') or {},
+    }).encode('utf-8')
+    headers = {
+        **_api_headers(ingest=True),
+        'Accept': 'application/x-ndjson',
+        'Content-Type': 'application/json',
+    }
+    if state.get('etag'):
+        headers['If-None-Match'] = state['etag']
+    req = urllib.request.Request(url, data=body, method='POST', headers=headers)
+    try:
+        response = urllib.request.urlopen(req, timeout=60)
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            yield from payload_records(None, state, e.headers.get('ETag') or state['etag'])
+            return
+        if e.code in (404, 405):
+            raise StreamUnsupported(url) from e
+        raise
+    with response:
+        for raw in response:
+            if raw.strip():
+                yield json.loads(raw)
+
+
+def payload_records(
+    data: Optional[Dict[str, Any]],
+    state: Dict[str, Any],
+    etag: str,
+) -> Iterator[Dict[str, Any]]:
+    """Stream-shaped records for a JSON dns-sync response (``data`` None = 304)."""
+    version = etag.removeprefix('W/').strip('"')
+    if data is None:
+        yield {'type': 'global', 'global_hash': state['global_hash'], 'unchanged': True}
+        for device_id, content_hash in state['device_hashes'].items():
+            yield {'type': 'device_unchanged', 'device_id': device_id, 'content_hash': content_hash}
+        for slug, content_hash in state['pack_hashes'].items():
+            yield {'type': 'pack_unchanged', 'slug': slug, 'content_hash': content_hash}
+        yield {'type': 'end', 'version': version}
+        return
+
+    global_unchanged = bool(data.get('global_unchanged'))
+    yield {'type': 'global', 'global_hash': data.get('global_hash') or '', 'unchanged': global_unchanged}
+    if not global_unchanged:
+        yield {'type': 'global_domains', 'domains': data.get('global_domains') or []}
+    for entry in data.get('entries') or []:
+        yield {**entry, 'type': 'device'}
+    for device_id in data.get('unchanged_device_ids') or []:
+        yield {'type': 'device_unchanged', 'device_id': device_id}
+    for pack in data.get('packs') or []:
+        yield {**{k: v for k, v in pack.items() if k != 'domains'}, 'type': 'pack'}
+        yield {'type': 'pack_domains', 'slug': pack.get('slug'), 'domains': pack.get('domains') or []}
+    for slug in data.get('unchanged_pack_slugs') or []:
+        yield {'type': 'pack_unchanged', 'slug': slug}
+    yield {'type': 'end', 'version': version}
+
+
+def _render_key(block_ip: str, block_ipv6_ip: str) -> str:
+    """Hashes from the server only cover rules; local rendering settings must match too."""
+    return f"{block_ip}|{block_ipv6_ip}"
+
+
+def load_sync_state(path: str, config_path: str, config_dir: str) -> Dict[str, Any]:
+    """Last applied hashes, minus anything whose file is no longer on disk."""
+    empty: Dict[str, Any] = {'etag': '', 'global_hash': '', 'device_hashes': {}, 'pack_hashes': {}}
+    if not path:
+        return empty
+    try:
+        state = json.loads(Path(path).read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        return empty
+    except Exception:
+        logger.warning(
+            "Ignoring unreadable DNS sync state",
+            extra=structured_extra("policy_sync_state_invalid", path=path),
+            exc_info=True,
+        )
+        return empty
+    if not isinstance(state, dict) or state.get('render') != _render_key(BLOCK_IP, BLOCK_IPV6_IP):
+        return empty
+
+    device_hashes = {
+        str(device_id): str(content_hash)
+        for device_id, content_hash in (state.get('device_hashes') or {}).items()
+        if (Path(config_dir) / f"ng-device-{device_id}.conf").exists()
+    }
+    pack_hashes = {
+        str(slug): str(content_hash)
+        for slug, content_hash in (state.get('pack_hashes') or {}).items()
+        if (Path(config_dir) / pack_config_name(slug)).exists()
+    }
+    global_hash = str(state.get('global_hash') or '') if Path(config_path).exists() else ''
+    complete = (
+        bool(global_hash)
+        and len(device_hashes) == len(state.get('device_hashes') or {})
+        and len(pack_hashes) == len(state.get('pack_hashes') or {})
+    )
+    return {
+        'etag': str(state.get('etag') or '') if complete else '',
+        'global_hash': global_hash,
+        'device_hashes': device_hashes,
+        'pack_hashes': pack_hashes,
+    }
+
+
+def save_sync_state(path: str, state: Dict[str, Any]) -> None:
+    if not path:
+        return
+    try:
+        state_file = Path(path)
+        state_file.parent.mkdir(parents=True, exist_ok=True)
+        state_file.write_text(
+            json.dumps({**state, 'render': _render_key(BLOCK_IP, BLOCK_IPV6_IP)}),
+            encoding='utf-8',
+        )
+    except Exception:
+        logger.warning(
+            "Failed to save DNS sync state",
+            extra=structured_extra("policy_sync_state_save_failed", path=path),
+            exc_info=True,
+        )
+
+
 def _normalize_blocked_domain(site: str) -> str:
     domain = str(site).strip().lower()
     domain = domain.replace('http://', '').replace('https://', '').replace('www.', '')
@@ -88,6 +289,37 @@ def block_domain_dnsmasq_lines(
     return lines
 
 
+_BLOCKED = ''  # labels are never empty, so this key marks a blocked trie node
+
+
+def compact_domains(domains: Iterable[str]) -> List[str]:
+    """Dedupe and drop domains under a blocked ancestor; keeps first-seen order.
+
+    ``address=/example.com/`` already matches every subdomain, so ``ads.example.com``
+    adds nothing once ``example.com`` is listed. Domains go into a reversed-label
+    trie (``com -> example -> ads``); a domain is kept unless a strict ancestor is
+    marked blocked on its path.
+    """
+    unique = [d for d in dict.fromkeys(domains) if d and all(d.split('.'))]
+    root: Dict[str, dict] = {}
+    for domain in unique:
+        node = root
+        for label in reversed(domain.split('.')):
+            node = node.setdefault(label, {})
+        node[_BLOCKED] = {}
+    kept = []
+    for domain in unique:
+        node = root
+        labels = domain.split('.')
+        for label in reversed(labels[1:]):
+            node = node[label]
+            if _BLOCKED in node:
+                break
+        else:
+            kept.append(domain)
+    return kept
+
+
 def domains_to_dnsmasq_lines(
     domains: List[str],
     block_ip: str,
@@ -95,18 +327,38 @@ def domains_to_dnsmasq_lines(
 ) -> List[str]:
     if block_ipv6_ip is None:
         block_ipv6_ip = BLOCK_IPV6_IP
+    normalized = [_normalize_blocked_domain(site) for site in domains]
+    kept = compact_domains(normalized)
+    if normalized:
+        logger.info(
+            "Block list compacted",
+            extra=structured_extra(
+                "policy_dns_compacted",
+                domains_in=len(normalized),
+                domains_out=len(kept),
+                reduction_ratio=round(1 - len(kept) / len(normalized), 4),
+            ),
+        )
+    return _block_lines(kept, block_ip, block_ipv6_ip)
+
+
+def _block_lines(domains: Iterable[str], block_ip: str, block_ipv6_ip: str) -> List[str]:
     entries = []
-    seen = set()
-    for site in domains:
-        domain = _normalize_blocked_domain(site)
-        if not domain or domain in seen:
-            continue
-        seen.add(domain)
+    for domain in domains:
         entries.extend(block_domain_dnsmasq_lines(domain, block_ip, block_ipv6_ip))
     return entries
 
 
-def _dhcp_host_tag_line(entry: Dict[str, Any], tag: str) -> Optional[str]:
+def pack_tag(slug: str) -> str:
+    """Tag for a shared pack file; matches the API's naming."""
+    return "ng_pack_" + re.sub(r"[^a-z0-9_]", "_", str(slug).lower())
+
+
+def pack_config_name(slug: str) -> str:
+    return f"ng-pack-{re.sub(r'[^a-z0-9_-]', '_', str(slug).lower())}.conf"
+
+
+def _dhcp_host_tag_line(entry: Dict[str, Any], tag: str, extra_tags: Iterable[str] = ()) -> Optional[str]:
     """Tag DNS queries by VPN client IP (WireGuard) and/or LAN MAC."""
     mac = (entry.get('mac_address') or '').strip().lower()
     client_ip = (entry.get('client_ip') or '').strip()
@@ -118,6 +370,7 @@ def _dhcp_host_tag_line(entry: Dict[str, Any], tag: str) -> Optional[str]:
     if client_ip:
         parts.append(client_ip)
     parts.append(f"set:{tag}")
+    parts.extend(f"set:{extra}" for extra in extra_tags)
     return f"dhcp-host={','.join(parts)}"
 
 
@@ -129,7 +382,9 @@ def convert_device_entry_to_dnsmasq(
     if block_ipv6_ip is None:
         block_ipv6_ip = BLOCK_IPV6_IP
     tag = entry.get('tag') or f"ng_device_{entry.get('device_id')}"
-    host_line = _dhcp_host_tag_line(entry, tag)
+    # Shared pack files hold the pack rules; the device only joins their tags.
+    pack_tags = [] if entry.get('allowlist_only') else [pack_tag(s) for s in entry.get('pack_slugs') or []]
+    host_line = _dhcp_host_tag_line(entry, tag, pack_tags)
     if not host_line:
         return []
 
@@ -157,27 +412,146 @@ def convert_device_entry_to_dnsmasq(
             for addr_line in block_domain_dnsmasq_lines(p, block_ip, block_ipv6_ip):
                 lines.append(f"tag:{tag}")
                 lines.append(addr_line)
-        for domain in entry.get('block_domains') or []:
-            d = str(domain).strip().lower()
-            if not d:
-                continue
+        for d in compact_domains(str(domain).strip().lower() for domain in entry.get('block_domains') or []):
             for addr_line in block_domain_dnsmasq_lines(d, block_ip, block_ipv6_ip):
                 lines.append(f"tag:{tag}")
                 lines.append(addr_line)
     return lines
 
 
-def write_dns_config(entries: List[str], config_path: str) -> bool:
+def _tagged_block_lines(domains: Iterable[str], tag: str, block_ip: str, block_ipv6_ip: str) -> List[str]:
+    lines: List[str] = []
+    for d in compact_domains(str(domain).strip().lower() for domain in domains):
+        for addr_line in block_domain_dnsmasq_lines(d, block_ip, block_ipv6_ip):
+            lines.append(f"tag:{tag}")
+            lines.append(addr_line)
+    return lines
+
+
+def convert_pack_entry_to_dnsmasq(
+    pack: Dict[str, Any],
+    block_ip: str,
+    block_ipv6_ip: Optional[str] = None,
+) -> List[str]:
+    """One shared file per pack: rules apply to every device that set the pack's tag."""
+    if block_ipv6_ip is None:
+        block_ipv6_ip = BLOCK_IPV6_IP
+    slug = pack.get('slug') or ''
+    tag = pack.get('tag') or pack_tag(slug)
+    return [f"# Pack {slug}"] + _tagged_block_lines(pack.get('domains') or [], tag, block_ip, block_ipv6_ip)
+
+
+STAGING_PREFIX = '.ng-staging-'
+GENERATED_CONFIG_PATTERNS = ('ng-device-*.conf', 'ng-pack-*.conf')
+
+
+def _fsync_dir(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
     try:
-        config_file = Path(config_path)
-        config_file.parent.mkdir(parents=True, exist_ok=True)
-        header = [
-            "# TrustEdge global policy blocks (auto-generated)",
-            f"# Generated at: {time.strftime('%Y-%m-%d %H:%M:%S')}",
-            "",
-        ]
-        content = '\n'.join(header + entries) + '\n'
-        config_file.write_text(content)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class StagedConfigs:
+    """Config files written and fsynced in a staging dir, then swapped in with ``os.replace``.
+
+    Each target directory gets its own staging dir (same filesystem, so the rename is
+    atomic). The leading dot keeps dnsmasq's conf-dir from reading it. ``commit``
+    replaces every staged file and deletes removed ones in one go, so a dnsmasq reload
+    after it sees either the old or the new set of configs, never a partial file.
+    """
+
+    def __init__(self) -> None:
+        self._writes: List[Tuple[Path, Path]] = []  # (staged, target)
+        self._removals: List[Path] = []
+        self._staging: Dict[Path, Path] = {}
+        self._open: List[IO[str]] = []
+
+    def _staging_dir(self, target_dir: Path) -> Path:
+        staging = self._staging.get(target_dir)
+        if staging is None:
+            target_dir.mkdir(parents=True, exist_ok=True)
+            for leftover in target_dir.glob(f'{STAGING_PREFIX}*'):
+                shutil.rmtree(leftover, ignore_errors=True)
+            staging = Path(tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=target_dir))
+            self._staging[target_dir] = staging
+        return staging
+
+    def open_file(self, target: Path) -> IO[str]:
+        """Staged file for incremental writes; ``close_file`` fsyncs and queues it."""
+        f = open(self._staging_dir(target.parent) / target.name, 'w', encoding='utf-8')
+        self._open.append(f)
+        return f
+
+    def close_file(self, f: IO[str], target: Path) -> None:
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+        self._open.remove(f)
+        os.chmod(f.name, 0o644)
+        self._writes.append((Path(f.name), target))
+
+    def write(self, target: Path, content: str) -> None:
+        f = self.open_file(target)
+        f.write(content)
+        self.close_file(f, target)
+
+    def remove(self, target: Path) -> None:
+        self._removals.append(target)
+
+    def commit(self) -> None:
+        for staged, target in self._writes:
+            os.replace(staged, target)
+        for target in self._removals:
+            target.unlink(missing_ok=True)
+        for target_dir in self._staging:
+            _fsync_dir(target_dir)
+        self.discard()
+
+    def discard(self) -> None:
+        for f in self._open:
+            f.close()
+        self._open.clear()
+        for staging in self._staging.values():
+            shutil.rmtree(staging, ignore_errors=True)
+        self._writes.clear()
+        self._removals.clear()
+        self._staging.clear()
+
+
+def _global_header() -> List[str]:
+    return [
+        "# TrustEdge global policy blocks (auto-generated)",
+        f"# Generated at: {time.strftime('%Y-%m-%d %H:%M:%S')}",
+        "",
+    ]
+
+
+def _remove_stale_configs(config_dir: Path, active_names: Iterable[str], staged: StagedConfigs) -> int:
+    active = set(active_names)
+    removed = 0
+    for pattern in GENERATED_CONFIG_PATTERNS:
+        for existing in config_dir.glob(pattern):
+            if existing.name not in active:
+                staged.remove(existing)
+                removed += 1
+    return removed
+
+
+def write_dns_config(
+    entries: List[str],
+    config_path: str,
+    staged: Optional[StagedConfigs] = None,
+) -> bool:
+    """Stage the global config; commits at once unless the caller passes ``staged``."""
+    own = staged is None
+    staged = staged or StagedConfigs()
+    try:
+        content = '\n'.join(_global_header() + entries) + '\n'
+        staged.write(Path(config_path), content)
+        if own:
+            staged.commit()
         return True
     except Exception:
         logger.error(
@@ -185,30 +559,40 @@ def write_dns_config(entries: List[str], config_path: str) -> bool:
             extra=structured_extra("policy_dns_write_failed", path=config_path),
             exc_info=True,
         )
+        if own:
+            staged.discard()
         return False
 
 
-def write_client_block_configs(files: Dict[str, List[str]], config_dir: str) -> bool:
+def write_client_block_configs(
+    files: Dict[str, List[str]],
+    config_dir: str,
+    keep: Iterable[str] = (),
+    staged: Optional[StagedConfigs] = None,
+) -> bool:
+    """Write ``files`` and remove other device/pack configs except the unchanged ones in ``keep``.
+
+    Commits at once unless the caller passes ``staged``.
+    """
+    own = staged is None
+    staged = staged or StagedConfigs()
     try:
         config_path = Path(config_dir)
-        config_path.mkdir(parents=True, exist_ok=True)
-
-        active_names = set(files.keys())
-        removed = 0
-        for existing in config_path.glob('ng-device-*.conf'):
-            if existing.name not in active_names:
-                existing.unlink()
-                removed += 1
-
         for filename, lines in files.items():
             content = '\n'.join(lines) + '\n'
-            (config_path / filename).write_text(content)
+            staged.write(config_path / filename, content)
+
+        active_names = set(files.keys()) | set(keep)
+        removed = _remove_stale_configs(config_path, active_names, staged)
 
+        if own:
+            staged.commit()
         logger.info(
             "Per-device DNS configs written",
             extra=structured_extra(
                 "policy_device_configs_written",
                 device_count=len(files),
+                unchanged=len(active_names) - len(files),
                 removed_stale=removed,
             ),
         )
@@ -219,6 +603,8 @@ def write_client_block_configs(files: Dict[str, List[str]], config_dir: str) ->
             extra=structured_extra("policy_device_configs_failed", path=config_dir),
             exc_info=True,
         )
+        if own:
+            staged.discard()
         return False
 
 
@@ -236,31 +622,185 @@ def reload_dnsmasq(cmd: str) -> bool:
         return False
 
 
+class StagedSync(NamedTuple):
+    state: Dict[str, Any]
+    changed: bool
+    global_rules: int
+    device_configs: int
+    pack_configs: int
+    unchanged: int
+    removed: int
+
+
+def stage_policy_records(
+    records: Iterable[Dict[str, Any]],
+    state: Dict[str, Any],
+    staged: StagedConfigs,
+    config_path: str,
+    config_dir: str,
+) -> StagedSync:
+    """Stage configs from dns-sync records as they arrive (nothing is swapped in here).
+
+    Domain chunks go straight into the open staged global/pack file, so memory stays
+    bounded by one record. Chunks are compacted on their own; the API already sends
+    compacted lists. Raises if the stream ends without its ``end`` record.
+    """
+    new_state: Dict[str, Any] = {'etag': '', 'global_hash': '', 'device_hashes': {}, 'pack_hashes': {}}
+    devices_dir = Path(config_dir)
+    active: set = set()
+    global_file: Optional[IO[str]] = None
+    pack_file: Optional[IO[str]] = None
+    pack_target = devices_dir
+    pack_tag_name = ''
+    global_rules = device_configs = pack_configs = unchanged = 0
+    ended = False
+
+    for record in records:
+        kind = record.get('type')
+        if pack_file is not None and kind != 'pack_domains':
+            staged.close_file(pack_file, pack_target)
+            pack_file = None
+        if global_file is not None and kind != 'global_domains':
+            staged.close_file(global_file, Path(config_path))
+            global_file = None
+
+        if kind == 'global':
+            new_state['global_hash'] = record.get('global_hash') or ''
+            if not record.get('unchanged'):
+                global_file = staged.open_file(Path(config_path))
+                global_file.write('\n'.join(_global_header()) + '\n')
+        elif kind == 'global_domains' and global_file is not None:
+            chunk = compact_domains(_normalize_blocked_domain(d) for d in record.get('domains') or [])
+            lines = _block_lines(chunk, BLOCK_IP, BLOCK_IPV6_IP)
+            global_file.write(''.join(f"{line}\n" for line in lines))
+            global_rules += len(lines)
+        elif kind == 'device':
+            device_id = record.get('device_id')
+            lines = convert_device_entry_to_dnsmasq(record, BLOCK_IP)
+            if device_id and lines:
+                name = f"ng-device-{device_id}.conf"
+                staged.write(devices_dir / name, '\n'.join(lines) + '\n')
+                active.add(name)
+                device_configs += 1
+                if record.get('content_hash'):
+                    new_state['device_hashes'][str(device_id)] = record['content_hash']
+        elif kind == 'device_unchanged':
+            device_id = str(record.get('device_id'))
+            active.add(f"ng-device-{device_id}.conf")
+            unchanged += 1
+            content_hash = record.get('content_hash') or state['device_hashes'].get(device_id)
+            if content_hash:
+                new_state['device_hashes'][device_id] = content_hash
+        elif kind == 'pack':
+            slug = str(record.get('slug') or '')
+            name = pack_config_name(slug)
+            pack_target = devices_dir / name
+            pack_tag_name = record.get('tag') or pack_tag(slug)
+            pack_file = staged.open_file(pack_target)
+            pack_file.write(f"# Pack {slug}\n")
+            active.add(name)
+            pack_configs += 1
+            if record.get('content_hash'):
+                new_state['pack_hashes'][slug] = record['content_hash']
+        elif kind == 'pack_domains' and pack_file is not None:
+            lines = _tagged_block_lines(record.get('domains') or [], pack_tag_name, BLOCK_IP, BLOCK_IPV6_IP)
+            pack_file.write(''.join(f"{line}\n" for line in lines))
+        elif kind == 'pack_unchanged':
+            slug = str(record.get('slug') or '')
+            active.add(pack_config_name(slug))
+            unchanged += 1
+            content_hash = record.get('content_hash') or state['pack_hashes'].get(slug)
+            if content_hash:
+                new_state['pack_hashes'][slug] = content_hash
+        elif kind == 'end':
+            version = record.get('version') or ''
+            new_state['etag'] = f'"{version}"' if version else ''
+            ended = True
+
+    if pack_file is not None:
+        staged.close_file(pack_file, pack_target)
+    if global_file is not None:
+        staged.close_file(global_file, Path(config_path))
+    if not ended:
+        raise ValueError("policy DNS stream ended before its end record")
+
+    removed = _remove_stale_configs(devices_dir, active, staged)
+    changed = bool(
+        new_state['global_hash'] != state['global_hash']
+        or global_rules
+        or device_configs
+        or pack_configs
+        or removed
+    )
+    return StagedSync(new_state, changed, global_rules, device_configs, pack_configs, unchanged, removed)
+
+
+def _fetch_and_stage(state: Dict[str, Any], staged: StagedConfigs) -> Optional[StagedSync]:
+    """NDJSON stream first; JSON delta (or full GET) when the API predates the stream."""
+    try:
+        records = stream_policy_records(API_BASE_URL, POLICY_DNS_STREAM_ENDPOINT, state)
+        return stage_policy_records(records, state, staged, DNS_CONFIG_PATH, CLIENT_BLOCKS_CONFIG_DIR)
+    except StreamUnsupported:
+        staged.discard()
+    fetched = fetch_policy_dns_delta(API_BASE_URL, POLICY_DNS_SYNC_ENDPOINT, state)
+    if fetched is None:
+        return None
+    records = payload_records(fetched.data, state, fetched.etag)
+    return stage_policy_records(records, state, staged, DNS_CONFIG_PATH, CLIENT_BLOCKS_CONFIG_DIR)
+
+
 def sync_policy_dns():
-    data = fetch_policy_dns_sync(API_BASE_URL, POLICY_DNS_SYNC_ENDPOINT)
-    if data is None:
+    if not API_BASE_URL:
+        logger.error(
+            "API_BASE_URL not set",
+            extra=structured_extra("policy_sync_config_error"),
+        )
         return False
-
-    global_lines = domains_to_dnsmasq_lines(data.get('global_domains') or [], BLOCK_IP)
-    if not write_dns_config(global_lines, DNS_CONFIG_PATH):
+    state = load_sync_state(DNS_SYNC_STATE_PATH, DNS_CONFIG_PATH, CLIENT_BLOCKS_CONFIG_DIR)
+    # Everything is staged first and swapped in together right before the reload.
+    staged = StagedConfigs()
+    try:
+        result = _fetch_and_stage(state, staged)
+    except Exception:
+        logger.error(
+            "Policy DNS sync failed while staging configs",
+            extra=structured_extra("policy_sync_fetch_failed"),
+            exc_info=True,
+        )
+        result = None
+    if result is None:
+        staged.discard()
         return False
 
-    files: Dict[str, List[str]] = {}
-    for entry in data.get('entries') or []:
-        device_id = entry.get('device_id')
-        lines = convert_device_entry_to_dnsmasq(entry, BLOCK_IP)
-        if device_id and lines:
-            files[f"ng-device-{device_id}.conf"] = lines
+    if not result.changed:
+        staged.discard()
+        save_sync_state(DNS_SYNC_STATE_PATH, result.state)
+        logger.info(
+            "Policy DNS unchanged; skipping rewrite and reload",
+            extra=structured_extra("policy_dns_sync_unchanged", configs_unchanged=result.unchanged),
+        )
+        return True
 
-    if not write_client_block_configs(files, CLIENT_BLOCKS_CONFIG_DIR):
+    try:
+        staged.commit()
+    except Exception:
+        logger.error(
+            "Failed to swap in staged DNS configs",
+            extra=structured_extra("policy_dns_commit_failed"),
+            exc_info=True,
+        )
+        staged.discard()
         return False
 
     logger.info(
         "Policy DNS config updated",
         extra=structured_extra(
             "policy_dns_sync_ok",
-            global_entries=len(global_lines),
-            device_configs=len(files),
+            global_entries=result.global_rules,
+            device_configs=result.device_configs,
+            pack_configs=result.pack_configs,
+            configs_unchanged=result.unchanged,
+            removed_stale=result.removed,
         ),
     )
 
@@ -271,6 +811,8 @@ def sync_policy_dns():
                 extra=structured_extra("dnsmasq_reload_failed_after_sync"),
             )
             return False
+
+    save_sync_state(DNS_SYNC_STATE_PATH, result.state)
     return True
 
 
@@ -1,6 +1,12 @@
 """Unit tests for dnsmasq block line generation."""
 
-from sync import block_domain_dnsmasq_lines, convert_device_entry_to_dnsmasq, domains_to_dnsmasq_lines
+from sync import (
+    block_domain_dnsmasq_lines,
+    compact_domains,
+    convert_device_entry_to_dnsmasq,
+    convert_pack_entry_to_dnsmasq,
+    domains_to_dnsmasq_lines,
+)
 
 
 def test_block_domain_emits_ipv4_and_ipv6():
@@ -45,3 +51,49 @@ def test_device_quarantine_tags_vpn_client_ip():
 
 def test_device_entry_requires_ip_or_mac():
     assert convert_device_entry_to_dnsmasq({"device_id": 1}, "0.0.0.0") == []
+
+
+def test_pack_entry_tags_every_rule():
+    lines = convert_pack_entry_to_dnsmasq(
+        {"slug": "social", "tag": "ng_pack_social", "domains": ["facebook.com"]},
+        "0.0.0.0",
+        "::",
+    )
+    assert lines == [
+        "# Pack social",
+        "tag:ng_pack_social",
+        "address=/facebook.com/0.0.0.0",
+        "tag:ng_pack_social",
+        "address=/facebook.com/::",
+    ]
+
+
+def test_device_joins_pack_tags_unless_quarantined():
+    entry = {"device_id": 7, "client_ip": "10.0.0.7", "tag": "ng_device_7", "pack_slugs": ["social", "games"]}
+    lines = convert_device_entry_to_dnsmasq(entry, "0.0.0.0", "::")
+    assert lines[1] == "dhcp-host=10.0.0.7,set:ng_device_7,set:ng_pack_social,set:ng_pack_games"
+
+    quarantined = convert_device_entry_to_dnsmasq({**entry, "allowlist_only": True}, "0.0.0.0", "::")
+    assert quarantined[1] == "dhcp-host=10.0.0.7,set:ng_device_7"
+
+
+def test_domains_compacts_subdomains_of_blocked_ancestors():
+    lines = domains_to_dnsmasq_lines(
+        ["cdn.ads.example.com", "example.com", "ads.example.com", "example.org", "www.example.org", "other.net"],
+        "0.0.0.0",
+        "",
+    )
+    assert lines == [
+        "address=/example.com/0.0.0.0",
+        "address=/example.org/0.0.0.0",
+        "address=/other.net/0.0.0.0",
+    ]
+
+
+def test_compact_domains_keeps_siblings_and_order():
+    assert compact_domains(["b.example.com", "a.example.com", "b.example.com", "example.net"]) == [
+        "b.example.com",
+        "a.example.com",
+        "example.net",
+    ]
+    assert compact_domains(["a.b.c", "b.c"]) == ["b.c"]
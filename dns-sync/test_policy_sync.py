@@ -0,0 +1,304 @@
+"""Unit tests for delta/streamed policy DNS sync and staged (atomic) config writes."""
+
+import json
+
+import pytest
+
+import sync
+from sync import PolicyFetch, load_sync_state
+
+
+@pytest.fixture
+def sync_paths(tmp_path, monkeypatch):
+    config_path = tmp_path / "blocked-domains.conf"
+    config_dir = tmp_path / "devices"
+    state_path = tmp_path / "state.json"
+    monkeypatch.setattr(sync, "DNS_CONFIG_PATH", str(config_path))
+    monkeypatch.setattr(sync, "CLIENT_BLOCKS_CONFIG_DIR", str(config_dir))
+    monkeypatch.setattr(sync, "DNS_SYNC_STATE_PATH", str(state_path))
+    monkeypatch.setattr(sync, "DNSMASQ_RESTART_CMD", "reload")
+    reloads = []
+    monkeypatch.setattr(sync, "reload_dnsmasq", lambda cmd: reloads.append(cmd) or True)
+    return config_path, config_dir, state_path, reloads
+
+
+def _entry(device_id, domains, content_hash):
+    return {
+        "device_id": device_id,
+        "client_ip": f"10.0.0.{device_id}",
+        "tag": f"ng_device_{device_id}",
+        "block_domains": domains,
+        "content_hash": content_hash,
+    }
+
+
+def _serve(monkeypatch, responses, requests):
+    """Backend without the NDJSON stream: sync falls back to the JSON delta endpoint."""
+    def no_stream(api_url, endpoint, state):
+        raise sync.StreamUnsupported(endpoint)
+        yield
+
+    def fake_fetch(api_url, endpoint, state):
+        requests.append(json.loads(json.dumps(state)))
+        return responses.pop(0)
+
+    monkeypatch.setattr(sync, "API_BASE_URL", "http://api")
+    monkeypatch.setattr(sync, "stream_policy_records", no_stream)
+    monkeypatch.setattr(sync, "fetch_policy_dns_delta", fake_fetch)
+
+
+def _stream(monkeypatch, streams, requests):
+    def fake_stream(api_url, endpoint, state):
+        requests.append(json.loads(json.dumps(state)))
+        yield from streams.pop(0)
+
+    monkeypatch.setattr(sync, "API_BASE_URL", "http://api")
+    monkeypatch.setattr(sync, "stream_policy_records", fake_stream)
+
+
+def test_delta_sync_rewrites_only_changed_files(sync_paths, monkeypatch):
+    config_path, config_dir, state_path, reloads = sync_paths
+    requests = []
+    _serve(monkeypatch, [
+        PolicyFetch({
+            "global_domains": ["ads.example"],
+            "global_hash": "g1",
+            "entries": [_entry(1, ["a.example"], "h1"), _entry(2, ["b.example"], "h2")],
+        }, '"v1"'),
+        PolicyFetch({
+            "global_unchanged": True,
+            "global_hash": "g1",
+            "entries": [_entry(2, ["c.example"], "h2b")],
+            "unchanged_device_ids": [1],
+        }, '"v2"'),
+        PolicyFetch(None, '"v2"'),
+    ], requests)
+
+    assert sync.sync_policy_dns() is True
+    assert len(reloads) == 1
+    device_one = config_dir / "ng-device-1.conf"
+    device_one_mtime = device_one.stat().st_mtime_ns
+    global_mtime = config_path.stat().st_mtime_ns
+
+    assert sync.sync_policy_dns() is True
+    assert requests[1] == {
+        "etag": '"v1"',
+        "global_hash": "g1",
+        "device_hashes": {"1": "h1", "2": "h2"},
+        "pack_hashes": {},
+    }
+    assert len(reloads) == 2
+    assert device_one.stat().st_mtime_ns == device_one_mtime
+    assert config_path.stat().st_mtime_ns == global_mtime
+    assert "address=/c.example/" in (config_dir / "ng-device-2.conf").read_text()
+
+    assert sync.sync_policy_dns() is True
+    assert requests[2]["etag"] == '"v2"'
+    assert len(reloads) == 2
+    assert json.loads(state_path.read_text())["device_hashes"] == {"1": "h1", "2": "h2b"}
+
+
+def test_delta_sync_removes_devices_missing_from_response(sync_paths, monkeypatch):
+    _config_path, config_dir, _state_path, _reloads = sync_paths
+    _serve(monkeypatch, [
+        PolicyFetch({
+            "global_domains": [],
+            "global_hash": "g1",
+            "entries": [_entry(1, ["a.example"], "h1"), _entry(2, ["b.example"], "h2")],
+        }, '"v1"'),
+        PolicyFetch({
+            "global_unchanged": True,
+            "global_hash": "g1",
+            "entries": [],
+            "unchanged_device_ids": [1],
+        }, '"v2"'),
+    ], [])
+
+    assert sync.sync_policy_dns() is True
+    assert sync.sync_policy_dns() is True
+    assert sorted(p.name for p in config_dir.iterdir()) == ["ng-device-1.conf"]
+
+
+def test_shared_pack_files_written_once_and_kept_when_unchanged(sync_paths, monkeypatch):
+    _config_path, config_dir, state_path, _reloads = sync_paths
+    devices = [
+        {**_entry(device_id, [], f"h{device_id}"), "pack_slugs": ["social"]}
+        for device_id in (1, 2)
+    ]
+    _serve(monkeypatch, [
+        PolicyFetch({
+            "global_domains": [],
+            "global_hash": "g1",
+            "entries": devices,
+            "packs": [{"slug": "social", "tag": "ng_pack_social", "domains": ["fb.example"], "content_hash": "p1"}],
+        }, '"v1"'),
+        PolicyFetch({
+            "global_unchanged": True,
+            "global_hash": "g1",
+            "entries": [{**_entry(3, [], "h3"), "pack_slugs": ["social"]}],
+            "unchanged_device_ids": [1, 2],
+            "unchanged_pack_slugs": ["social"],
+        }, '"v2"'),
+    ], [])
+
+    assert sync.sync_policy_dns() is True
+    pack_file = config_dir / "ng-pack-social.conf"
+    assert pack_file.read_text().count("address=/fb.example/") == 2
+    device_one = (config_dir / "ng-device-1.conf").read_text()
+    assert "dhcp-host=10.0.0.1,set:ng_device_1,set:ng_pack_social" in device_one
+    assert "fb.example" not in device_one
+    pack_mtime = pack_file.stat().st_mtime_ns
+
+    assert sync.sync_policy_dns() is True
+    assert pack_file.stat().st_mtime_ns == pack_mtime
+    assert (config_dir / "ng-device-3.conf").exists()
+    assert json.loads(state_path.read_text())["pack_hashes"] == {"social": "p1"}
+
+
+def test_state_forgets_hashes_for_missing_files(sync_paths):
+    config_path, config_dir, state_path, _reloads = sync_paths
+    config_dir.mkdir()
+    config_path.write_text("")
+    (config_dir / "ng-device-1.conf").write_text("")
+    sync.save_sync_state(str(state_path), {
+        "etag": '"v1"',
+        "global_hash": "g1",
+        "device_hashes": {"1": "h1", "2": "h2"},
+    })
+
+    state = load_sync_state(str(state_path), str(config_path), str(config_dir))
+    assert state == {"etag": "", "global_hash": "g1", "device_hashes": {"1": "h1"}, "pack_hashes": {}}
+
+
+def test_state_resets_when_block_ip_changes(sync_paths, monkeypatch):
+    config_path, config_dir, state_path, _reloads = sync_paths
+    config_path.write_text("")
+    sync.save_sync_state(str(state_path), {"etag": '"v1"', "global_hash": "g1", "device_hashes": {}})
+    monkeypatch.setattr(sync, "BLOCK_IP", "10.0.0.1")
+
+    state = load_sync_state(str(state_path), str(config_path), str(config_dir))
+    assert state == {"etag": "", "global_hash": "", "device_hashes": {}, "pack_hashes": {}}
+
+
+def test_staged_configs_swap_in_on_commit(tmp_path):
+    target = tmp_path / "devices" / "ng-device-1.conf"
+    stale = tmp_path / "devices" / "ng-device-2.conf"
+    stale.parent.mkdir()
+    target.write_text("old\n")
+    stale.write_text("stale\n")
+
+    staged = sync.StagedConfigs()
+    staged.write(target, "new\n")
+    staged.remove(stale)
+    assert target.read_text() == "old\n"
+    assert stale.exists()
+
+    staged.commit()
+    assert target.read_text() == "new\n"
+    assert not stale.exists()
+    assert sorted(p.name for p in target.parent.iterdir()) == ["ng-device-1.conf"]
+
+
+def test_failed_sync_leaves_live_configs_untouched(sync_paths, monkeypatch):
+    config_path, config_dir, _state_path, reloads = sync_paths
+    config_path.write_text("live global\n")
+    _serve(monkeypatch, [
+        PolicyFetch({
+            "global_domains": ["ads.example"],
+            "global_hash": "g1",
+            "entries": [_entry(1, ["a.example"], "h1")],
+        }, '"v1"'),
+    ], [])
+    def broken_device(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(sync, "convert_device_entry_to_dnsmasq", broken_device)
+
+    assert sync.sync_policy_dns() is False
+    assert config_path.read_text() == "live global\n"
+    assert reloads == []
+    assert not any(p.name.startswith(sync.STAGING_PREFIX) for p in config_path.parent.iterdir())
+
+
+def test_streamed_sync_writes_chunks_incrementally(sync_paths, monkeypatch):
+    config_path, config_dir, state_path, reloads = sync_paths
+    requests = []
+    _stream(monkeypatch, [
+        [
+            {"type": "global", "global_hash": "g1", "count": 3, "unchanged": False},
+            {"type": "global_domains", "domains": ["ads.example", "x.ads.example"]},
+            {"type": "global_domains", "domains": ["track.example", "spy.example"]},
+            {"type": "device", **_entry(1, ["a.example"], "h1"), "pack_slugs": ["social"]},
+            {"type": "pack", "slug": "social", "tag": "ng_pack_social", "content_hash": "p1", "count": 2},
+            {"type": "pack_domains", "slug": "social", "domains": ["fb.example"]},
+            {"type": "pack_domains", "slug": "social", "domains": ["ig.example"]},
+            {"type": "end", "version": "v1", "devices": 1, "packs": 1},
+        ],
+        [
+            {"type": "global", "global_hash": "g1", "count": 3, "unchanged": True},
+            {"type": "device_unchanged", "device_id": 1, "content_hash": "h1"},
+            {"type": "pack_unchanged", "slug": "social", "tag": "ng_pack_social", "content_hash": "p1"},
+            {"type": "end", "version": "v1", "devices": 1, "packs": 1},
+        ],
+    ], requests)
+
+    assert sync.sync_policy_dns() is True
+    global_conf = config_path.read_text()
+    for domain in ("ads.example", "track.example", "spy.example"):
+        assert f"address=/{domain}/" in global_conf
+    assert "x.ads.example" not in global_conf
+    pack_conf = (config_dir / "ng-pack-social.conf").read_text()
+    assert pack_conf.startswith("# Pack social\n")
+    assert "tag:ng_pack_social\naddress=/ig.example/" in pack_conf
+    assert json.loads(state_path.read_text()) == {
+        "etag": '"v1"',
+        "global_hash": "g1",
+        "device_hashes": {"1": "h1"},
+        "pack_hashes": {"social": "p1"},
+        "render": sync._render_key(sync.BLOCK_IP, sync.BLOCK_IPV6_IP),
+    }
+
+    assert sync.sync_policy_dns() is True
+    assert requests[1]["device_hashes"] == {"1": "h1"}
+    assert reloads == ["reload"]
+    assert sorted(p.name for p in config_dir.iterdir()) == ["ng-device-1.conf", "ng-pack-social.conf"]
+
+
+def test_truncated_stream_is_not_applied(sync_paths, monkeypatch):
+    config_path, _config_dir, _state_path, reloads = sync_paths
+    config_path.write_text("live global\n")
+    _stream(monkeypatch, [[
+        {"type": "global", "global_hash": "g2", "count": 1, "unchanged": False},
+        {"type": "global_domains", "domains": ["ads.example"]},
+    ]], [])
+
+    assert sync.sync_policy_dns() is False
+    assert config_path.read_text() == "live global\n"
+    assert reloads == []
+    assert not any(p.name.startswith(sync.STAGING_PREFIX) for p in config_path.parent.iterdir())
+
+
+def test_stream_sends_etag_and_replays_state_on_304(monkeypatch):
+    import urllib.error
+    import urllib.request
+    from email.message import Message
+
+    sent = []
+
+    def not_modified(req, timeout):
+        sent.append(req)
+        headers = Message()
+        headers["ETag"] = '"v1"'
+        raise urllib.error.HTTPError(req.full_url, 304, "Not Modified", headers, None)
+
+    monkeypatch.setattr(urllib.request, "urlopen", not_modified)
+    state = {"etag": '"v1"', "global_hash": "g1", "device_hashes": {"1": "h1"}, "pack_hashes": {"social": "p1"}}
+    records = list(sync.stream_policy_records("http://api", "/policy/dns-sync/stream", state))
+
+    assert sent[0].get_header("If-none-match") == '"v1"'
+    assert records == [
+        {"type": "global", "global_hash": "g1", "unchanged": True},
+        {"type": "device_unchanged", "device_id": "1", "content_hash": "h1"},
+        {"type": "pack_unchanged", "slug": "social", "content_hash": "p1"},
+        {"type": "end", "version": "v1"},
+    ]
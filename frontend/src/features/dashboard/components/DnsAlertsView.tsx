@@ -37,6 +37,7 @@ const TYPE_LABEL: Record<string, string> = {
   blocked_attempt: 'Blocked',
   new_domain: 'New site',
   suspicious_domain: 'Suspicious',
+  dns_tunnel_suspected: 'DNS tunnel',
   bandwidth_spike: 'Bandwidth',
   behavior_anomaly: 'Behavior',
   new_country_region: 'New region',